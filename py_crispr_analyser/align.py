@@ -1,25 +1,201 @@
 # Copyright (C) 2025-2026 Genome Research Ltd.
 
+from dataclasses import dataclass
 import getopt
+import numba
 import numpy as np
 from numba import jit, prange, cuda
+from numba.extending import intrinsic, overload
+import socket
 import sys
+import time
+import typing
 
+from .cache import CACHE_SIZE, ResultCache
+from .precompute import SummaryWriter
+from .seed import SeedIndex, get_seed_index
+from .strand import StrandIndex, get_strand_index
 from .utils import (
     ERROR_STR,
-    FILE_VERSION,
     HEADER_SIZE,
     METADATA_SIZE,
+    PACKED_GUIDE_DTYPE,
+    Metadata,
     check_file_header,
     get_guides,
     get_file_metadata,
+    iterate_guides,
     print_metadata,
+    unpack_guides,
 )
 
 MAX_MISSMATCHES = 5
 MAX_OFF_TARGETS = 2000
+GUIDE_LENGTH = 20
+GUIDE_TILE_SIZE = 16384
+GUIDE_BLOCK_SIZE = 1024
+QUERY_BATCH_SIZE = 256
+NUMPY_CHUNK_SIZE = 1 << 20
+CALIBRATION_SIZE = 1 << 16
+# the seconds between progress reports of align_range
+PROGRESS_INTERVAL = 60
 PAM_ON = np.left_shift(1, 40, dtype=np.uint64)
 PAM_OFF = np.invert(PAM_ON, dtype=np.uint64)
+THREADS_PER_BLOCK = 256
+
+
+@dataclass(frozen=True)
+class SearchParameters:
+    """A dataclass to hold the parameters of an off-target search.
+
+    Guides with fewer than ``max_mismatches`` mismatches are off-targets, so
+    the summaries have ``max_mismatches`` columns, and at most
+    ``max_off_targets`` of their ids are stored per query. The PAM flag of
+    the guides is the bit after their ``guide_length`` bases.
+    """
+
+    max_mismatches: int = MAX_MISSMATCHES
+    max_off_targets: int = MAX_OFF_TARGETS
+    guide_length: int = GUIDE_LENGTH
+
+    def __post_init__(self) -> None:
+        if not 0 < self.max_mismatches <= MAX_MISSMATCHES:
+            raise ValueError(
+                f"Mismatch limit must be between 1 and {MAX_MISSMATCHES}"
+            )
+        if self.max_off_targets < 1:
+            raise ValueError("Off-target cap must be positive")
+        if not 0 < self.guide_length < 32:
+            raise ValueError("Guide length must be between 1 and 31")
+
+    @property
+    def pam_on(self) -> np.uint64:
+        """The PAM flag of the guides"""
+        return np.uint64(1) << np.uint64(2 * self.guide_length)
+
+
+DEFAULT_PARAMETERS = SearchParameters()
+
+
+@dataclass
+class DeviceGuides:
+    """A dataclass to hold a shard of the guides on a GPU along with the
+    result buffers, one row per query of a batch, reused by every batch.
+
+    ``offset`` is the index of the first guide of the shard in the guides
+    file and ``device_id`` the GPU holding it.
+    """
+
+    guides: "cuda.devicearray.DeviceNDArray"
+    summaries: "cuda.devicearray.DeviceNDArray"
+    off_target_ids_idx: "cuda.devicearray.DeviceNDArray"
+    off_target_ids: "cuda.devicearray.DeviceNDArray"
+    host_summaries: np.ndarray
+    host_off_target_ids_idx: np.ndarray
+    host_off_target_ids: np.ndarray
+    blocks_per_grid: int
+    offset: int = 0
+    device_id: int = 0
+
+
+@dataclass
+class DeviceStream:
+    """A dataclass to hold the double buffers used to stream the guides
+    through a GPU in chunks, along with the result buffers as in
+    :class:`DeviceGuides`.
+
+    Chunks alternate between the two ``streams``, each with its own pinned
+    ``host_chunks`` and ``device_chunks`` buffer of ``chunk_size`` guides,
+    so one chunk is copied to the GPU while the previous one is searched.
+    """
+
+    streams: list
+    host_chunks: list[np.ndarray]
+    device_chunks: list
+    summaries: "cuda.devicearray.DeviceNDArray"
+    off_target_ids_idx: "cuda.devicearray.DeviceNDArray"
+    off_target_ids: "cuda.devicearray.DeviceNDArray"
+    host_summaries: np.ndarray
+    host_off_target_ids_idx: np.ndarray
+    host_off_target_ids: np.ndarray
+    chunk_size: int
+
+
+def _read_guide(guides: np.ndarray, i: int) -> np.uint64:
+    """Read a guide from an array of guides, packed or not
+
+    The kernels read the guides with this function so they search the
+    packed guides of a version 4 file directly, see
+    :func:`py_crispr_analyser.utils.pack_guides`.
+
+    :param guides: The array of guides
+    :param i: The index of the guide
+    :return: The encoded gRNA sequence
+    """
+    guide = guides[i]
+    if guides.dtype != PACKED_GUIDE_DTYPE:
+        return guide
+    if guide["high"] == 0xFFFF:
+        return ERROR_STR
+    return np.uint64(guide["low"]) | (np.uint64(guide["high"]) << np.uint64(32))
+
+
+@overload(_read_guide)
+def _read_guide_overload(guides, i):
+    # compiled kernels pick the implementation by the type of the guides
+    if isinstance(guides.dtype, numba.types.Record):
+
+        def read_packed_guide(guides, i):
+            guide = guides[i]
+            if guide.high == 0xFFFF:
+                return ERROR_STR
+            return np.uint64(guide.low) | (
+                np.uint64(guide.high) << np.uint64(32)
+            )
+
+        return read_packed_guide
+    return lambda guides, i: guides[i]
+
+
+if numba.config.ENABLE_CUDASIM:
+    # the CUDA simulator has no warp vote or shuffle functions
+    @cuda.jit(device=True)
+    def _reserve_off_target_slot(
+        off_target_ids_idx: np.ndarray, counter: int, hit: bool
+    ) -> int:
+        if not hit:
+            return -1
+        return cuda.atomic.add(off_target_ids_idx, counter, 1)
+
+else:
+
+    @cuda.jit(device=True)
+    def _reserve_off_target_slot(
+        off_target_ids_idx: np.ndarray, counter: int, hit: bool
+    ) -> int:
+        """Reserve a slot in the off-target ids for each thread of the warp
+        with a hit, using a single atomic per warp
+
+        The lowest hit lane of the warp reserves as many slots as there are
+        hits and hands them out to the other hit lanes by rank.
+
+        :param off_target_ids_idx: The array of off-target counters
+        :param counter: The index of the counter in ``off_target_ids_idx``
+        :param hit: Whether this thread found an off-target
+        :return: The reserved slot, or -1 if this thread has no hit
+        """
+        hits = cuda.ballot_sync(cuda.activemask(), hit)
+        if not hit:
+            return -1
+        lane = cuda.threadIdx.x & 31
+        rank = cuda.popc(hits & ((1 << lane) - 1))
+        leader = cuda.popc(hits ^ (hits - 1)) - 1
+        first_slot = 0
+        if rank == 0:
+            first_slot = cuda.atomic.add(
+                off_target_ids_idx, counter, cuda.popc(hits)
+            )
+        return cuda.shfl_sync(hits, first_slot, leader) + rank
 
 
 @cuda.jit
@@ -31,35 +207,138 @@ def find_off_targets_kernel(
     off_target_ids_idx: np.ndarray,
     off_target_ids: np.ndarray,
     offset: np.uint64,
+    pam_on: np.uint64,
 ) -> None:
     """Find off-targets for a given query sequence using CUDA
 
+    Each block counts the summary in shared memory and adds it to ``summary``
+    once at the end, and the off-target ids are given their slots once per
+    warp (see :func:`_reserve_off_target_slot`), keeping global atomics off
+    the path of every hit. Guides with fewer mismatches than the length of
+    ``summary``, at most ``MAX_MISSMATCHES``, are off-targets.
+
     :param guides: The array of encoded gRNA sequences
     :param query_sequence: The query sequence
     :param reverse_query_sequence: The reverse complement of the query sequence
     :param summary: The array to store the results
-    :param off_target_ids_idx: The index for the off-target_ids array
-    :param off_target_ids: The array to store the off-target ids
+    :param off_target_ids_idx: Single-element array holding the number of
+        off-targets found, more than the length of ``off_target_ids`` if
+        some of their ids were not stored
+    :param off_target_ids: The array to store the off-target ids, further
+        off-targets are counted but not stored
     :param offset: The offset of the guides default 0
+    :param pam_on: The PAM flag of the guides, see
+        :attr:`SearchParameters.pam_on`
     :return: None
     """
+    block_summary = cuda.shared.array(MAX_MISSMATCHES, dtype=numba.uint32)
+    if cuda.threadIdx.x < MAX_MISSMATCHES:
+        block_summary[cuda.threadIdx.x] = 0
+    cuda.syncthreads()
+
     index = cuda.grid(1)
     threads_per_grid = cuda.gridDim.x * cuda.blockDim.x
+    max_mismatches = summary.size
+    max_off_targets = off_target_ids.size
+    for i in range(index, guides.size, threads_per_grid):
+        guide = _read_guide(guides, i)
+        match = query_sequence ^ guide
+        if match & pam_on:
+            match = reverse_query_sequence ^ guide
+        match = match & ~pam_on
+        match = (match | (match >> 1)) & 0x5555555555555555
+        nos_off_targets = cuda.popc(match)
+        hit = guide != ERROR_STR and nos_off_targets < max_mismatches
+        if hit:
+            cuda.atomic.add(block_summary, nos_off_targets, 1)
+        idx = _reserve_off_target_slot(off_target_ids_idx, 0, hit)
+        if 0 <= idx < max_off_targets:
+            off_target_ids[idx] = offset + i + 1
+
+    cuda.syncthreads()
+    if cuda.threadIdx.x < max_mismatches:
+        cuda.atomic.add(
+            summary, cuda.threadIdx.x, block_summary[cuda.threadIdx.x]
+        )
+
+
+@cuda.jit
+def find_off_targets_batch_kernel(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    reverse_query_sequences: np.ndarray,
+    summaries: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64,
+) -> None:
+    """Find off-targets for a batch of query sequences using CUDA
+
+    Each block copies the queries, at most ``QUERY_BATCH_SIZE`` of them, to
+    shared memory and each thread checks its guides against every query, so
+    the guides are read from device memory once per batch. As in
+    :func:`find_off_targets_kernel` the summaries are counted per block in
+    shared memory and the ids are given their slots once per warp.
 
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param reverse_query_sequences: The array of reverse complements of the
+        query sequences
+    :param summaries: The 2D array to store the mismatch count summary of
+        each query, one row per query, with a column per mismatch count
+        below the limit
+    :param off_target_ids_idx: The array holding the number of off-targets
+        found for each query
+    :param off_target_ids: The 2D array to store the off-target ids of each
+        query, one row per query. Ids beyond the row length are counted in
+        ``off_target_ids_idx`` but not stored
+    :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, see
+        :attr:`SearchParameters.pam_on`
+    :return: None
+    """
+    queries = cuda.shared.array(QUERY_BATCH_SIZE, dtype=numba.uint64)
+    reverse_queries = cuda.shared.array(QUERY_BATCH_SIZE, dtype=numba.uint64)
+    block_summaries = cuda.shared.array(
+        (QUERY_BATCH_SIZE, MAX_MISSMATCHES), dtype=numba.uint32
+    )
+    for q in range(cuda.threadIdx.x, query_sequences.size, cuda.blockDim.x):
+        queries[q] = query_sequences[q]
+        reverse_queries[q] = reverse_query_sequences[q]
+        for mismatches in range(MAX_MISSMATCHES):
+            block_summaries[q, mismatches] = 0
+    cuda.syncthreads()
+
+    max_mismatches = summaries.shape[1]
+    max_off_targets = off_target_ids.shape[1]
+    index = cuda.grid(1)
+    threads_per_grid = cuda.gridDim.x * cuda.blockDim.x
     for i in range(index, guides.size, threads_per_grid):
-        if index < guides.size:
-            if guides[i] == ERROR_STR:
-                continue
-            match = query_sequence ^ guides[i]
-            if match & PAM_ON:
-                match = reverse_query_sequence ^ guides[i]
-            match = match & PAM_OFF
+        guide = _read_guide(guides, i)
+        for q in range(query_sequences.size):
+            match = queries[q] ^ guide
+            if match & pam_on:
+                match = reverse_queries[q] ^ guide
+            match = match & ~pam_on
             match = (match | (match >> 1)) & 0x5555555555555555
-            nos_off_targets = cuda.libdevice.popcll(match)
-            if nos_off_targets < MAX_MISSMATCHES:
-                cuda.atomic.add(summary, nos_off_targets, 1)
-                idx = cuda.atomic.add(off_target_ids_idx, 0, 1)
-                cuda.atomic.add(off_target_ids, idx, offset + i + 1)
+            nos_off_targets = cuda.popc(match)
+            hit = guide != ERROR_STR and nos_off_targets < max_mismatches
+            if hit:
+                cuda.atomic.add(block_summaries, (q, nos_off_targets), 1)
+            idx = _reserve_off_target_slot(off_target_ids_idx, q, hit)
+            if 0 <= idx < max_off_targets:
+                off_target_ids[q, idx] = offset + np.uint64(i) + np.uint64(1)
+
+    cuda.syncthreads()
+    for q in range(cuda.threadIdx.x, query_sequences.size, cuda.blockDim.x):
+        for mismatches in range(max_mismatches):
+            if block_summaries[q, mismatches] > 0:
+                cuda.atomic.add(
+                    summaries,
+                    (q, mismatches),
+                    block_summaries[q, mismatches],
+                )
 
 
 @jit(nopython=True, parallel=True)
@@ -71,41 +350,805 @@ def find_off_targets_cpu(
     off_target_ids_idx: np.ndarray,
     off_target_ids: np.ndarray,
     offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
 ) -> None:
     """Find off-targets for a given query sequence using parallel CPU
 
     :param guides: The array of encoded gRNA sequences
     :param query_sequence: The query sequence
     :param reverse_query_sequence: The reverse complement of the query sequence
-    :param summary: The array to store the mismatch count summary
-    :param off_target_ids_idx: Single-element array holding the next write index
-    :param off_target_ids: The array to store the off-target ids
+    :param summary: The array to store the mismatch count summary, guides
+        with fewer mismatches than its length are off-targets
+    :param off_target_ids_idx: Single-element array holding the number of
+        off-targets found, more than the length of ``off_target_ids`` if
+        some of their ids were not stored
+    :param off_target_ids: The array to store the off-target ids, further
+        off-targets are counted but not stored
     :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
     :return: None
     """
-    match_counts = np.full(
-        guides.size, np.int64(MAX_MISSMATCHES), dtype=np.int64
+    max_mismatches = summary.size
+    # the counts are uint64 and comparing them with an int64 goes
+    # through float64
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.size
+    # each thread scans a contiguous chunk of the guides, keeping the first
+    # ids it finds, at most as many as can be stored
+    number_of_chunks = numba.get_num_threads()
+    chunk_summaries = np.zeros(
+        (number_of_chunks, max_mismatches), dtype=np.int64
     )
+    chunk_hits = np.zeros(number_of_chunks, dtype=np.int64)
+    chunk_ids = np.empty((number_of_chunks, max_off_targets), dtype=np.uint64)
 
-    for i in prange(guides.size):
-        if guides[i] == ERROR_STR:
-            continue
-        match = query_sequence ^ guides[i]
-        if match & PAM_ON:
-            match_r = reverse_query_sequence ^ guides[i]
-            nos_off_targets = _pop_count(match_r & PAM_OFF)
-        else:
-            nos_off_targets = _pop_count(match & PAM_OFF)
-        if nos_off_targets < MAX_MISSMATCHES:
-            match_counts[i] = np.int64(nos_off_targets)
+    for c in prange(number_of_chunks):
+        chunk_start = guides.size * c // number_of_chunks
+        chunk_end = guides.size * (c + 1) // number_of_chunks
+        hits = 0
+        for i in range(chunk_start, chunk_end):
+            guide = _read_guide(guides, i)
+            if guide == ERROR_STR:
+                continue
+            match = query_sequence ^ guide
+            if match & pam_on:
+                match = reverse_query_sequence ^ guide
+            nos_off_targets = _pop_count(match & ~pam_on)
+            if nos_off_targets < mismatch_limit:
+                chunk_summaries[c, nos_off_targets] += 1
+                if hits < max_off_targets:
+                    chunk_ids[c, hits] = offset + np.uint64(i) + np.uint64(1)
+                hits += 1
+        chunk_hits[c] = hits
+
+    # the hits of each chunk go after those of the chunks before it
+    idx = np.int64(off_target_ids_idx[0])
+    for c in range(number_of_chunks):
+        for m in range(max_mismatches):
+            summary[m] += chunk_summaries[c, m]
+        stored = min(chunk_hits[c], max(0, max_off_targets - idx))
+        for j in range(stored):
+            off_target_ids[idx + j] = chunk_ids[c, j]
+        idx += chunk_hits[c]
+    off_target_ids_idx[0] = idx
+
+
+@jit(nopython=True, parallel=True)
+def find_off_targets_cpu_batch(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    reverse_query_sequences: np.ndarray,
+    summaries: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Find off-targets for a batch of query sequences using parallel CPU
 
+    The guides are scanned in tiles of ``GUIDE_TILE_SIZE`` which stay in cache
+    while every query in the batch is checked against them, so the guides
+    array is only streamed from memory once per batch. Queries are spread
+    across threads, so a batch should hold at least as many queries as there
+    are threads (see :func:`find_off_targets_batch`).
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param reverse_query_sequences: The array of reverse complements of the
+        query sequences
+    :param summaries: The 2D array to store the mismatch count summary of
+        each query, one row per query, with a column per mismatch count
+        below the limit
+    :param off_target_ids_idx: The array holding the number of off-targets
+        found for each query
+    :param off_target_ids: The 2D array to store the off-target ids of each
+        query, one row per query. Ids beyond the row length are counted in
+        ``off_target_ids_idx`` but not stored
+    :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
+    :return: None
+    """
+    max_mismatches = summaries.shape[1]
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.shape[1]
+    for tile_start in range(0, guides.size, GUIDE_TILE_SIZE):
+        tile_end = min(tile_start + GUIDE_TILE_SIZE, guides.size)
+        for q in prange(query_sequences.size):
+            query_sequence = query_sequences[q]
+            reverse_query_sequence = reverse_query_sequences[q]
+            for i in range(tile_start, tile_end):
+                guide = _read_guide(guides, i)
+                if guide == ERROR_STR:
+                    continue
+                match = query_sequence ^ guide
+                if match & pam_on:
+                    match = reverse_query_sequence ^ guide
+                nos_off_targets = _pop_count(match & ~pam_on)
+                if nos_off_targets < mismatch_limit:
+                    summaries[q, nos_off_targets] += 1
+                    idx = off_target_ids_idx[q]
+                    if idx < max_off_targets:
+                        off_target_ids[q, idx] = (
+                            offset + np.uint64(i) + np.uint64(1)
+                        )
+                    off_target_ids_idx[q] = idx + 1
+
+
+@jit(nopython=True)
+def _count_mismatches(
+    guides: np.ndarray,
+    query_sequence: np.uint64,
+    strand_flip: np.uint64,
+    mismatches: np.ndarray,
+    pam_on: np.uint64,
+) -> None:
+    """Count the mismatches of the query with each of a block of guides
+
+    Without branches, so that the loop is vectorised: the query is XORed
+    with the guide, and ``strand_flip`` (the query XOR its reverse
+    complement) is XORed in under a mask set when the PAMs differ, which
+    gives the guide XOR the reverse complement. Guides flagged with
+    ``ERROR_STR`` are given ``MAX_MISSMATCHES`` more mismatches.
+
+    :param guides: The block of guides
+    :param query_sequence: The query sequence
+    :param strand_flip: The query sequence XOR its reverse complement
+    :param mismatches: The array to store the mismatch count of each guide,
+        as long as the block
+    :param pam_on: The PAM flag of the guides
+    :return: None
+    """
+    pam_off = ~pam_on
+    pam_shift = _hardware_pop_count(pam_on - np.uint64(1))
     for i in range(guides.size):
-        mc = match_counts[i]
-        if mc < MAX_MISSMATCHES:
-            summary[mc] += 1
-            idx = off_target_ids_idx[0]
-            off_target_ids_idx[0] += 1
-            off_target_ids[idx] = offset + np.uint64(i) + np.uint64(1)
+        guide = _read_guide(guides, i)
+        match = query_sequence ^ guide
+        pam_differs = (match >> pam_shift) & np.uint64(1)
+        match ^= strand_flip & (np.uint64(0) - pam_differs)
+        match &= pam_off
+        match = (match | (match >> np.uint64(1))) & np.uint64(
+            0x5555555555555555
+        )
+        mismatches[i] = _hardware_pop_count(match) + np.uint64(
+            guide == ERROR_STR
+        ) * np.uint64(MAX_MISSMATCHES)
+
+
+@jit(nopython=True, parallel=True)
+def find_off_targets_cpu_simd(
+    guides: np.ndarray,
+    query_sequence: np.uint64,
+    reverse_query_sequence: np.uint64,
+    summary: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Find off-targets for a given query sequence using parallel CPU and
+    SIMD instructions
+
+    As :func:`find_off_targets_cpu`, except that the mismatches of each
+    block of ``GUIDE_BLOCK_SIZE`` guides are counted first, with
+    :func:`_count_mismatches`, and the block is then checked for hits.
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequence: The query sequence
+    :param reverse_query_sequence: The reverse complement of the query sequence
+    :param summary: The array to store the mismatch count summary, guides
+        with fewer mismatches than its length are off-targets
+    :param off_target_ids_idx: Single-element array holding the number of
+        off-targets found, more than the length of ``off_target_ids`` if
+        some of their ids were not stored
+    :param off_target_ids: The array to store the off-target ids, further
+        off-targets are counted but not stored
+    :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
+    :return: None
+    """
+    max_mismatches = summary.size
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.size
+    strand_flip = query_sequence ^ reverse_query_sequence
+    number_of_chunks = numba.get_num_threads()
+    chunk_summaries = np.zeros(
+        (number_of_chunks, max_mismatches), dtype=np.int64
+    )
+    chunk_hits = np.zeros(number_of_chunks, dtype=np.int64)
+    chunk_ids = np.empty((number_of_chunks, max_off_targets), dtype=np.uint64)
+
+    for c in prange(number_of_chunks):
+        chunk_start = guides.size * c // number_of_chunks
+        chunk_end = guides.size * (c + 1) // number_of_chunks
+        mismatches = np.empty(GUIDE_BLOCK_SIZE, dtype=np.uint64)
+        hits = 0
+        for block_start in range(chunk_start, chunk_end, GUIDE_BLOCK_SIZE):
+            block_end = min(block_start + GUIDE_BLOCK_SIZE, chunk_end)
+            _count_mismatches(
+                guides[block_start:block_end],
+                query_sequence,
+                strand_flip,
+                mismatches,
+                pam_on,
+            )
+            for j in range(block_end - block_start):
+                if mismatches[j] < mismatch_limit:
+                    chunk_summaries[c, mismatches[j]] += 1
+                    if hits < max_off_targets:
+                        chunk_ids[c, hits] = (
+                            offset + np.uint64(block_start + j) + np.uint64(1)
+                        )
+                    hits += 1
+        chunk_hits[c] = hits
+
+    # the hits of each chunk go after those of the chunks before it
+    idx = np.int64(off_target_ids_idx[0])
+    for c in range(number_of_chunks):
+        for m in range(max_mismatches):
+            summary[m] += chunk_summaries[c, m]
+        stored = min(chunk_hits[c], max(0, max_off_targets - idx))
+        for j in range(stored):
+            off_target_ids[idx + j] = chunk_ids[c, j]
+        idx += chunk_hits[c]
+    off_target_ids_idx[0] = idx
+
+
+@jit(nopython=True, parallel=True)
+def find_off_targets_cpu_simd_batch(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    reverse_query_sequences: np.ndarray,
+    summaries: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Find off-targets for a batch of query sequences using parallel CPU
+    and SIMD instructions
+
+    As :func:`find_off_targets_cpu_batch`, counting the mismatches of each
+    block of ``GUIDE_BLOCK_SIZE`` guides of a tile with
+    :func:`_count_mismatches` before checking the block for hits.
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param reverse_query_sequences: The array of reverse complements of the
+        query sequences
+    :param summaries: The 2D array to store the mismatch count summary of
+        each query, one row per query, with a column per mismatch count
+        below the limit
+    :param off_target_ids_idx: The array holding the number of off-targets
+        found for each query
+    :param off_target_ids: The 2D array to store the off-target ids of each
+        query, one row per query. Ids beyond the row length are counted in
+        ``off_target_ids_idx`` but not stored
+    :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
+    :return: None
+    """
+    max_mismatches = summaries.shape[1]
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.shape[1]
+    mismatches = np.empty(
+        (query_sequences.size, GUIDE_BLOCK_SIZE), dtype=np.uint64
+    )
+    for tile_start in range(0, guides.size, GUIDE_TILE_SIZE):
+        tile_end = min(tile_start + GUIDE_TILE_SIZE, guides.size)
+        for q in prange(query_sequences.size):
+            query_sequence = query_sequences[q]
+            strand_flip = query_sequence ^ reverse_query_sequences[q]
+            for block_start in range(tile_start, tile_end, GUIDE_BLOCK_SIZE):
+                block_end = min(block_start + GUIDE_BLOCK_SIZE, tile_end)
+                _count_mismatches(
+                    guides[block_start:block_end],
+                    query_sequence,
+                    strand_flip,
+                    mismatches[q],
+                    pam_on,
+                )
+                for j in range(block_end - block_start):
+                    if mismatches[q, j] < mismatch_limit:
+                        summaries[q, mismatches[q, j]] += 1
+                        idx = off_target_ids_idx[q]
+                        if idx < max_off_targets:
+                            off_target_ids[q, idx] = (
+                                offset
+                                + np.uint64(block_start + j)
+                                + np.uint64(1)
+                            )
+                        off_target_ids_idx[q] = idx + 1
+
+
+def find_off_targets_batch(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    simd: bool = False,
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for several query sequences using parallel CPU
+
+    Batches with at least as many queries as there are threads go through
+    :func:`find_off_targets_cpu_batch`, smaller ones are searched one query
+    at a time with :func:`find_off_targets_cpu` so that all threads are used.
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param offset: The offset of the guides, default 0
+    :param simd: Use :func:`find_off_targets_cpu_simd_batch` and
+        :func:`find_off_targets_cpu_simd` instead, default False
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :return: A tuple of the summaries (one row per query), the number of
+        off-targets found for each query, which is more than
+        ``parameters.max_off_targets`` when not all their ids were stored,
+        and the off-target ids (one row per query, at most
+        ``parameters.max_off_targets`` of them)
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    results = _empty_results(query_sequences.size, parameters)
+    _add_off_targets_cpu(
+        guides,
+        query_sequences,
+        _reverse_complements(query_sequences, parameters.guide_length),
+        *results,
+        np.uint64(offset),
+        simd,
+        parameters.pam_on,
+    )
+    return results
+
+
+def find_off_targets_streamed(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    chunk_size: int,
+    offset: np.uint64 = np.uint64(0),
+    simd: bool = False,
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for several query sequences using parallel CPU,
+    reading the guides in chunks
+
+    Each chunk of :func:`~py_crispr_analyser.utils.iterate_guides` is
+    searched as in :func:`find_off_targets_batch`, adding to the same
+    results, so memory-mapped guides larger than RAM are searched with at
+    most ``chunk_size`` of them resident.
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param chunk_size: The maximum number of guides per chunk
+    :param offset: The offset of the guides, default 0
+    :param simd: Use the SIMD kernels, see :func:`find_off_targets_batch`,
+        default False
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :return: A tuple of the summaries, the number of off-targets found and
+        the off-target ids as returned by :func:`find_off_targets_batch`
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    reverse_query_sequences = _reverse_complements(
+        query_sequences, parameters.guide_length
+    )
+    results = _empty_results(query_sequences.size, parameters)
+    for start, chunk in iterate_guides(guides, chunk_size):
+        _add_off_targets_cpu(
+            chunk,
+            query_sequences,
+            reverse_query_sequences,
+            *results,
+            np.uint64(offset) + np.uint64(start),
+            simd,
+            parameters.pam_on,
+        )
+    return results
+
+
+def find_off_targets_numpy(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    chunk_size: int = NUMPY_CHUNK_SIZE,
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for several query sequences with NumPy alone
+
+    Each query is compared with a chunk of guides at a time using array
+    operations, so no kernels are compiled. It is much slower than
+    :func:`find_off_targets_batch` and meant as a fallback and a reference.
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param offset: The offset of the guides, default 0
+    :param chunk_size: The number of guides compared at once, default
+        ``NUMPY_CHUNK_SIZE``
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :return: A tuple of the summaries, the number of off-targets found and
+        the off-target ids as returned by :func:`find_off_targets_batch`
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    reverse_query_sequences = _reverse_complements(
+        query_sequences, parameters.guide_length
+    )
+    summaries, off_target_ids_idx, off_target_ids = _empty_results(
+        query_sequences.size, parameters
+    )
+    max_mismatches = parameters.max_mismatches
+    max_off_targets = parameters.max_off_targets
+    for start, chunk in iterate_guides(guides, chunk_size):
+        chunk = unpack_guides(np.asarray(chunk))
+        valid = chunk != ERROR_STR
+        for q in range(query_sequences.size):
+            match = query_sequences[q] ^ chunk
+            reverse = (match & parameters.pam_on) != 0
+            match[reverse] = reverse_query_sequences[q] ^ chunk[reverse]
+            match &= ~parameters.pam_on
+            # one bit per mismatched base, as in _pop_count
+            match_counts = np.bitwise_count(
+                (match | (match >> np.uint64(1)))
+                & np.uint64(0x5555555555555555)
+            )
+            hits = np.flatnonzero(valid & (match_counts < max_mismatches))
+            summaries[q] += np.bincount(
+                match_counts[hits], minlength=max_mismatches
+            ).astype(np.uint32)
+            stored = min(int(off_target_ids_idx[q]), max_off_targets)
+            to_store = min(hits.size, max_off_targets - stored)
+            off_target_ids[q, stored:][:to_store] = (
+                np.uint64(offset) + np.uint64(start + 1) + hits[:to_store]
+            )
+            off_target_ids_idx[q] += hits.size
+    return summaries, off_target_ids_idx, off_target_ids
+
+
+def _empty_results(
+    number_of_queries: int, parameters: SearchParameters = DEFAULT_PARAMETERS
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Allocate the summaries, off-target counts and off-target ids of a
+    batch of queries, sized by the mismatch limit and off-target cap"""
+    summaries = np.zeros(
+        (number_of_queries, parameters.max_mismatches), dtype=np.uint32
+    )
+    off_target_ids_idx = np.zeros(number_of_queries, dtype=np.uint32)
+    off_target_ids = np.zeros(
+        (number_of_queries, parameters.max_off_targets), dtype=np.uint32
+    )
+    return summaries, off_target_ids_idx, off_target_ids
+
+
+def _reverse_complements(
+    query_sequences: np.ndarray, guide_length: int = GUIDE_LENGTH
+) -> np.ndarray:
+    """Reverse complement each of the query sequences"""
+    return np.array(
+        [reverse_complement_binary(q, guide_length) for q in query_sequences],
+        dtype=np.uint64,
+    )
+
+
+def _add_off_targets_cpu(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    reverse_query_sequences: np.ndarray,
+    summaries: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    simd: bool = False,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Add the off-targets of the queries among the guides to the results,
+    choosing the CPU kernel as described in :func:`find_off_targets_batch`
+    """
+    if simd:
+        batch_kernel = find_off_targets_cpu_simd_batch
+        kernel = find_off_targets_cpu_simd
+    else:
+        batch_kernel = find_off_targets_cpu_batch
+        kernel = find_off_targets_cpu
+    if query_sequences.size >= numba.get_num_threads():
+        batch_kernel(
+            guides,
+            query_sequences,
+            reverse_query_sequences,
+            summaries,
+            off_target_ids_idx,
+            off_target_ids,
+            offset,
+            pam_on,
+        )
+    else:
+        for q in range(query_sequences.size):
+            kernel(
+                guides,
+                query_sequences[q],
+                reverse_query_sequences[q],
+                summaries[q],
+                off_target_ids_idx[q:],
+                off_target_ids[q],
+                offset,
+                pam_on,
+            )
+
+
+@jit(nopython=True)
+def find_off_targets_seeded(
+    guides: np.ndarray,
+    seed_shifts: np.ndarray,
+    seed_masks: np.ndarray,
+    seed_offsets: np.ndarray,
+    seed_postings: np.ndarray,
+    query_sequence: np.uint64,
+    reverse_query_sequence: np.uint64,
+    summary: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Find off-targets for a given query sequence using a seed index
+
+    Only the guides sharing a seed key with the query or its reverse
+    complement are checked, which by the pigeonhole principle includes every
+    guide with fewer mismatches than there are seed segments. The seed index
+    must therefore have at least as many segments as the mismatch limit, the
+    number of columns of ``summary`` (see :mod:`py_crispr_analyser.seed`).
+
+    :param guides: The array of encoded gRNA sequences
+    :param seed_shifts: The bit shift of each seed segment
+    :param seed_masks: The bit mask of each seed segment
+    :param seed_offsets: The start of each seed key in the postings, one row
+        per segment
+    :param seed_postings: The guide indices sorted by seed key, one row per
+        segment
+    :param query_sequence: The query sequence
+    :param reverse_query_sequence: The reverse complement of the query sequence
+    :param summary: The array to store the mismatch count summary
+    :param off_target_ids_idx: Single-element array holding the number of
+        off-targets found
+    :param off_target_ids: The array to store the off-target ids, further
+        off-targets are counted but not stored
+    :param offset: The offset of the guides, default 0
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
+    :return: None
+    """
+    max_mismatches = summary.size
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.size
+    pam_off = ~pam_on
+    for strand in range(2):
+        sequence = query_sequence if strand == 0 else reverse_query_sequence
+        pam_flag = np.uint64(1) if sequence & pam_on else np.uint64(0)
+        for segment in range(seed_shifts.size):
+            bases = (sequence >> seed_shifts[segment]) & seed_masks[segment]
+            key = (bases << np.uint64(1)) | pam_flag
+            for p in range(
+                seed_offsets[segment, key], seed_offsets[segment, key + 1]
+            ):
+                i = seed_postings[segment, p]
+                guide = _read_guide(guides, i)
+                match = sequence ^ guide
+                # skip guides already found through an earlier segment
+                seen = False
+                for earlier in range(segment):
+                    earlier_match = match >> seed_shifts[earlier]
+                    if (earlier_match & seed_masks[earlier]) == 0:
+                        seen = True
+                        break
+                if seen:
+                    continue
+                nos_off_targets = _pop_count(match & pam_off)
+                if nos_off_targets < mismatch_limit:
+                    summary[nos_off_targets] += 1
+                    idx = off_target_ids_idx[0]
+                    if idx < max_off_targets:
+                        off_target_ids[idx] = (
+                            offset + np.uint64(i) + np.uint64(1)
+                        )
+                    off_target_ids_idx[0] = idx + 1
+
+
+def find_off_targets_seed_index(
+    guides: np.ndarray,
+    seed_index: SeedIndex,
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for several query sequences using a seed index
+
+    :param guides: The array of encoded gRNA sequences
+    :param seed_index: The seed index of the guides
+    :param query_sequences: The array of query sequences
+    :param offset: The offset of the guides, default 0
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :raises ValueError: If the seed index was not built from the guides
+    :raises ValueError: If the seed index has too few segments
+    :raises ValueError: If the seed index has another guide length
+    :return: A tuple of the summaries (one row per query), the number of
+        off-targets found for each query, which is more than
+        ``parameters.max_off_targets`` when not all their ids were stored,
+        and the off-target ids (one row per query, at most
+        ``parameters.max_off_targets`` of them)
+    """
+    if seed_index.number_of_guides != guides.size:
+        raise ValueError("Seed index does not match the guides")
+    if seed_index.segments < parameters.max_mismatches:
+        raise ValueError(
+            f"Seed index needs at least {parameters.max_mismatches} segments"
+        )
+    if seed_index.guide_length != parameters.guide_length:
+        raise ValueError("Seed index does not match the guide length")
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    summaries, off_target_ids_idx, off_target_ids = _empty_results(
+        query_sequences.size, parameters
+    )
+    for q in range(query_sequences.size):
+        find_off_targets_seeded(
+            guides,
+            seed_index.shifts,
+            seed_index.masks,
+            seed_index.offsets,
+            seed_index.postings,
+            query_sequences[q],
+            reverse_complement_binary(
+                query_sequences[q], parameters.guide_length
+            ),
+            summaries[q],
+            off_target_ids_idx[q:],
+            off_target_ids[q],
+            np.uint64(offset),
+            parameters.pam_on,
+        )
+    return summaries, off_target_ids_idx, off_target_ids
+
+
+@jit(nopython=True, parallel=True)
+def find_off_targets_plane(
+    guides: np.ndarray,
+    ids: np.ndarray,
+    query_sequences: np.ndarray,
+    summaries: np.ndarray,
+    off_target_ids_idx: np.ndarray,
+    off_target_ids: np.ndarray,
+    offset: np.uint64,
+    pam_on: np.uint64 = PAM_ON,
+) -> None:
+    """Find off-targets for a batch of query sequences in a plane of a
+    strand index using parallel CPU
+
+    Every guide of a plane has its PAM on the same side, so each query is
+    given already facing that side (see
+    :func:`find_off_targets_strand_index`) and is compared to the guides
+    without checking their PAM. The plane is split into as many contiguous
+    parts as it takes to give every thread a query and a part, and the parts
+    are scanned in tiles of ``GUIDE_TILE_SIZE`` shared by all the queries.
+
+    :param guides: The guides of the plane
+    :param ids: The 0-based index in the guides file of each guide
+    :param query_sequences: The array of query sequences, facing the plane
+    :param summaries: The 2D array to store the mismatch count summary of
+        each query, one row per query
+    :param off_target_ids_idx: The array holding the number of off-targets
+        found for each query
+    :param off_target_ids: The 2D array to store the off-target ids of each
+        query, one row per query, in the order of the guides file. Ids beyond
+        the row length are counted in ``off_target_ids_idx`` but not stored
+    :param offset: The offset of the guides
+    :param pam_on: The PAM flag of the guides, default ``PAM_ON``
+    :return: None
+    """
+    max_mismatches = summaries.shape[1]
+    mismatch_limit = np.uint64(max_mismatches)
+    max_off_targets = off_target_ids.shape[1]
+    pam_off = ~pam_on
+    number_of_queries = query_sequences.size
+    parts = max(1, numba.get_num_threads() // max(1, number_of_queries))
+    part_size = (guides.size + parts - 1) // parts
+    rows = number_of_queries * parts
+    row_summaries = np.zeros((rows, max_mismatches), dtype=np.int64)
+    row_hits = np.zeros(rows, dtype=np.int64)
+    row_ids = np.empty((rows, max_off_targets), dtype=np.uint32)
+
+    for tile_start in range(0, part_size, GUIDE_TILE_SIZE):
+        for r in prange(rows):
+            query_sequence = query_sequences[r // parts]
+            part_start = (r % parts) * part_size
+            part_end = min(part_start + part_size, guides.size)
+            start = part_start + tile_start
+            end = min(start + GUIDE_TILE_SIZE, part_end)
+            hits = row_hits[r]
+            for i in range(start, end):
+                mismatches = _pop_count((query_sequence ^ guides[i]) & pam_off)
+                if mismatches < mismatch_limit:
+                    row_summaries[r, mismatches] += 1
+                    if hits < max_off_targets:
+                        row_ids[r, hits] = ids[i]
+                    hits += 1
+            row_hits[r] = hits
+
+    # the hits of each part go after those of the parts before it
+    for q in prange(number_of_queries):
+        idx = np.int64(off_target_ids_idx[q])
+        for r in range(q * parts, (q + 1) * parts):
+            for m in range(max_mismatches):
+                summaries[q, m] += row_summaries[r, m]
+            stored = min(row_hits[r], max(0, max_off_targets - idx))
+            for j in range(stored):
+                off_target_ids[q, idx + j] = (
+                    offset + np.uint64(row_ids[r, j]) + np.uint64(1)
+                )
+            idx += row_hits[r]
+        off_target_ids_idx[q] = idx
+
+
+def find_off_targets_strand_index(
+    strand_index: StrandIndex,
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for several query sequences using a strand index
+
+    Each plane is searched with :func:`find_off_targets_plane` using the
+    query, or its reverse complement, whichever has its PAM on the side of
+    the plane, which is the choice the other kernels make for each guide.
+    The ids of the two planes are then merged back into the order of the
+    guides file, so the results are those of :func:`find_off_targets_batch`.
+
+    :param strand_index: The strand index of the guides
+    :param query_sequences: The array of query sequences
+    :param offset: The offset of the guides, default 0
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :return: A tuple of the summaries (one row per query), the number of
+        off-targets found for each query, which is more than
+        ``parameters.max_off_targets`` when not all their ids were stored,
+        and the off-target ids (one row per query, at most
+        ``parameters.max_off_targets`` of them)
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    reverse_query_sequences = _reverse_complements(
+        query_sequences, parameters.guide_length
+    )
+    pam_right = (query_sequences & parameters.pam_on) != 0
+    planes = []
+    for plane in range(2):
+        results = _empty_results(query_sequences.size, parameters)
+        find_off_targets_plane(
+            strand_index.guides[plane],
+            strand_index.ids[plane],
+            np.where(
+                pam_right == bool(plane),
+                query_sequences,
+                reverse_query_sequences,
+            ),
+            *results,
+            np.uint64(offset),
+            parameters.pam_on,
+        )
+        planes.append(results)
+    (left, left_idx, left_ids), (right, right_idx, right_ids) = planes
+
+    # the first ids of each plane include the first ids of both together
+    off_target_ids = np.concatenate((left_ids, right_ids), axis=1)
+    max_off_targets = parameters.max_off_targets
+    columns = np.arange(max_off_targets)
+    unused = np.concatenate(
+        (
+            columns >= left_idx[:, np.newaxis],
+            columns >= right_idx[:, np.newaxis],
+        ),
+        axis=1,
+    )
+    off_target_ids[unused] = np.iinfo(np.uint32).max
+    off_target_ids = np.sort(off_target_ids, axis=1)[:, :max_off_targets]
+    off_target_ids_idx = left_idx + right_idx
+    off_target_ids[columns >= off_target_ids_idx[:, np.newaxis]] = 0
+    return left + right, off_target_ids_idx, off_target_ids
 
 
 @jit
@@ -152,13 +1195,305 @@ def _pop_count(x: np.uint64) -> np.uint64:
     the 4 will change pam_right to 0 so it doesnt get counted.
     5 is 0101, 4 is 0100
 
+    The folded bits are then counted with :func:`_hardware_pop_count`.
+
     :param x: The integer to count the bits of
     :return: The number of bits set in the integer
     """
-    x = np.uint64((x | (x >> 1)) & 0x5555555555555555)
-    x = (x & 0x3333333333333333) + ((x >> 2) & 0x3333333333333333)  # type: ignore
-    x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0F
-    return (0x0101010101010101 * x) >> 56  # type: ignore
+    x = np.uint64(x)
+    x = (x | (x >> np.uint64(1))) & np.uint64(0x5555555555555555)
+    return _hardware_pop_count(x)
+
+
+@intrinsic
+def _hardware_pop_count(typingctx, x):
+    """Count the bits set in a uint64 with LLVM's ``ctpop``, which compiles
+    to the POPCNT instruction, or VPOPCNTQ when a loop is vectorised, if the
+    CPU has them
+
+    Unlike :func:`_pop_count` the bits are not folded first.
+    """
+    signature = numba.types.uint64(numba.types.uint64)
+
+    def codegen(context, builder, signature, args):
+        return builder.ctpop(args[0])
+
+    return signature, codegen
+
+
+def _device_results(parameters: SearchParameters) -> dict:
+    """Allocate the result buffers of :class:`DeviceGuides` and
+    :class:`DeviceStream`, on the current GPU and in pinned host memory, for
+    a batch of queries searched with the given parameters"""
+    summaries_shape = (QUERY_BATCH_SIZE, parameters.max_mismatches)
+    off_target_ids_shape = (QUERY_BATCH_SIZE, parameters.max_off_targets)
+    return dict(
+        summaries=cuda.device_array(summaries_shape, dtype=np.uint32),
+        off_target_ids_idx=cuda.device_array(QUERY_BATCH_SIZE, dtype=np.uint32),
+        off_target_ids=cuda.device_array(off_target_ids_shape, dtype=np.uint32),
+        host_summaries=cuda.pinned_array(summaries_shape, dtype=np.uint32),
+        host_off_target_ids_idx=cuda.pinned_array(
+            QUERY_BATCH_SIZE, dtype=np.uint32
+        ),
+        host_off_target_ids=cuda.pinned_array(
+            off_target_ids_shape, dtype=np.uint32
+        ),
+    )
+
+
+def _fit_device_results(
+    buffers: typing.Union[DeviceGuides, DeviceStream],
+    parameters: SearchParameters,
+) -> None:
+    """Reallocate the result buffers if they were sized for another mismatch
+    limit or off-target cap, the kernels taking both from the buffers"""
+    if buffers.summaries.shape[1] != parameters.max_mismatches or (
+        buffers.off_target_ids.shape[1] != parameters.max_off_targets
+    ):
+        for name, buffer in _device_results(parameters).items():
+            setattr(buffers, name, buffer)
+
+
+def to_device_guides(
+    guides: np.ndarray, number_of_shards: typing.Optional[int] = None
+) -> list[DeviceGuides]:
+    """Split the guides into shards, copy them to the GPUs and allocate the
+    buffers for the results
+
+    :param guides: The array of encoded gRNA sequences
+    :param number_of_shards: The number of shards, spread over the GPUs in
+        turn. Default is None for one shard per GPU.
+    :return: A list of DeviceGuides objects, one per shard
+    """
+    number_of_devices = len(cuda.gpus)
+    if number_of_shards is None:
+        number_of_shards = number_of_devices
+    device_guides = []
+    for shard in range(number_of_shards):
+        start = guides.size * shard // number_of_shards
+        end = guides.size * (shard + 1) // number_of_shards
+        device_id = shard % number_of_devices
+        with cuda.gpus[device_id]:
+            device_guides.append(
+                DeviceGuides(
+                    guides=cuda.to_device(guides[start:end]),
+                    **_device_results(DEFAULT_PARAMETERS),
+                    blocks_per_grid=max(
+                        1,
+                        (end - start + THREADS_PER_BLOCK - 1)
+                        // THREADS_PER_BLOCK,
+                    ),
+                    offset=start,
+                    device_id=device_id,
+                )
+            )
+    return device_guides
+
+
+def find_off_targets_device_batch(
+    device_guides: list[DeviceGuides],
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for a batch of query sequences on the GPUs
+
+    The batch is searched with one launch of
+    :func:`find_off_targets_batch_kernel` per shard. All shards are launched
+    before any results are copied back so the GPUs run concurrently, then
+    the summaries and ids of the shards are merged. The result buffers are
+    reallocated if they were sized for other parameters.
+
+    :param device_guides: The shards of the guides and their result buffers
+    :param query_sequences: The array of query sequences, at most
+        ``QUERY_BATCH_SIZE`` of them
+    :param offset: The offset of the guides, default 0
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :raises ValueError: If there are more than ``QUERY_BATCH_SIZE`` queries
+    :return: A tuple of the summaries (one row per query), the number of
+        off-targets found for each query, which is more than
+        ``parameters.max_off_targets`` when not all their ids were stored,
+        and the off-target ids (one row per query, at most
+        ``parameters.max_off_targets`` of them)
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    number_of_queries = query_sequences.size
+    if number_of_queries > QUERY_BATCH_SIZE:
+        raise ValueError(
+            f"At most {QUERY_BATCH_SIZE} queries can be searched at once"
+        )
+    reverse_query_sequences = _reverse_complements(
+        query_sequences, parameters.guide_length
+    )
+    rows = slice(0, number_of_queries)
+
+    for shard in device_guides:
+        with cuda.gpus[shard.device_id]:
+            _fit_device_results(shard, parameters)
+            # only the counts need clearing, ids past them are never read
+            shard.host_summaries[rows] = 0
+            shard.host_off_target_ids_idx[rows] = 0
+            shard.summaries[rows].copy_to_device(shard.host_summaries[rows])
+            shard.off_target_ids_idx[rows].copy_to_device(
+                shard.host_off_target_ids_idx[rows]
+            )
+            find_off_targets_batch_kernel[
+                shard.blocks_per_grid, THREADS_PER_BLOCK
+            ](
+                shard.guides,
+                cuda.to_device(query_sequences),
+                cuda.to_device(reverse_query_sequences),
+                shard.summaries[rows],
+                shard.off_target_ids_idx[rows],
+                shard.off_target_ids[rows],
+                np.uint64(offset) + np.uint64(shard.offset),
+                parameters.pam_on,
+            )
+
+    max_off_targets = parameters.max_off_targets
+    summaries, off_target_ids_idx, off_target_ids = _empty_results(
+        number_of_queries, parameters
+    )
+    for shard in device_guides:
+        with cuda.gpus[shard.device_id]:
+            shard.summaries[rows].copy_to_host(shard.host_summaries[rows])
+            shard.off_target_ids_idx[rows].copy_to_host(
+                shard.host_off_target_ids_idx[rows]
+            )
+            shard.off_target_ids[rows].copy_to_host(
+                shard.host_off_target_ids[rows]
+            )
+        for q in range(number_of_queries):
+            stored = min(off_target_ids_idx[q], max_off_targets)
+            found = min(shard.host_off_target_ids_idx[q], max_off_targets)
+            found = min(found, max_off_targets - stored)
+            off_target_ids[q, stored:][:found] = shard.host_off_target_ids[
+                q, :found
+            ]
+        summaries += shard.host_summaries[rows]
+        off_target_ids_idx += shard.host_off_target_ids_idx[rows]
+    return summaries, off_target_ids_idx, off_target_ids
+
+
+def to_device_stream(
+    chunk_size: int, dtype: np.dtype = np.dtype(np.uint64)
+) -> DeviceStream:
+    """Allocate the buffers to stream the guides through the current GPU
+
+    :param chunk_size: The number of guides per chunk. Two chunks are held
+        on the GPU and two in pinned host memory.
+    :param dtype: The type of the guides, default uint64
+    :raises ValueError: If the chunk size is not positive
+    :return: A DeviceStream object
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    return DeviceStream(
+        streams=[cuda.stream(), cuda.stream()],
+        host_chunks=[
+            cuda.pinned_array(chunk_size, dtype=dtype) for _ in range(2)
+        ],
+        device_chunks=[
+            cuda.device_array(chunk_size, dtype=dtype) for _ in range(2)
+        ],
+        **_device_results(DEFAULT_PARAMETERS),
+        chunk_size=chunk_size,
+    )
+
+
+def find_off_targets_device_streamed(
+    device_stream: DeviceStream,
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    offset: np.uint64 = np.uint64(0),
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for a batch of query sequences on the GPU, streaming
+    the guides through it in chunks
+
+    Each chunk of :func:`~py_crispr_analyser.utils.iterate_guides` is copied
+    into a pinned buffer and on to the GPU asynchronously, then searched by
+    :func:`find_off_targets_batch_kernel` on the stream of its buffer. While
+    one chunk is searched the next is read and copied with the other
+    buffer. The kernels add to the same result buffers, offset by the index
+    of the first guide of their chunk.
+
+    :param device_stream: The double buffers and result buffers
+    :param guides: The array of encoded gRNA sequences, usually
+        memory-mapped
+    :param query_sequences: The array of query sequences, at most
+        ``QUERY_BATCH_SIZE`` of them
+    :param offset: The offset of the guides, default 0
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :raises ValueError: If there are more than ``QUERY_BATCH_SIZE`` queries
+    :return: A tuple of the summaries, the number of off-targets found and
+        the off-target ids as returned by :func:`find_off_targets_device_batch`
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    number_of_queries = query_sequences.size
+    if number_of_queries > QUERY_BATCH_SIZE:
+        raise ValueError(
+            f"At most {QUERY_BATCH_SIZE} queries can be searched at once"
+        )
+    rows = slice(0, number_of_queries)
+    _fit_device_results(device_stream, parameters)
+    device_stream.host_summaries[rows] = 0
+    device_stream.host_off_target_ids_idx[rows] = 0
+    device_stream.summaries[rows].copy_to_device(
+        device_stream.host_summaries[rows]
+    )
+    device_stream.off_target_ids_idx[rows].copy_to_device(
+        device_stream.host_off_target_ids_idx[rows]
+    )
+    device_query_sequences = cuda.to_device(query_sequences)
+    device_reverse_query_sequences = cuda.to_device(
+        _reverse_complements(query_sequences, parameters.guide_length)
+    )
+
+    for chunk_number, (start, chunk) in enumerate(
+        iterate_guides(guides, device_stream.chunk_size)
+    ):
+        buffer = chunk_number % 2
+        stream = device_stream.streams[buffer]
+        # the chunk before last must be searched before its buffers are reused
+        stream.synchronize()
+        host_chunk = device_stream.host_chunks[buffer][: chunk.size]
+        host_chunk[:] = chunk
+        device_chunk = device_stream.device_chunks[buffer][: chunk.size]
+        device_chunk.copy_to_device(host_chunk, stream=stream)
+        find_off_targets_batch_kernel[
+            max(1, (chunk.size + THREADS_PER_BLOCK - 1) // THREADS_PER_BLOCK),
+            THREADS_PER_BLOCK,
+            stream,
+        ](
+            device_chunk,
+            device_query_sequences,
+            device_reverse_query_sequences,
+            device_stream.summaries[rows],
+            device_stream.off_target_ids_idx[rows],
+            device_stream.off_target_ids[rows],
+            np.uint64(offset) + np.uint64(start),
+            parameters.pam_on,
+        )
+    for stream in device_stream.streams:
+        stream.synchronize()
+
+    device_stream.summaries[rows].copy_to_host(
+        device_stream.host_summaries[rows]
+    )
+    device_stream.off_target_ids_idx[rows].copy_to_host(
+        device_stream.host_off_target_ids_idx[rows]
+    )
+    device_stream.off_target_ids[rows].copy_to_host(
+        device_stream.host_off_target_ids[rows]
+    )
+    return (
+        device_stream.host_summaries[rows].copy(),
+        device_stream.host_off_target_ids_idx[rows].copy(),
+        device_stream.host_off_target_ids[rows].copy(),
+    )
 
 
 def reverse_complement_binary(sequence: np.uint64, size: int) -> np.uint64:
@@ -179,6 +1514,500 @@ def reverse_complement_binary(sequence: np.uint64, size: int) -> np.uint64:
     return np.uint64(reversed)
 
 
+class OffTargetBackend:
+    """An engine searching the guides for the off-targets of queries.
+
+    Backends are registered by ``name`` with :func:`register_backend` and
+    created with :func:`get_backend`. Subclasses implement :meth:`search`,
+    and :meth:`is_available` if they need more than the guides.
+    """
+
+    name = ""
+
+    def __init__(
+        self,
+        guides: np.ndarray,
+        seed_index: typing.Optional[SeedIndex] = None,
+        chunk_size: typing.Optional[int] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> None:
+        """Prepare the backend to search the guides
+
+        :param guides: The array of encoded gRNA sequences
+        :param seed_index: The seed index of the guides, default None
+        :param chunk_size: The most guides held in memory at once, default
+            None to hold them all
+        :param strand_index: The strand index of the guides, default None
+        """
+        self.guides = guides
+        self.seed_index = seed_index
+        self.chunk_size = chunk_size
+        self.strand_index = strand_index
+
+    @classmethod
+    def is_available(
+        cls,
+        seed_index: typing.Optional[SeedIndex] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> bool:
+        """Whether the backend can run here
+
+        :param seed_index: The seed index of the guides, default None
+        :param strand_index: The strand index of the guides, default None
+        :return: True if the backend can be created
+        """
+        return True
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the off-targets of a batch of query sequences
+
+        :param query_sequences: The array of query sequences, at most
+            ``QUERY_BATCH_SIZE`` of them
+        :param offset: The offset of the guides, default 0
+        :param parameters: The mismatch limit, off-target cap and guide
+            length, default ``DEFAULT_PARAMETERS``
+        :return: A tuple of the summaries, the number of off-targets found
+            and the off-target ids as returned by
+            :func:`find_off_targets_batch`
+        """
+        raise NotImplementedError
+
+    def warm_up(self) -> None:
+        """Compile the kernels of the backend before the first search
+
+        :return: None
+        """
+        if self.guides.size > 0:
+            self.search(unpack_guides(self.guides[:1]))
+
+
+BACKENDS: dict[str, type[OffTargetBackend]] = {}
+
+
+def register_backend(
+    backend: type[OffTargetBackend],
+) -> type[OffTargetBackend]:
+    """Register a backend class under its name, usable as a decorator
+
+    :param backend: The OffTargetBackend subclass
+    :return: The backend class
+    """
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+@register_backend
+class CpuBackend(OffTargetBackend):
+    """Search with the parallel Numba CPU kernels, see
+    :func:`find_off_targets_batch` and :func:`find_off_targets_streamed`"""
+
+    name = "cpu"
+    simd = False
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.chunk_size is not None:
+            return find_off_targets_streamed(
+                self.guides,
+                query_sequences,
+                self.chunk_size,
+                offset,
+                self.simd,
+                parameters,
+            )
+        return find_off_targets_batch(
+            self.guides, query_sequences, offset, self.simd, parameters
+        )
+
+    def warm_up(self) -> None:
+        if self.guides.size == 0:
+            return
+        # a single guide is enough to compile both CPU kernels
+        query_sequences = unpack_guides(
+            self.guides[np.zeros(numba.get_num_threads(), dtype=np.intp)]
+        )
+        find_off_targets_batch(
+            self.guides[:1], query_sequences[:1], simd=self.simd
+        )
+        find_off_targets_batch(self.guides[:1], query_sequences, simd=self.simd)
+
+
+@register_backend
+class SimdBackend(CpuBackend):
+    """Search with the parallel Numba CPU kernels counting the mismatches of
+    blocks of guides with SIMD instructions, see
+    :func:`find_off_targets_cpu_simd_batch`"""
+
+    name = "simd"
+    simd = True
+
+
+@register_backend
+class CudaBackend(OffTargetBackend):
+    """Search on the GPUs, see :func:`find_off_targets_device_batch` and
+    :func:`find_off_targets_device_streamed`
+
+    The guides are copied to the GPUs when the backend is created, or with a
+    chunk size streamed through the current GPU in two buffers of half the
+    chunk size each.
+    """
+
+    name = "cuda"
+
+    def __init__(
+        self,
+        guides: np.ndarray,
+        seed_index: typing.Optional[SeedIndex] = None,
+        chunk_size: typing.Optional[int] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> None:
+        super().__init__(guides, seed_index, chunk_size, strand_index)
+        self.device_guides = None
+        self.device_stream = None
+        if chunk_size is None:
+            memory_required = guides.nbytes / 1024 / 1024
+            print(
+                f"Requires {memory_required} MB of GPU memory, "
+                f"split over {len(cuda.gpus)} GPUs",
+                file=sys.stderr,
+            )
+            self.device_guides = to_device_guides(guides)
+        else:
+            print(
+                "Streaming the guides through the GPU in chunks of "
+                f"{chunk_size * guides.itemsize / 2 / 1024 / 1024} MB",
+                file=sys.stderr,
+            )
+            # the chunk size covers both buffers of the double buffering
+            self.device_stream = to_device_stream(
+                max(1, chunk_size // 2), guides.dtype
+            )
+
+    @classmethod
+    def is_available(
+        cls,
+        seed_index: typing.Optional[SeedIndex] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> bool:
+        return cuda.is_available()
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self.device_stream is not None:
+            return find_off_targets_device_streamed(
+                self.device_stream,
+                self.guides,
+                query_sequences,
+                offset,
+                parameters,
+            )
+        return find_off_targets_device_batch(
+            self.device_guides, query_sequences, offset, parameters
+        )
+
+
+@register_backend
+class NumpyBackend(OffTargetBackend):
+    """Search with NumPy alone, see :func:`find_off_targets_numpy`"""
+
+    name = "numpy"
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return find_off_targets_numpy(
+            self.guides,
+            query_sequences,
+            offset,
+            min(self.chunk_size or NUMPY_CHUNK_SIZE, NUMPY_CHUNK_SIZE),
+            parameters,
+        )
+
+
+@register_backend
+class SeedIndexBackend(OffTargetBackend):
+    """Search the guides sharing a seed with the query, see
+    :func:`find_off_targets_seed_index`"""
+
+    name = "seed"
+
+    @classmethod
+    def is_available(
+        cls,
+        seed_index: typing.Optional[SeedIndex] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> bool:
+        return seed_index is not None
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return find_off_targets_seed_index(
+            self.guides, self.seed_index, query_sequences, offset, parameters
+        )
+
+
+@register_backend
+class StrandIndexBackend(OffTargetBackend):
+    """Search each plane of a strand index without checking the PAM of the
+    guides, see :func:`find_off_targets_strand_index`"""
+
+    name = "strand"
+
+    def __init__(
+        self,
+        guides: np.ndarray,
+        seed_index: typing.Optional[SeedIndex] = None,
+        chunk_size: typing.Optional[int] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> None:
+        super().__init__(guides, seed_index, chunk_size, strand_index)
+        if strand_index is None:
+            raise ValueError("Strand backend needs a strand index")
+        if strand_index.number_of_guides != guides.size:
+            raise ValueError("Strand index does not match the guides")
+
+    @classmethod
+    def is_available(
+        cls,
+        seed_index: typing.Optional[SeedIndex] = None,
+        strand_index: typing.Optional[StrandIndex] = None,
+    ) -> bool:
+        return strand_index is not None
+
+    def search(
+        self,
+        query_sequences: np.ndarray,
+        offset: np.uint64 = np.uint64(0),
+        parameters: SearchParameters = DEFAULT_PARAMETERS,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return find_off_targets_strand_index(
+            self.strand_index, query_sequences, offset, parameters
+        )
+
+
+def calibrate_backend(
+    guides: np.ndarray,
+    seed_index: typing.Optional[SeedIndex] = None,
+    query_sequences: typing.Optional[np.ndarray] = None,
+    exclude: tuple[str, ...] = (),
+    strand_index: typing.Optional[StrandIndex] = None,
+) -> str:
+    """Pick the fastest backend available here
+
+    The seed backend is picked whenever there is a seed index, as its
+    search does not scale with the number of guides, then the strand
+    backend whenever there is a strand index, as it was built to be
+    searched. Otherwise every other available backend is timed searching
+    the first ``CALIBRATION_SIZE`` guides, after a first search to compile
+    its kernels.
+
+    :param guides: The array of encoded gRNA sequences
+    :param seed_index: The seed index of the guides, default None
+    :param query_sequences: The queries to time, default None for the first
+        guides
+    :param exclude: The names of backends not to pick, default none
+    :param strand_index: The strand index of the guides, default None
+    :raises ValueError: If no backend is available
+    :return: The name of the fastest backend
+    """
+    if seed_index is not None and "seed" not in exclude:
+        return "seed"
+    if strand_index is not None and "strand" not in exclude:
+        return "strand"
+    sample = np.asarray(guides[:CALIBRATION_SIZE])
+    if query_sequences is None:
+        query_sequences = unpack_guides(sample[:QUERY_BATCH_SIZE])
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    query_sequences = query_sequences[:QUERY_BATCH_SIZE]
+    timings = {}
+    for name, backend in BACKENDS.items():
+        if name in exclude or not backend.is_available():
+            continue
+        engine = backend(sample)
+        engine.search(query_sequences)
+        start = time.perf_counter()
+        engine.search(query_sequences)
+        timings[name] = time.perf_counter() - start
+    if len(timings) == 0:
+        raise ValueError("No backend is available")
+    return min(timings, key=timings.__getitem__)
+
+
+def get_backend(
+    name: str,
+    guides: np.ndarray,
+    seed_index: typing.Optional[SeedIndex] = None,
+    chunk_size: typing.Optional[int] = None,
+    query_sequences: typing.Optional[np.ndarray] = None,
+    exclude: tuple[str, ...] = (),
+    strand_index: typing.Optional[StrandIndex] = None,
+) -> OffTargetBackend:
+    """Create a registered backend to search the guides
+
+    :param name: The name of the backend, or ``auto`` to pick one with
+        :func:`calibrate_backend`
+    :param guides: The array of encoded gRNA sequences
+    :param seed_index: The seed index of the guides, default None
+    :param chunk_size: The most guides held in memory at once, default
+        None to hold them all
+    :param query_sequences: The queries to calibrate with, default None
+    :param exclude: The names of backends not to use, default none
+    :param strand_index: The strand index of the guides, default None
+    :raises ValueError: If the backend is unknown, disabled or not available
+    :return: The backend
+    """
+    if name == "auto":
+        name = calibrate_backend(
+            guides, seed_index, query_sequences, exclude, strand_index
+        )
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name}")
+    if name in exclude:
+        raise ValueError(f"Backend {name} is disabled")
+    if not BACKENDS[name].is_available(seed_index, strand_index):
+        raise ValueError(f"Backend {name} is not available")
+    return BACKENDS[name](guides, seed_index, chunk_size, strand_index)
+
+
+def select_backend(
+    name: str,
+    guides: np.ndarray,
+    seed_index: typing.Optional[SeedIndex] = None,
+    use_cuda: bool = True,
+    chunk_size: typing.Optional[int] = None,
+    strand_index: typing.Optional[StrandIndex] = None,
+) -> OffTargetBackend:
+    """Create the backend chosen on the command line
+
+    Without a name the seed backend is used if there is a seed index, then
+    the strand backend if there is a strand index, then the CUDA backend if
+    a GPU is available, otherwise the CPU backend.
+
+    :param name: The name of the backend, ``auto`` or "" for the default
+    :param guides: The array of encoded gRNA sequences
+    :param seed_index: The seed index of the guides, default None
+    :param use_cuda: Allow the CUDA backend, default True
+    :param chunk_size: The most guides held in memory at once, default
+        None to hold them all
+    :param strand_index: The strand index of the guides, default None
+    :raises ValueError: If the backend is unknown, disabled or not available
+    :return: The backend
+    """
+    exclude = () if use_cuda else (CudaBackend.name,)
+    if name == "":
+        if seed_index is not None:
+            name = SeedIndexBackend.name
+        elif strand_index is not None:
+            name = StrandIndexBackend.name
+        elif use_cuda and CudaBackend.is_available():
+            name = CudaBackend.name
+        else:
+            name = CpuBackend.name
+    backend = get_backend(
+        name,
+        guides,
+        seed_index,
+        chunk_size,
+        exclude=exclude,
+        strand_index=strand_index,
+    )
+    print(f"Using the {backend.name} backend", file=sys.stderr)
+    return backend
+
+
+def align(
+    guides: np.ndarray,
+    query_sequences: np.ndarray,
+    backend: typing.Union[str, OffTargetBackend] = "auto",
+    offset: np.uint64 = np.uint64(0),
+    seed_index: typing.Optional[SeedIndex] = None,
+    chunk_size: typing.Optional[int] = None,
+    strand_index: typing.Optional[StrandIndex] = None,
+    parameters: SearchParameters = DEFAULT_PARAMETERS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find off-targets for any number of query sequences with a backend
+
+    :param guides: The array of encoded gRNA sequences
+    :param query_sequences: The array of query sequences
+    :param backend: The backend or the name of one, see
+        :func:`get_backend`. Default is ``auto``.
+    :param offset: The offset of the guides, default 0
+    :param seed_index: The seed index of the guides, default None
+    :param chunk_size: The most guides held in memory at once, default
+        None to hold them all
+    :param strand_index: The strand index of the guides, default None
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default ``DEFAULT_PARAMETERS``
+    :return: A tuple of the summaries, the number of off-targets found and
+        the off-target ids as returned by :func:`find_off_targets_batch`
+    """
+    query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+    if isinstance(backend, str):
+        backend = get_backend(
+            backend,
+            guides,
+            seed_index,
+            chunk_size,
+            query_sequences,
+            strand_index=strand_index,
+        )
+    results = _empty_results(query_sequences.size, parameters)
+    for start in range(0, query_sequences.size, QUERY_BATCH_SIZE):
+        batch = backend.search(
+            query_sequences[start:][:QUERY_BATCH_SIZE], offset, parameters
+        )
+        for result, batch_result in zip(results, batch):
+            result[start:][:QUERY_BATCH_SIZE] = batch_result
+    return results
+
+
+def format_off_targets(
+    crispr_id: np.uint64,
+    summary: np.ndarray,
+    off_target_ids: np.ndarray,
+    species_id: np.uint8,
+    max_off_targets: int = MAX_OFF_TARGETS,
+) -> str:
+    """Format the off targets of a CRISPR as a line of output
+
+    :param crispr_id: The id of the CRISPR
+    :param summary: The summary of the off targets
+    :param off_target_ids: The off target CRISPR ids
+    :param species_id: The species id
+    :param max_off_targets: The off-target cap, the ids are left out when
+        there are this many of them, default ``MAX_OFF_TARGETS``
+    :return: The tab separated line, without a newline
+    """
+    summary_output = ", ".join(
+        [f"{i}: {summary[i]}" for i in range(len(summary))]
+    )
+
+    if len(off_target_ids) >= max_off_targets:
+        return f"{crispr_id}\t{species_id}\t{{{summary_output}}}"
+    ids_str = ",".join(map(str, off_target_ids))
+    return f"{crispr_id}\t{species_id}\t{{{ids_str}}}\t{{{summary_output}}}"
+
+
 def print_off_targets(
     crispr_id: np.uint64,
     summary: np.ndarray,
@@ -193,31 +2022,263 @@ def print_off_targets(
     :param species_id: The species id
     :return: None
     """
-    summary_output = ", ".join(
-        [f"{i}: {summary[i]}" for i in range(MAX_MISSMATCHES)]
-    )
+    print(format_off_targets(crispr_id, summary, off_target_ids, species_id))
 
-    if len(off_target_ids) >= MAX_OFF_TARGETS:
-        print(f"{crispr_id}\t{species_id}\t{{{summary_output}}}")
-    else:
-        ids_str = ",".join(map(str, off_target_ids))
-        print(
-            f"{crispr_id}\t{species_id}\t"
-            f"{{{ids_str}}}\t{{{summary_output}}}"
+
+def load_guides(
+    inputfile: str, use_mmap: bool = False
+) -> tuple[np.ndarray, Metadata]:
+    """Load the guides and metadata from the binary guides file
+
+    The guides of a version 4 file are left packed, to be searched as they
+    are.
+
+    :param inputfile: The binary guides file
+    :param use_mmap: Memory-map the guides instead of reading them in
+    :return: A tuple of the guides and the metadata
+    """
+    with open(inputfile, "rb") as in_file:
+        version = check_file_header(in_file.read(HEADER_SIZE))
+        print(f"Version is {version}", file=sys.stderr)
+        metadata = get_file_metadata(in_file.read(METADATA_SIZE))
+        print_metadata(metadata)
+        guides = get_guides(in_file, verbose=True, mmap=use_mmap, packed=True)
+    return guides, metadata
+
+
+def align_crisprs(
+    guides: np.ndarray,
+    crispr_ids: list[str],
+    metadata: Metadata,
+    backend: typing.Union[
+        OffTargetBackend, typing.Callable[[], OffTargetBackend], None
+    ] = None,
+    parameters: typing.Optional[SearchParameters] = None,
+    cache: typing.Optional[ResultCache] = None,
+) -> typing.Iterator[str]:
+    """Find the off-targets of CRISPRs given their IDs
+
+    With a cache the results of the queries are looked up first, and only
+    the queries not found are searched and then added to the cache.
+
+    :param guides: The array of encoded gRNA sequences
+    :param crispr_ids: The IDs of the CRISPRs
+    :param metadata: The metadata of the guides file
+    :param backend: The backend searching the guides, or a function creating
+        it on the first search, so that it is not created at all if every
+        result is cached. Default is None for the CPU backend.
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default None for the default limit and cap with the guide length of
+        the metadata
+    :param cache: The cache of results for the guides file, default None
+    :raises ValueError: If a CRISPR ID is not in the guides file
+    :return: An iterator of lines of output, one per CRISPR ID
+    """
+
+    def search(
+        query_sequences: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        nonlocal backend
+        if backend is None:
+            backend = CpuBackend(guides)
+        elif not isinstance(backend, OffTargetBackend):
+            backend = backend()
+        return backend.search(query_sequences, metadata.offset, parameters)
+
+    if parameters is None:
+        parameters = SearchParameters(
+            guide_length=int(metadata.sequence_length)
         )
+    indices = []
+    for crispr_id in crispr_ids:
+        if not crispr_id.isdigit() or not 0 < int(crispr_id) <= guides.size:
+            raise ValueError(f"Invalid CRISPR ID {crispr_id}")
+        indices.append(int(crispr_id) - 1)
+
+    for start in range(0, len(crispr_ids), QUERY_BATCH_SIZE):
+        batch = crispr_ids[start:][:QUERY_BATCH_SIZE]
+        query_sequences = unpack_guides(
+            guides[indices[start:][:QUERY_BATCH_SIZE]]
+        )
+        if cache is None:
+            results = search(query_sequences)
+        else:
+            found, results = cache.get(
+                query_sequences,
+                parameters.max_mismatches,
+                parameters.max_off_targets,
+            )
+            missing = np.flatnonzero(~found)
+            if missing.size > 0:
+                searched = search(query_sequences[missing])
+                cache.put(query_sequences[missing], *searched)
+                for result, searched_result in zip(results, searched):
+                    result[missing] = searched_result
+        summaries, off_target_ids_idx, off_target_ids = results
+        for q in range(len(batch)):
+            nos_off_targets = min(
+                off_target_ids_idx[q], parameters.max_off_targets
+            )
+            yield format_off_targets(
+                batch[q],
+                summaries[q],
+                np.sort(off_target_ids[q, :nos_off_targets]),
+                metadata.species_id,
+                parameters.max_off_targets,
+            )
+
+
+def align_range(
+    guides: np.ndarray,
+    first_id: int,
+    last_id: int,
+    metadata: Metadata,
+    outputfile: str,
+    checkpointfile: str,
+    backend: typing.Union[
+        OffTargetBackend, typing.Callable[[], OffTargetBackend], None
+    ] = None,
+    parameters: typing.Optional[SearchParameters] = None,
+    batch_size: int = QUERY_BATCH_SIZE,
+    verbose: bool = False,
+) -> None:
+    """Find the off-target summaries of a range of CRISPR IDs in batches,
+    writing them to a summaries file, see
+    :class:`~py_crispr_analyser.precompute.SummaryWriter`
+
+    If the checkpoint file exists the search resumes from it, otherwise a
+    new summaries file is started.
+
+    :param guides: The array of encoded gRNA sequences
+    :param first_id: The first CRISPR ID of the range
+    :param last_id: The last CRISPR ID of the range, inclusive
+    :param metadata: The metadata of the guides file
+    :param outputfile: The summaries file
+    :param checkpointfile: The checkpoint file
+    :param backend: The backend searching the guides, or a function creating
+        it on the first search, so that it is not created at all if the
+        range is already done. Default is None for the CPU backend.
+    :param parameters: The mismatch limit, off-target cap and guide length,
+        default None for the default limit and cap with the guide length of
+        the metadata
+    :param batch_size: The number of CRISPRs searched between checkpoints,
+        default ``QUERY_BATCH_SIZE``
+    :param verbose: Print the progress to STDERR every
+        ``PROGRESS_INTERVAL`` seconds, default False
+    :raises ValueError: If the range is not within the guides file
+    :raises ValueError: If the checkpoint does not match the summaries file
+    :return: None
+    """
+    if parameters is None:
+        parameters = SearchParameters(
+            guide_length=int(metadata.sequence_length)
+        )
+    if not 0 < first_id <= last_id <= guides.size:
+        raise ValueError(f"Invalid range {first_id}-{last_id}")
+    with SummaryWriter(
+        outputfile,
+        checkpointfile,
+        first_id,
+        last_id,
+        parameters.max_mismatches,
+        parameters.max_off_targets,
+    ) as writer:
+        if verbose and writer.next_id > first_id:
+            print(f"Resuming from CRISPR ID {writer.next_id}", file=sys.stderr)
+        start = time.time()
+        reported = start
+        while not writer.done:
+            if backend is None:
+                backend = CpuBackend(guides)
+            elif not isinstance(backend, OffTargetBackend):
+                backend = backend()
+            # 0-based indices of the guides of the batch
+            batch_start = writer.next_id - 1
+            batch_end = min(batch_start + batch_size, last_id)
+            query_sequences = unpack_guides(guides[batch_start:batch_end])
+            summaries, _, _ = backend.search(
+                query_sequences, metadata.offset, parameters
+            )
+            writer.write(summaries)
+            if verbose and (
+                writer.done or time.time() - reported >= PROGRESS_INTERVAL
+            ):
+                reported = time.time()
+                print(
+                    f"Searched up to CRISPR ID {writer.next_id - 1} of "
+                    f"{last_id} in {time.time() - start:.2f} seconds",
+                    file=sys.stderr,
+                )
+
+
+def query_server(
+    socket_path: str, crispr_ids: list[str]
+) -> typing.Iterator[str]:
+    """Ask a running align server for the off-targets of CRISPRs
+
+    :param socket_path: The Unix socket of the server, see
+        :mod:`py_crispr_analyser.server`
+    :param crispr_ids: The IDs of the CRISPRs
+    :return: An iterator of lines of output, one per CRISPR ID
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(f"{' '.join(crispr_ids)}\n".encode())
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile("r") as response:
+            for line in response:
+                yield line.rstrip("\n")
 
 
 def run(argv=sys.argv[1:]) -> None:
     """Run the align command to find off-targets for CRISPRs"""
     inputfile = ""
+    seedfile = ""
+    strandfile = ""
+    socket_path = ""
     use_cuda = True
+    use_mmap = False
+    memory = 0
+    backend_name = ""
+    mismatches = MAX_MISSMATCHES - 1
+    max_off_targets = MAX_OFF_TARGETS
+    cachefile = ""
+    cache_size = CACHE_SIZE // 1024 // 1024
+    crispr_range = None
+    outputfile = ""
+    checkpointfile = ""
 
     def usage() -> None:
         print(
             """Usage: crispr_analyser_align [options...] [ids...]
 -h, --help            Print this help message
 -i, --ifile <file>    The input binary guides file
+--backend <name>      The search backend, one of auto, cpu, cuda, numpy,
+                      seed, simd or strand. Default is seed with --seed_index,
+                      then strand with --strand_index, then cuda if
+                      available, then cpu
 --no-cuda             Do not use CUDA GPU acceleration
+--mmap                Memory-map the guides instead of reading them in
+--memory <MB>         Stream the memory-mapped guides in chunks, holding at
+                      most this many MB of them in memory and on the GPU
+--seed_index <file>   Use the seed index file built by crispr_analyser_index
+--strand_index <file> Use the strand index file built by
+                      crispr_analyser_index
+--mismatches <n>      Find off-targets with at most n mismatches, 0 to 4.
+                      Default is 4
+--max_off_targets <n> List the ids of CRISPRs with fewer than n
+                      off-targets. Default is 2000
+--cache <file>        Look up and keep the results in this cache file
+--cache_size <MB>     Evict the least recently used results beyond this
+                      many MB of them. Default is 1024
+--socket <file>       Ask the align server listening on this Unix socket
+                      instead of loading the guides file
+--range <first>-<last>
+                      Write the off-target summaries of this range of ids to
+                      the output file instead of searching given ids
+-o, --ofile <file>    The summaries file written with --range
+--checkpoint <file>   The checkpoint file to resume --range from. Default
+                      is the output file with .checkpoint appended
 [ids...]              The ids of the CRISPRs to find off-targets for
 """
         )
@@ -225,11 +2286,24 @@ def run(argv=sys.argv[1:]) -> None:
     try:
         opts, args = getopt.getopt(
             argv,
-            "hi:",
+            "hi:o:",
             [
                 "help",
                 "ifile=",
+                "backend=",
                 "no-cuda",
+                "mmap",
+                "memory=",
+                "seed_index=",
+                "strand_index=",
+                "mismatches=",
+                "max_off_targets=",
+                "cache=",
+                "cache_size=",
+                "socket=",
+                "range=",
+                "ofile=",
+                "checkpoint=",
             ],
         )
     except getopt.GetoptError as err:
@@ -242,68 +2316,147 @@ def run(argv=sys.argv[1:]) -> None:
             sys.exit()
         elif opt in ("-i", "--ifile"):
             inputfile = arg
+        elif opt == "--backend":
+            backend_name = arg
+        elif opt == "--seed_index":
+            seedfile = arg
+        elif opt == "--strand_index":
+            strandfile = arg
+        elif opt == "--socket":
+            socket_path = arg
         elif opt == "--no-cuda":
             use_cuda = False
-    if inputfile == "" or len(args) == 0:
+        elif opt == "--mmap":
+            use_mmap = True
+        elif opt == "--memory":
+            if not arg.isdigit() or int(arg) == 0:
+                print(f"Invalid memory budget {arg}")
+                usage()
+                sys.exit(2)
+            memory = int(arg)
+        elif opt == "--mismatches":
+            if not arg.isdigit() or int(arg) >= MAX_MISSMATCHES:
+                print(f"Invalid number of mismatches {arg}")
+                usage()
+                sys.exit(2)
+            mismatches = int(arg)
+        elif opt == "--max_off_targets":
+            if not arg.isdigit() or int(arg) == 0:
+                print(f"Invalid off-target cap {arg}")
+                usage()
+                sys.exit(2)
+            max_off_targets = int(arg)
+        elif opt == "--cache":
+            cachefile = arg
+        elif opt == "--cache_size":
+            if not arg.isdigit() or int(arg) == 0:
+                print(f"Invalid cache size {arg}")
+                usage()
+                sys.exit(2)
+            cache_size = int(arg)
+        elif opt == "--range":
+            first, _, last = arg.partition("-")
+            if not first.isdigit() or not last.isdigit():
+                print(f"Invalid range {arg}")
+                usage()
+                sys.exit(2)
+            crispr_range = (int(first), int(last))
+        elif opt in ("-o", "--ofile"):
+            outputfile = arg
+        elif opt == "--checkpoint":
+            checkpointfile = arg
+    if crispr_range is not None:
+        if (
+            inputfile == ""
+            or outputfile == ""
+            or socket_path != ""
+            or cachefile != ""
+            or len(args) > 0
+        ):
+            usage()
+            sys.exit(2)
+        if checkpointfile == "":
+            checkpointfile = f"{outputfile}.checkpoint"
+    elif (inputfile == "") == (socket_path == "") or len(args) == 0:
         usage()
         sys.exit(2)
 
-    with open(inputfile, "rb") as in_file:
-        check_file_header(in_file.read(HEADER_SIZE))
-        print(f"Version is {FILE_VERSION}", file=sys.stderr)
-        metadata = get_file_metadata(in_file.read(METADATA_SIZE))
-        print_metadata(metadata)
-        guides = get_guides(in_file, verbose=True)
+    if socket_path != "":
+        for line in query_server(socket_path, args):
+            print(line)
+        return
 
-        print("Searching for off targets", file=sys.stderr)
-        if use_cuda & cuda.is_available():
-            memory_required = guides.size * 8 / 1024 / 1024
-            print(
-                f"Requires {memory_required} MB of GPU memory",
-                file=sys.stderr,
-            )
-            device_guides = cuda.to_device(guides)
-            threads_per_block = 256
-            blocks_per_grid = (
-                guides.size + (threads_per_block - 1) // threads_per_block
-            )
+    if memory > 0:
+        # streaming only bounds memory if the guides are not read in
+        use_mmap = True
+    guides, metadata = load_guides(inputfile, use_mmap)
+    chunk_size = None
+    if memory > 0:
+        # packed guides take 6 bytes each rather than 8
+        chunk_size = memory * 1024 * 1024 // guides.itemsize
 
-        for i in range(len(args)):
-            query_sequence = guides[int(args[i]) - 1]
-            reverse_query_sequence = reverse_complement_binary(
-                query_sequence, 20
-            )
-            summary = np.zeros(MAX_MISSMATCHES, dtype=np.uint32)
-            off_target_ids_idx = np.zeros(1, dtype=np.uint32)
-            off_target_ids = np.zeros(MAX_OFF_TARGETS, dtype=np.uint32)
-            if use_cuda & cuda.is_available():
-                device_summary = cuda.to_device(summary)
-                device_off_target_ids_idx = cuda.to_device(off_target_ids_idx)
-                device_off_target_ids = cuda.to_device(off_target_ids)
-                find_off_targets_kernel[blocks_per_grid, threads_per_block](
-                    device_guides,
-                    query_sequence,
-                    reverse_query_sequence,
-                    device_summary,
-                    device_off_target_ids_idx,
-                    device_off_target_ids,
-                    metadata.offset,
-                )
-                summary = device_summary.copy_to_host()
-                off_target_ids = device_off_target_ids.copy_to_host()
-            else:
-                find_off_targets_cpu(
-                    guides,
-                    query_sequence,
-                    reverse_query_sequence,
-                    summary,
-                    off_target_ids_idx,
-                    off_target_ids,
-                    metadata.offset,
-                )
-            print_off_targets(
-                args[i],
-                summary,
-                np.sort(np.trim_zeros(off_target_ids)),
-                metadata.species_id,
+    seed_index = None
+    if seedfile != "":
+        with open(seedfile, "rb") as seed_file:
+            seed_index = get_seed_index(seed_file, verbose=True)
+
+    strand_index = None
+    if strandfile != "":
+        with open(strandfile, "rb") as strand_file:
+            strand_index = get_strand_index(strand_file, verbose=True)
+
+    def create_backend() -> OffTargetBackend:
+        try:
+            return select_backend(
+                backend_name,
+                guides,
+                seed_index,
+                use_cuda,
+                chunk_size,
+                strand_index,
             )
+        except ValueError as err:
+            print(err)
+            usage()
+            sys.exit(2)
+
+    parameters = SearchParameters(
+        mismatches + 1, max_off_targets, int(metadata.sequence_length)
+    )
+    if crispr_range is not None:
+        first_id, last_id = crispr_range
+        if not 0 < first_id <= last_id <= guides.size:
+            print(f"Invalid range {first_id}-{last_id}")
+            usage()
+            sys.exit(2)
+        print("Searching for off targets", file=sys.stderr)
+        # the backend is only created if the range is not already done
+        align_range(
+            guides,
+            first_id,
+            last_id,
+            metadata,
+            outputfile,
+            checkpointfile,
+            create_backend,
+            parameters,
+            verbose=True,
+        )
+        return
+
+    cache = None
+    backend = create_backend
+    if cachefile != "":
+        # the backend is only created if a result is not in the cache
+        cache = ResultCache(cachefile, inputfile, cache_size * 1024 * 1024)
+    else:
+        backend = create_backend()
+    print("Searching for off targets", file=sys.stderr)
+    try:
+        for line in align_crisprs(
+            guides, args, metadata, backend, parameters, cache
+        ):
+            print(line)
+    finally:
+        if cache is not None:
+            cache.close()
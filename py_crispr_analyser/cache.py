@@ -0,0 +1,264 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import hashlib
+import numpy as np
+import os
+import sqlite3
+import time
+
+# the default size budget of the cached results, in bytes
+CACHE_SIZE = 1 << 30
+CHECKSUM_BLOCK_SIZE = 1 << 24
+# the bytes taken by an entry besides its summary and ids
+ENTRY_OVERHEAD = 64
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checksums (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    checksum TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    checksum TEXT NOT NULL,
+    max_mismatches INTEGER NOT NULL,
+    max_off_targets INTEGER NOT NULL,
+    query INTEGER NOT NULL,
+    summary BLOB NOT NULL,
+    off_targets INTEGER NOT NULL,
+    off_target_ids BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL,
+    PRIMARY KEY (checksum, max_mismatches, max_off_targets, query)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+-- the running total of the sizes of the results, kept by the triggers so
+-- eviction does not sum the sizes on every put
+CREATE TABLE IF NOT EXISTS totals (size INTEGER NOT NULL);
+INSERT INTO totals SELECT COALESCE(SUM(size), 0) FROM results
+    WHERE NOT EXISTS (SELECT 1 FROM totals);
+CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results
+BEGIN
+    UPDATE totals SET size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results
+BEGIN
+    UPDATE totals SET size = size - OLD.size;
+END;
+"""
+
+
+def file_checksum(path: str) -> str:
+    """Get the SHA-256 checksum of a file.
+
+    :param path: The file to checksum
+    :return: The hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as in_file:
+        for block in iter(lambda: in_file.read(CHECKSUM_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """A persistent cache of off-target results in a SQLite file, usually
+    kept next to the guides file.
+
+    The results of a query depend only on the guides file, the mismatch
+    limit and the off-target cap, so each entry is keyed by the checksum of
+    the guides file, the limit, the cap and the encoded query, and holds
+    the summary, the number of off-targets and their stored ids. The
+    checksum of a guides file is computed once and kept until the file
+    changes size or modification time. When the entries take more than
+    ``size_budget`` bytes the least recently used are evicted.
+    """
+
+    def __init__(
+        self, cachefile: str, guidesfile: str, size_budget: int = CACHE_SIZE
+    ) -> None:
+        """Open the cache file, creating it if needed
+
+        :param cachefile: The SQLite file of the cache
+        :param guidesfile: The binary guides file searched
+        :param size_budget: The most bytes of cached results, default
+            ``CACHE_SIZE``
+        :raises ValueError: If the size budget is not positive
+        """
+        if size_budget < 1:
+            raise ValueError("Cache size must be positive")
+        self.size_budget = size_budget
+        self.connection = sqlite3.connect(cachefile)
+        # so the rows replaced by INSERT OR REPLACE fire the delete trigger
+        self.connection.execute("PRAGMA recursive_triggers = ON")
+        self.connection.executescript(CACHE_SCHEMA)
+        self.checksum = self._guides_checksum(guidesfile)
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the cache file
+
+        :return: None
+        """
+        self.connection.close()
+
+    def _guides_checksum(self, guidesfile: str) -> str:
+        """Get the checksum of the guides file, computing it only if the file
+        is new to the cache or has changed"""
+        path = os.path.realpath(guidesfile)
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT checksum FROM checksums "
+            "WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        checksum = file_checksum(path)
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, checksum),
+            )
+        return checksum
+
+    def get(
+        self,
+        query_sequences: np.ndarray,
+        max_mismatches: int,
+        max_off_targets: int,
+    ) -> tuple[np.ndarray, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Look up the results of a batch of query sequences
+
+        :param query_sequences: The array of query sequences
+        :param max_mismatches: The mismatch limit of the search
+        :param max_off_targets: The off-target cap of the search
+        :return: A tuple of whether each query was found and the summaries,
+            the number of off-targets found and the off-target ids, as
+            returned by
+            :func:`~py_crispr_analyser.align.find_off_targets_batch`, with
+            zero rows for the queries not found
+        """
+        query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+        found = np.zeros(query_sequences.size, dtype=bool)
+        summaries = np.zeros(
+            (query_sequences.size, max_mismatches), dtype=np.uint32
+        )
+        off_target_ids_idx = np.zeros(query_sequences.size, dtype=np.uint32)
+        off_target_ids = np.zeros(
+            (query_sequences.size, max_off_targets), dtype=np.uint32
+        )
+        # SQLite integers are signed
+        keys = query_sequences.view(np.int64).tolist()
+        if len(keys) == 0:
+            return found, (summaries, off_target_ids_idx, off_target_ids)
+        unique_keys = list(set(keys))
+        key = (self.checksum, max_mismatches, max_off_targets)
+        rows = self.connection.execute(
+            "SELECT query, summary, off_targets, off_target_ids FROM results "
+            "WHERE checksum = ? AND max_mismatches = ? AND max_off_targets = ? "
+            f"AND query IN ({','.join('?' * len(unique_keys))})",
+            (*key, *unique_keys),
+        ).fetchall()
+        entries = {row[0]: row[1:] for row in rows}
+        for q, query in enumerate(keys):
+            if query not in entries:
+                continue
+            summary, off_targets, ids = entries[query]
+            ids = np.frombuffer(ids, dtype=np.uint32)
+            found[q] = True
+            summaries[q] = np.frombuffer(summary, dtype=np.uint32)
+            off_target_ids_idx[q] = off_targets
+            off_target_ids[q, : ids.size] = ids
+        if len(entries) > 0:
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE results SET last_used = ? WHERE checksum = ? "
+                    "AND max_mismatches = ? AND max_off_targets = ? "
+                    "AND query = ?",
+                    [(time.time_ns(), *key, query) for query in entries],
+                )
+        return found, (summaries, off_target_ids_idx, off_target_ids)
+
+    def put(
+        self,
+        query_sequences: np.ndarray,
+        summaries: np.ndarray,
+        off_target_ids_idx: np.ndarray,
+        off_target_ids: np.ndarray,
+    ) -> None:
+        """Store the results of a batch of query sequences, then evict the
+        least recently used entries beyond the size budget
+
+        The mismatch limit and the off-target cap are the widths of the
+        summaries and the off-target ids.
+
+        :param query_sequences: The array of query sequences
+        :param summaries: The summaries, one row per query
+        :param off_target_ids_idx: The number of off-targets found for each
+            query
+        :param off_target_ids: The off-target ids, one row per query
+        :return: None
+        """
+        query_sequences = np.asarray(query_sequences, dtype=np.uint64)
+        max_mismatches = summaries.shape[1]
+        max_off_targets = off_target_ids.shape[1]
+        now = time.time_ns()
+        entries = []
+        for q, query in enumerate(query_sequences.view(np.int64).tolist()):
+            summary = summaries[q].astype(np.uint32).tobytes()
+            stored = min(int(off_target_ids_idx[q]), max_off_targets)
+            ids = off_target_ids[q, :stored].astype(np.uint32).tobytes()
+            entries.append(
+                (
+                    self.checksum,
+                    max_mismatches,
+                    max_off_targets,
+                    query,
+                    summary,
+                    int(off_target_ids_idx[q]),
+                    ids,
+                    len(summary) + len(ids) + ENTRY_OVERHEAD,
+                    now,
+                )
+            )
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                entries,
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries until the rest fit in the
+        size budget"""
+        total = self.connection.execute("SELECT size FROM totals").fetchone()[0]
+        if total <= self.size_budget:
+            return
+        evicted = []
+        cursor = self.connection.execute(
+            "SELECT checksum, max_mismatches, max_off_targets, query, size "
+            "FROM results ORDER BY last_used"
+        )
+        for row in cursor:
+            evicted.append(row[:4])
+            total -= row[4]
+            if total <= self.size_budget:
+                break
+        cursor.close()
+        self.connection.executemany(
+            "DELETE FROM results WHERE checksum = ? AND max_mismatches = ? "
+            "AND max_off_targets = ? AND query = ?",
+            evicted,
+        )
+
+    def __len__(self) -> int:
+        """The number of cached results"""
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM results"
+        ).fetchone()[0]
@@ -1,15 +1,22 @@
 # Copyright (C) 2025-2026 Genome Research Ltd.
 
-import collections
 import csv
 import getopt
+import multiprocessing
+import numpy as np
+import os
 import re
+import shutil
 import sys
+import tempfile
 import time
+import typing
 
 from .utils import reverse_complement
 
 GUIDE_RNA_LENGTH = 20
+IS_ACGT = np.zeros(256, dtype=bool)
+IS_ACGT[np.frombuffer(b"ACGT", dtype=np.uint8)] = True
 
 
 def match_pam(
@@ -38,12 +45,226 @@ def match_pam(
     return True
 
 
+def parse_chromosome_name(header: str) -> str:
+    """Extract the chromosome name from a FASTA header line.
+
+    :param header: The FASTA header line e.g. ">MT dna:chromosome ..."
+    :raises ValueError: If the chromosome name cannot be extracted
+    :return: The chromosome name e.g. "MT"
+    """
+    match = re.search(r">(.*?) dna:chromosome", header)
+    if not match:
+        raise ValueError(
+            f"Could not extract chromosome name from header: {header}"
+        )
+    return match.group(1)
+
+
+def read_chromosomes(
+    inputfile: str,
+) -> typing.Iterator[tuple[str, np.ndarray]]:
+    """Read a FASTA file one chromosome at a time.
+
+    :param inputfile: The input FASTA file containing DNA sequences.
+    :return: An iterator of tuples of the chromosome name and its sequence
+        as a numpy uint8 array of ASCII bases
+    """
+    chromosome = None
+    lines = []
+    with open(inputfile, "rb") as infile:
+        for line in infile:
+            if line[:1] == b">":
+                if chromosome is not None or lines:
+                    yield chromosome or "", np.frombuffer(
+                        b"".join(lines), dtype=np.uint8
+                    )
+                chromosome = parse_chromosome_name(line.decode())
+                lines = []
+            else:
+                lines.append(line.strip())
+    if chromosome is not None or lines:
+        yield chromosome or "", np.frombuffer(b"".join(lines), dtype=np.uint8)
+
+
+def find_fasta_records(inputfile: str) -> list[tuple[str, int, int]]:
+    """Find the chromosome records of a FASTA file.
+
+    :param inputfile: The input FASTA file containing DNA sequences.
+    :return: A list of tuples of the chromosome name and the start and end
+        byte offsets of its sequence lines, in the order of the file
+    """
+    records = []
+    chromosome = None
+    start = 0
+    offset = 0
+    with open(inputfile, "rb") as infile:
+        for line in infile:
+            if line[:1] == b">":
+                if chromosome is not None or offset > start:
+                    records.append((chromosome or "", start, offset))
+                chromosome = parse_chromosome_name(line.decode())
+                start = offset + len(line)
+            offset += len(line)
+    if chromosome is not None or offset > start:
+        records.append((chromosome or "", start, offset))
+    return records
+
+
+def read_sequence(inputfile: str, start: int, end: int) -> np.ndarray:
+    """Read the sequence lines of a single FASTA record.
+
+    :param inputfile: The input FASTA file containing DNA sequences.
+    :param start: The byte offset of the first sequence line.
+    :param end: The byte offset after the last sequence line.
+    :return: The sequence as a numpy uint8 array of ASCII bases
+    """
+    with open(inputfile, "rb") as infile:
+        infile.seek(start)
+        data = infile.read(end - start)
+    return np.frombuffer(
+        b"".join(line.strip() for line in data.splitlines()), dtype=np.uint8
+    )
+
+
+def match_pam_sites(
+    sequence: np.ndarray,
+    pam_sequence: str,
+    pam_on_right: bool,
+    window_length: int,
+) -> np.ndarray:
+    """Check every window of a DNA sequence for a PAM sequence match.
+
+    This is the vectorised equivalent of :func:`match_pam` applied to each
+    window of ``window_length`` bases.
+
+    :param sequence: The DNA sequence as a numpy uint8 array of ASCII bases.
+    :param pam_sequence: The string PAM sequence to match.
+    :param pam_on_right: A boolean indicating if PAM sequence is on the right.
+    :param window_length: The length of the windows (guide + PAM).
+    :return: A boolean array, True for each window start with a PAM match.
+    """
+    number_of_windows = max(sequence.size - window_length + 1, 0)
+    start = window_length - len(pam_sequence) if pam_on_right else 0
+    mask = np.ones(number_of_windows, dtype=bool)
+    for i, base in enumerate(pam_sequence.encode(), start=start):
+        bases = sequence[i:][:number_of_windows]
+        if base == ord("N"):
+            mask &= IS_ACGT[bases]
+        else:
+            mask &= bases == base
+    return mask
+
+
+def find_crisprs(
+    sequence: np.ndarray, pam: str
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find the CRISPRs in a DNA sequence.
+
+    :param sequence: The DNA sequence as a numpy uint8 array of ASCII bases.
+    :param pam: The string PAM sequence to search for e.g. "NGG".
+    :return: A tuple of the 0-based start of each CRISPR and whether its PAM
+        is on the right (1) or left (0), ordered by start and PAM left first.
+    """
+    window_length = len(pam) + GUIDE_RNA_LENGTH
+    pam_left = match_pam_sites(
+        sequence, reverse_complement(pam), False, window_length
+    )
+    pam_right = match_pam_sites(sequence, pam, True, window_length)
+    starts = np.flatnonzero(pam_left | pam_right)
+    # a window matching both PAMs is reported twice, PAM left first
+    counts = 1 + (pam_left[starts] & pam_right[starts])
+    positions = np.repeat(starts, counts)
+    pam_right_flags = np.ones(positions.size, dtype=np.uint8)
+    first = np.cumsum(counts) - counts
+    pam_right_flags[first] = ~pam_left[starts]
+    return positions, pam_right_flags
+
+
+def write_crisprs(
+    csvwriter: typing.Any,
+    chromosome: str,
+    sequence: np.ndarray,
+    positions: np.ndarray,
+    pam_right: np.ndarray,
+    window_length: int,
+    legacy_mode: bool = False,
+) -> None:
+    """Write the CRISPRs of a single chromosome as CSV rows.
+
+    :param csvwriter: The csv.writer to write the rows with.
+    :param chromosome: The chromosome name.
+    :param sequence: The DNA sequence as a numpy uint8 array of ASCII bases.
+    :param positions: The 0-based start of each CRISPR, see
+        :func:`find_crisprs`.
+    :param pam_right: Whether the PAM of each CRISPR is on the right (1) or
+        left (0).
+    :param window_length: The length of the CRISPRs (guide + PAM).
+    :param legacy_mode: A boolean indicating that species ID column
+        is added to CSV file (always equalling 1). Default is False.
+    :return: None
+    """
+    species_column = [1] if legacy_mode else []
+    text = sequence.tobytes().decode("latin-1")
+    for position, right in zip(positions.tolist(), pam_right.tolist()):
+        end = position + window_length
+        csvwriter.writerow(
+            [
+                chromosome,
+                position + 1,
+                text[position:end],
+                right,
+                *species_column,
+            ]
+        )
+
+
+def _gather_record(
+    inputfile: str,
+    chromosome: str,
+    start: int,
+    end: int,
+    outputfile: str,
+    pam: str,
+    verbose: bool,
+    legacy_mode: bool,
+) -> int:
+    """Gather the CRISPRs of a single FASTA record into its own CSV file.
+
+    :param inputfile: The input FASTA file containing DNA sequences.
+    :param chromosome: The chromosome name of the record.
+    :param start: The byte offset of the first sequence line of the record.
+    :param end: The byte offset after the last sequence line of the record.
+    :param outputfile: The output CSV file for the record.
+    :param pam: The string PAM sequence to search for e.g. "NGG".
+    :param verbose: A boolean indicating if verbose output is enabled.
+    :param legacy_mode: A boolean indicating that species ID column
+        is added to CSV file (always equalling 1).
+    :return: The number of CRISPRs written
+    """
+    if verbose:
+        print(f"Processing chromosome {chromosome}...")
+    sequence = read_sequence(inputfile, start, end)
+    positions, pam_right = find_crisprs(sequence, pam)
+    with open(outputfile, "w", newline="") as outfile:
+        write_crisprs(
+            csv.writer(outfile),
+            chromosome,
+            sequence,
+            positions,
+            pam_right,
+            len(pam) + GUIDE_RNA_LENGTH,
+            legacy_mode,
+        )
+    return positions.size
+
+
 def gather(
     inputfile: str,
     outputfile: str,
     pam: str,
     verbose: bool = False,
     legacy_mode: bool = False,
+    processes: int = 1,
 ) -> None:
     """Run the CRISPR gatherer.
 
@@ -54,63 +275,52 @@ def gather(
         Default is False.
     :param legacy_mode: A boolean indicating that species ID column
         is added to CSV file (always equalling 1). Default is False.
+    :param processes: The number of processes gathering chromosomes in
+        parallel. The output is the same as with a single process.
+        Default is 1.
     :return: None
     """
     start = time.time()
-    chromosome = ""
     crispr_count = 0
-    position = 0
-    buffer = collections.deque(maxlen=len(pam) + GUIDE_RNA_LENGTH)
 
-    with open(inputfile, "r") as infile:
+    if processes > 1:
+        records = find_fasta_records(inputfile)
+        output_dir = os.path.dirname(os.path.abspath(outputfile))
+        with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+            parts = [
+                os.path.join(tmp_dir, f"{i}.csv") for i in range(len(records))
+            ]
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(processes) as pool:
+                counts = pool.starmap(
+                    _gather_record,
+                    [
+                        (inputfile, *record, part, pam, verbose, legacy_mode)
+                        for record, part in zip(records, parts)
+                    ],
+                )
+            with open(outputfile, "wb") as outfile:
+                for part in parts:
+                    with open(part, "rb") as part_file:
+                        shutil.copyfileobj(part_file, outfile)
+        crispr_count = sum(counts)
+    else:
         with open(outputfile, "w", newline="") as outfile:
             csvwriter = csv.writer(outfile)
-            for line in infile:
-                if len(line) == 0:
-                    continue
-                if line[0] == ">":
-                    match = re.search(r">(.*?) dna:chromosome", line)
-                    if not match:
-                        raise ValueError(
-                            f"Could not extract chromosome name from header: {line}"
-                        )
-                    chromosome = match.group(1)
-                    if verbose:
-                        print(f"Processing chromosome {chromosome}...")
-                    position = 0
-                    buffer.clear()
-                    continue
-                else:
-                    line = line.strip()
-                    for base in line:
-                        buffer.append(base)
-                        if len(buffer) < len(pam) + GUIDE_RNA_LENGTH:
-                            continue
-                        position += 1
-                        if match_pam(
-                            dna_sequence="".join(buffer),
-                            pam_sequence=reverse_complement(pam),
-                            pam_on_right=False,
-                        ):
-                            output = (
-                                [chromosome, position, "".join(buffer), 0, 1]
-                                if legacy_mode
-                                else [chromosome, position, "".join(buffer), 0]
-                            )
-                            csvwriter.writerow(output)
-                            crispr_count += 1
-                        if match_pam(
-                            dna_sequence="".join(buffer),
-                            pam_sequence=pam,
-                            pam_on_right=True,
-                        ):
-                            output = (
-                                [chromosome, position, "".join(buffer), 1, 1]
-                                if legacy_mode
-                                else [chromosome, position, "".join(buffer), 1]
-                            )
-                            csvwriter.writerow(output)
-                            crispr_count += 1
+            for chromosome, sequence in read_chromosomes(inputfile):
+                if verbose:
+                    print(f"Processing chromosome {chromosome}...")
+                positions, pam_right = find_crisprs(sequence, pam)
+                write_crisprs(
+                    csvwriter,
+                    chromosome,
+                    sequence,
+                    positions,
+                    pam_right,
+                    len(pam) + GUIDE_RNA_LENGTH,
+                    legacy_mode,
+                )
+                crispr_count += positions.size
     if verbose:
         end = time.time()
         print(f"Gathered {crispr_count} CRISPRs in {end - start} seconds.")
@@ -121,6 +331,7 @@ def run(argv=sys.argv[1:]):
     inputfile = ""
     outputfile = ""
     pam = ""
+    processes = 1
 
     def usage():
         print(
@@ -129,12 +340,15 @@ def run(argv=sys.argv[1:]):
 -i, --ifile <file>   The input FASTA file
 -o, --ofile <file>   The output file
 -p, --pam <pam seq>  The PAM sequence to search for
+-t, --processes <n>  The number of chromosomes to gather in parallel
 """
         )
 
     try:
         opts, _ = getopt.getopt(
-            argv, "hi:o:p:", ["help", "ifile=", "ofile=", "pam="]
+            argv,
+            "hi:o:p:t:",
+            ["help", "ifile=", "ofile=", "pam=", "processes="],
         )
     except getopt.GetoptError:
         usage()
@@ -149,6 +363,8 @@ def run(argv=sys.argv[1:]):
             outputfile = arg
         elif opt in ("-p", "--pam"):
             pam = arg
+        elif opt in ("-t", "--processes"):
+            processes = int(arg)
         else:
             print("Unhandled Option")
             usage()
@@ -157,4 +373,11 @@ def run(argv=sys.argv[1:]):
         usage()
         sys.exit(2)
 
-    gather(inputfile, outputfile, pam, verbose=True, legacy_mode=True)
+    gather(
+        inputfile,
+        outputfile,
+        pam,
+        verbose=True,
+        legacy_mode=True,
+        processes=processes,
+    )
@@ -1,16 +1,47 @@
 # Copyright (C) 2025-2026 Genome Research Ltd.
 
+import contextlib
+import csv
 import getopt
+import io
+import multiprocessing
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import os
 import struct
 import sys
 import time
+import typing
 
+from .gather import (
+    GUIDE_RNA_LENGTH,
+    find_crisprs,
+    read_chromosomes,
+    write_crisprs,
+)
+from .search import write_sorted_index
+from .seed import write_seed_index
+from .strand import write_strand_index
 from .utils import (
     FILE_VERSION,
+    HEADER_SIZE,
+    MAX_PACKED_GUIDE_LENGTH,
+    METADATA_SIZE,
+    PACKED_FILE_VERSION,
+    PACKED_GUIDE_DTYPE,
+    get_guides,
+    pack_guides,
     sequence_to_binary_encoding,
+    sequences_to_binary_encoding,
 )
 
+ENCODE_CHUNK_SIZE = 1 << 22
+# the number of bytes of CSV input read and encoded at a time
+INDEX_CHUNK_SIZE = 1 << 24
+# the number of bytes of CSV input given to each process at a time
+PARALLEL_CHUNK_SIZE = 1 << 26
+GUIDES_START = HEADER_SIZE + METADATA_SIZE + 3
+
 
 def create_metadata(
     number_of_sequences: np.uint64,
@@ -49,6 +80,108 @@ def create_metadata(
     )
 
 
+def check_packed_guide_length(guide_length: int, packed: bool) -> None:
+    """Check the guides fit in 6 bytes if they are packed
+
+    :param guide_length: The length of the guide sequence
+    :param packed: Whether the guides are packed
+    :raises ValueError: If the guides are packed and longer than
+        ``MAX_PACKED_GUIDE_LENGTH``
+    :return: None
+    """
+    if packed and guide_length > MAX_PACKED_GUIDE_LENGTH:
+        raise ValueError(
+            f"Guides of length {guide_length} cannot be packed, the most is "
+            f"{MAX_PACKED_GUIDE_LENGTH}"
+        )
+
+
+def write_header(
+    out_file: typing.BinaryIO,
+    number_of_sequences: np.uint64,
+    sequence_length: np.uint64,
+    offset: np.uint64,
+    species_id: np.uint8,
+    species_name: str,
+    assembly: str,
+    packed: bool = False,
+) -> None:
+    """Write the header, metadata and padding of the binary file, version 3
+    or version 4 if the guides are packed
+
+    The number of sequences can be updated once known with
+    :func:`write_number_of_sequences`.
+
+    :param out_file: The file handle of the binary output file
+    :param number_of_sequences: Number of sequences in the file
+    :param sequence_length: Length of each sequence (guide + PAM)
+    :param offset: Offset of the first sequence
+    :param species_id: ID of the species e.g. 1
+    :param species_name: Name of the species e.g. 'Human'
+    :param assembly: Genome assembly used e.g. 'GRCh38'
+    :param packed: Whether the guides are written with :func:`write_guides`
+        packed into 6 bytes each. Default is False.
+    :raises ValueError: If the guides are packed and longer than
+        ``MAX_PACKED_GUIDE_LENGTH``
+    :return: None
+    """
+    check_packed_guide_length(int(sequence_length), packed)
+    version = PACKED_FILE_VERSION if packed else FILE_VERSION
+    # write the file header
+    out_file.write(struct.pack("<BL", np.uint8(1), np.uint(version)))
+    # write the metadata
+    out_file.write(
+        create_metadata(
+            np.uint64(number_of_sequences),
+            np.uint64(sequence_length),
+            np.uint64(offset),
+            np.uint8(species_id),
+            species_name,
+            assembly,
+        )
+    )
+    # put in a separator of 3 empty bytes before the vector of sequences
+    out_file.write(struct.pack("<BBB", 0, 0, 0))
+
+
+def write_guides(
+    out_file: typing.BinaryIO, guides: np.ndarray, packed: bool = False
+) -> None:
+    """Write encoded guides to the binary file
+
+    :param out_file: The file handle of the binary output file
+    :param guides: The array of encoded gRNA sequences
+    :param packed: Whether to pack the guides into 6 bytes each, see
+        :func:`py_crispr_analyser.utils.pack_guides`. Default is False.
+    :return: None
+    """
+    if packed:
+        guides = pack_guides(guides)
+    guides.tofile(out_file)
+
+
+def guide_size(packed: bool = False) -> int:
+    """Get the number of bytes taken by each guide in the binary file
+
+    :param packed: Whether the guides are packed, default False
+    :return: The number of bytes per guide
+    """
+    return PACKED_GUIDE_DTYPE.itemsize if packed else 8
+
+
+def write_number_of_sequences(
+    out_file: typing.BinaryIO, number_of_sequences: np.uint64
+) -> None:
+    """Write the number of sequences in the correct position in the file
+
+    :param out_file: The file handle of the binary output file
+    :param number_of_sequences: Number of sequences in the file
+    :return: None
+    """
+    out_file.seek(5)
+    out_file.write(struct.pack("<Q", number_of_sequences))
+
+
 def parse_record(
     record: str, guide_length: int, pam_length: int
 ) -> tuple[str, int]:
@@ -78,6 +211,247 @@ def parse_record(
     return guide_sequence, pam_right
 
 
+def parse_records(
+    data: np.ndarray, guide_length: int, pam_length: int
+) -> typing.Optional[tuple[np.ndarray, np.ndarray]]:
+    """Parse a block of lines from the input CSV file at once
+
+    Only well-formed records with a PAM right flag of 0 or 1 are handled,
+    otherwise None is returned and the block should be parsed line by line
+    with :func:`parse_record`.
+
+    :param data: A numpy uint8 array of whole lines from the input CSV file,
+        ending in a newline
+    :param guide_length: The length of the guide sequence (CRISPR excluding PAM)
+    :param pam_length: The length of the PAM sequence (CRISPR excluding guide)
+    :return: A tuple containing a 2D uint8 array of the guide sequences and
+        an array of the PAM right flags, or None
+    """
+    line_ends = np.flatnonzero(data == ord("\n"))
+    commas = np.flatnonzero(data == ord(","))
+    columns = np.bincount(
+        np.searchsorted(line_ends, commas), minlength=line_ends.size
+    )
+    if np.any(columns != 4):
+        return None
+    carriage_returns = np.flatnonzero(data == ord("\r"))
+    if np.any(data[carriage_returns + 1] != ord("\n")):
+        return None
+    commas = commas.reshape(-1, 4)
+    sequence_start = commas[:, 1] + 1
+    if np.any(commas[:, 2] - sequence_start != guide_length + pam_length):
+        return None
+    if np.any(commas[:, 3] - commas[:, 2] != 2):
+        return None
+    pam_right = data[commas[:, 2] + 1] - np.uint8(ord("0"))
+    if np.any(pam_right > 1):
+        return None
+    crispr_sequences = data[
+        sequence_start[:, np.newaxis]
+        + np.arange(guide_length + pam_length)[np.newaxis, :]
+    ]
+    guide_sequences = np.where(
+        pam_right[:, np.newaxis] == 1,
+        crispr_sequences[:, :guide_length],
+        crispr_sequences[:, pam_length:],
+    )
+    return guide_sequences, pam_right
+
+
+def encode_records(
+    block: bytes, guide_length: int, pam_length: int
+) -> np.ndarray:
+    """Encode a block of whole lines from the input CSV file
+
+    :param block: The bytes of whole lines from the input CSV file
+    :param guide_length: The length of the guide sequence (CRISPR excluding PAM)
+    :param pam_length: The length of the PAM sequence (CRISPR excluding guide)
+    :return: A numpy uint64 array of the encoded guide sequences
+    """
+    if block == b"":
+        return np.empty(0, dtype=np.uint64)
+    if not block.endswith(b"\n"):
+        block += b"\n"
+    records = parse_records(
+        np.frombuffer(block, dtype=np.uint8), guide_length, pam_length
+    )
+    if records is not None:
+        try:
+            return sequences_to_binary_encoding(*records)
+        except ValueError:
+            pass
+    # parse line by line to report any malformed records
+    return np.array(
+        [
+            sequence_to_binary_encoding(
+                *parse_record(line, guide_length, pam_length)
+            )
+            for line in io.StringIO(block.decode(), newline=None)
+        ],
+        dtype=np.uint64,
+    )
+
+
+def read_csv_blocks(
+    inputfile: str, start: int = 0, end: typing.Optional[int] = None
+) -> typing.Iterator[bytes]:
+    """Read whole lines of a CSV file in blocks of about INDEX_CHUNK_SIZE bytes
+
+    :param inputfile: The input CSV file
+    :param start: The byte offset of the first line to read. Default is 0.
+    :param end: The byte offset after the last line to read, this must be at
+        the end of a line. Default is None for the end of the file.
+    :return: An iterator of blocks of whole lines
+    """
+    with open(inputfile, "rb") as in_file:
+        if end is None:
+            end = os.fstat(in_file.fileno()).st_size
+        in_file.seek(start)
+        position = start
+        while position < end:
+            block = in_file.read(min(INDEX_CHUNK_SIZE, end - position))
+            if block == b"":
+                break
+            if position + len(block) < end:
+                # read on to the end of the last line in the block
+                block += in_file.readline()
+            position += len(block)
+            yield block
+
+
+def find_csv_chunks(
+    inputfile: str, chunk_size: int = PARALLEL_CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """Split a CSV file into chunks of whole lines
+
+    :param inputfile: The input CSV file
+    :param chunk_size: The approximate number of bytes in each chunk.
+        Default is PARALLEL_CHUNK_SIZE.
+    :return: A list of the start and end byte offsets of each chunk
+    """
+    chunks = []
+    with open(inputfile, "rb") as in_file:
+        file_size = os.fstat(in_file.fileno()).st_size
+        start = 0
+        while start < file_size:
+            in_file.seek(min(start + chunk_size, file_size))
+            in_file.readline()
+            end = in_file.tell()
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def count_records(inputfile: str, start: int, end: int) -> int:
+    """Count the records in a chunk of a CSV file, one per line
+
+    :param inputfile: The input CSV file
+    :param start: The byte offset of the first line of the chunk
+    :param end: The byte offset after the last line of the chunk
+    :return: The number of records
+    """
+    number_of_records = 0
+    for block in read_csv_blocks(inputfile, start, end):
+        number_of_records += block.count(b"\n")
+        if not block.endswith(b"\n"):
+            # the last line of the file has no newline
+            number_of_records += 1
+    return number_of_records
+
+
+def _index_chunk(
+    inputfile: str,
+    start: int,
+    end: int,
+    outputfile: str,
+    first_record: int,
+    guide_length: int,
+    pam_length: int,
+    packed: bool = False,
+) -> int:
+    """Encode a chunk of a CSV file into its place in the binary file.
+
+    :param inputfile: The input CSV file
+    :param start: The byte offset of the first line of the chunk
+    :param end: The byte offset after the last line of the chunk
+    :param outputfile: The binary output file, already at its full size
+    :param first_record: The index of the first record of the chunk in the
+        binary output file
+    :param guide_length: The length of the guide sequence
+    :param pam_length: The length of the PAM sequence
+    :param packed: Whether to pack the guides, default False
+    :return: The number of records written, or -1 if a record is invalid
+    """
+    number_of_records = 0
+    try:
+        with open(outputfile, "r+b") as out_file:
+            out_file.seek(GUIDES_START + first_record * guide_size(packed))
+            for block in read_csv_blocks(inputfile, start, end):
+                records = encode_records(block, guide_length, pam_length)
+                write_guides(out_file, records, packed)
+                number_of_records += records.size
+    except SystemExit:
+        # the invalid record has been reported, the parent process exits
+        return -1
+    return number_of_records
+
+
+def index_in_parallel(
+    inputfiles: list[str],
+    out_file: typing.BinaryIO,
+    guide_length: int,
+    pam_length: int,
+    processes: int,
+    packed: bool = False,
+) -> np.uint64:
+    """Encode the CSV files in chunks across a pool of processes.
+
+    The records of each chunk are counted first so every chunk is written
+    straight to its place in the binary file, keeping the guide IDs the same
+    as with a single process.
+
+    :param inputfiles: The input CSV files
+    :param out_file: The file handle of the binary output file, with the
+        header written
+    :param guide_length: The length of the guide sequence
+    :param pam_length: The length of the PAM sequence
+    :param processes: The number of processes
+    :param packed: Whether to pack the guides, default False
+    :raises ValueError: If the input files change while being indexed
+    :return: The number of sequences written
+    """
+    chunks = [
+        (inputfile, start, end)
+        for inputfile in inputfiles
+        for start, end in find_csv_chunks(inputfile, PARALLEL_CHUNK_SIZE)
+    ]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes) as pool:
+        counts = pool.starmap(count_records, chunks)
+        first_records = np.cumsum([0] + counts[:-1])
+        out_file.truncate(GUIDES_START + sum(counts) * guide_size(packed))
+        out_file.flush()
+        written = pool.starmap(
+            _index_chunk,
+            [
+                (
+                    *chunk,
+                    out_file.name,
+                    int(first_record),
+                    guide_length,
+                    pam_length,
+                    packed,
+                )
+                for chunk, first_record in zip(chunks, first_records)
+            ],
+        )
+    if -1 in written:
+        sys.exit(2)
+    if written != counts:
+        raise ValueError("Input files changed while indexing")
+    return np.uint64(sum(counts))
+
+
 def index(
     inputfiles: list[str],
     outputfile: str,
@@ -88,6 +462,8 @@ def index(
     guide_length: int = 20,
     pam_length: int = 3,
     verbose: bool = False,
+    processes: int = 1,
+    packed: bool = False,
 ) -> None:
     """Run the CRISPR indexer.
 
@@ -103,8 +479,18 @@ def index(
         (CRISPR excluding guide)
     :param verbose: A boolean indicating if verbose output is enabled.
         Default is False.
+    :param processes: The number of processes encoding chunks of the input
+        files in parallel. The output is the same as with a single process.
+        Default is 1.
+    :param packed: A boolean to write a version 4 file with each guide
+        packed into 6 bytes instead of 8, for guides of at most
+        ``MAX_PACKED_GUIDE_LENGTH`` bases. Default is False.
+    :raises ValueError: If the guides are packed and longer than
+        ``MAX_PACKED_GUIDE_LENGTH``
     :return: None
     """
+    # before the output file is created
+    check_packed_guide_length(guide_length, packed)
     start = time.time()
     number_of_sequences = np.uint64(0)
     if verbose:
@@ -114,38 +500,37 @@ def index(
         for inputfile in inputfiles:
             print(f"\t{inputfile}")
         print("writing metadata")
-        print(f"Version: {FILE_VERSION}")
+        print(f"Version: {PACKED_FILE_VERSION if packed else FILE_VERSION}")
 
     with open(outputfile, "wb") as out_file:
-        # write the file header
-        out_file.write(struct.pack("<BL", np.uint8(1), np.uint(FILE_VERSION)))
-        # write the metadata
-        out_file.write(
-            create_metadata(
-                number_of_sequences,
-                np.uint64(guide_length),
-                np.uint64(offset),
-                np.uint8(species_id),
-                species,
-                assembly,
-            )
+        write_header(
+            out_file,
+            number_of_sequences,
+            guide_length,
+            offset,
+            species_id,
+            species,
+            assembly,
+            packed,
         )
-        # put in a separator of 3 empty bytes before the vector of sequences
-        out_file.write(struct.pack("<BBB", 0, 0, 0))
-        for inputfile in inputfiles:
-            if verbose:
-                print(f"Processing {inputfile}")
-            with open(inputfile, "r") as in_file:
-                for line in in_file:
-                    sequence, pam_right = parse_record(
-                        line, guide_length, pam_length
-                    )
-                    record = sequence_to_binary_encoding(sequence, pam_right)
-                    out_file.write(struct.pack("<Q", record))
-                    number_of_sequences += 1
-        # write the number of sequences in the correct position in the file
-        out_file.seek(5)
-        out_file.write(struct.pack("<Q", number_of_sequences))
+        if processes > 1:
+            number_of_sequences = index_in_parallel(
+                inputfiles,
+                out_file,
+                guide_length,
+                pam_length,
+                processes,
+                packed,
+            )
+        else:
+            for inputfile in inputfiles:
+                if verbose:
+                    print(f"Processing {inputfile}")
+                for block in read_csv_blocks(inputfile):
+                    records = encode_records(block, guide_length, pam_length)
+                    write_guides(out_file, records, packed)
+                    number_of_sequences += np.uint64(records.size)
+        write_number_of_sequences(out_file, number_of_sequences)
         if verbose:
             total = time.time() - start
             print(
@@ -153,6 +538,101 @@ def index(
             )
 
 
+def index_fasta(
+    inputfile: str,
+    outputfile: str,
+    pam: str,
+    species: str,
+    assembly: str,
+    offset: int,
+    species_id: int,
+    csvfile: str = "",
+    verbose: bool = False,
+    packed: bool = False,
+) -> None:
+    """Run the CRISPR gatherer and indexer in one pass over a FASTA file.
+
+    The CRISPRs found in each chromosome are encoded straight into the
+    binary output file without an intermediate CSV file, giving the same
+    output as :func:`py_crispr_analyser.gather.gather` followed by
+    :func:`index`.
+
+    :param inputfile: The input FASTA file containing DNA sequences.
+    :param outputfile: The name of the output binary file to be generated.
+    :param pam: The string PAM sequence to search for e.g. "NGG".
+    :param species: The species name e.g. 'Human'.
+    :param assembly: The assembly name e.g. 'GRCh38'.
+    :param offset: The integer for offset after which to start numbering ID.
+    :param species_id: The integer of the species ID e.g. 1.
+    :param csvfile: Also write the CRISPRs to this CSV file, in the legacy
+        format written by the gatherer. Default is "" for no CSV file.
+    :param verbose: A boolean indicating if verbose output is enabled.
+        Default is False.
+    :param packed: A boolean to write a version 4 file with each guide
+        packed into 6 bytes instead of 8. Default is False.
+    :return: None
+    """
+    start = time.time()
+    number_of_sequences = np.uint64(0)
+    guide_length = GUIDE_RNA_LENGTH
+    # before the output file is created
+    check_packed_guide_length(guide_length, packed)
+    pam_length = len(pam)
+    window_length = guide_length + pam_length
+    csv_context = (
+        open(csvfile, "w", newline="")
+        if csvfile != ""
+        else contextlib.nullcontext()
+    )
+
+    with csv_context as csv_file, open(outputfile, "wb") as out_file:
+        write_header(
+            out_file,
+            number_of_sequences,
+            guide_length,
+            offset,
+            species_id,
+            species,
+            assembly,
+            packed,
+        )
+        for chromosome, sequence in read_chromosomes(inputfile):
+            if verbose:
+                print(f"Processing chromosome {chromosome}...")
+            positions, pam_right = find_crisprs(sequence, pam)
+            if csv_file is not None:
+                write_crisprs(
+                    csv.writer(csv_file),
+                    chromosome,
+                    sequence,
+                    positions,
+                    pam_right,
+                    window_length,
+                    legacy_mode=True,
+                )
+            if positions.size == 0:
+                continue
+            windows = sliding_window_view(sequence, window_length)
+            for chunk in range(0, positions.size, ENCODE_CHUNK_SIZE):
+                chunk_windows = windows[positions[chunk:][:ENCODE_CHUNK_SIZE]]
+                chunk_pam_right = pam_right[chunk:][:ENCODE_CHUNK_SIZE]
+                guides = np.where(
+                    chunk_pam_right[:, np.newaxis] == 1,
+                    chunk_windows[:, :guide_length],
+                    chunk_windows[:, pam_length:],
+                )
+                write_guides(
+                    out_file,
+                    sequences_to_binary_encoding(guides, chunk_pam_right),
+                    packed,
+                )
+            number_of_sequences += np.uint64(positions.size)
+        write_number_of_sequences(out_file, number_of_sequences)
+    if verbose:
+        total = time.time() - start
+        print(f"Indexed {number_of_sequences} sequences in {total} seconds")
+
+
 def run(argv=sys.argv[1:]) -> None:
     """Run the CRISPR indexer from the command line.
 
@@ -160,13 +640,23 @@ def run(argv=sys.argv[1:]) -> None:
     :return: None
     """
     inputfiles = []
+    fastafile = ""
+    pam = ""
+    csvfile = ""
     outputfile = ""
+    seedfile = ""
+    sortedfile = ""
+    strandfile = ""
     species = ""
     species_id = np.uint8(0)
     assembly = ""
     offset = np.uint64(0)
     guide_length = 20
     pam_length = 3
+    # the lengths are set by --pam with --fasta
+    lengths_given = False
+    processes = 1
+    packed = False
 
     def usage():
         print(
@@ -174,19 +664,32 @@ def run(argv=sys.argv[1:]) -> None:
 -a, --assembly <name>         The assembly name
 -e, --species_id <integer>    The species ID
 -f, --offset <integer>        The offset to start numbering from
--g, --guide_length <integer>  The length of the guide sequence
+-g, --guide_length <integer>  The length of the guide sequence, not with
+                              --fasta
 -h, --help                    Print this help message
 -i, --ifile <file>            The input CSV file
 -o, --ofile <file>            The ouput file
--p, --pam_length <integer>    The length of the PAM sequence
+-p, --pam_length <integer>    The length of the PAM sequence, not with
+                              --fasta
 -s, --species <name>          The species name
+-t, --processes <n>           The number of processes encoding the CSV files
+--seed_index <file>           Also write a seed index for align to this file
+--sorted_index <file>         Also write a sorted index for search to this file
+--strand_index <file>         Also write a strand index for align to this file
+--fasta <file>                Gather and index the CRISPRs of a FASTA file in
+                              one pass, instead of reading CSV files
+--pam <pam seq>               The PAM sequence to search for with --fasta
+--csv <file>                  Also write the CSV file of CRISPRs with --fasta
+--packed                      Pack each guide into 6 bytes instead of 8
+                              (file version 4), for guides of at most 23
+                              bases
 """
         )
 
     try:
         opts, _ = getopt.getopt(
             argv,
-            "hi:o:a:s:f:e:g:p:",
+            "hi:o:a:s:f:e:g:p:t:",
             [
                 "help",
                 "ifile=",
@@ -197,6 +700,14 @@ def run(argv=sys.argv[1:]) -> None:
                 "species_id=",
                 "guide_length=",
                 "pam_length=",
+                "processes=",
+                "seed_index=",
+                "sorted_index=",
+                "strand_index=",
+                "fasta=",
+                "pam=",
+                "csv=",
+                "packed",
             ],
         )
     except getopt.GetoptError as err:
@@ -221,24 +732,81 @@ def run(argv=sys.argv[1:]) -> None:
             species_id = np.uint8(arg)
         elif opt in ("-g", "--guide_length"):
             guide_length = int(arg)
+            lengths_given = True
         elif opt in ("-p", "--pam_length"):
             pam_length = int(arg)
+            lengths_given = True
+        elif opt in ("-t", "--processes"):
+            processes = int(arg)
+        elif opt == "--seed_index":
+            seedfile = arg
+        elif opt == "--sorted_index":
+            sortedfile = arg
+        elif opt == "--strand_index":
+            strandfile = arg
+        elif opt == "--fasta":
+            fastafile = arg
+        elif opt == "--pam":
+            pam = arg
+        elif opt == "--csv":
+            csvfile = arg
+        elif opt == "--packed":
+            packed = True
         else:
             print("Unhandled Option")
             usage()
             sys.exit(2)
-    if inputfiles == [] or outputfile == "" or assembly == "" or species == "":
+    # either CSV input files or a FASTA file and PAM are required
+    if fastafile == "":
+        invalid_input = inputfiles == [] or pam != ""
+    else:
+        invalid_input = inputfiles != [] or pam == "" or lengths_given
+    if invalid_input or outputfile == "" or assembly == "" or species == "":
+        usage()
+        sys.exit(2)
+    try:
+        check_packed_guide_length(guide_length, packed)
+    except ValueError as err:
+        print(err)
         usage()
         sys.exit(2)
 
-    index(
-        inputfiles,
-        outputfile,
-        species,
-        assembly,
-        int(offset),
-        int(species_id),
-        guide_length,
-        pam_length,
-        verbose=True,
-    )
+    if fastafile != "":
+        index_fasta(
+            fastafile,
+            outputfile,
+            pam,
+            species,
+            assembly,
+            int(offset),
+            int(species_id),
+            csvfile=csvfile,
+            verbose=True,
+            packed=packed,
+        )
+        guide_length = GUIDE_RNA_LENGTH
+    else:
+        index(
+            inputfiles,
+            outputfile,
+            species,
+            assembly,
+            int(offset),
+            int(species_id),
+            guide_length,
+            pam_length,
+            verbose=True,
+            processes=processes,
+            packed=packed,
+        )
+    if seedfile != "" or sortedfile != "" or strandfile != "":
+        with open(outputfile, "rb") as guides_file:
+            guides = get_guides(guides_file, mmap=True)
+            if seedfile != "":
+                write_seed_index(seedfile, guides, guide_length, verbose=True)
+            if sortedfile != "":
+                write_sorted_index(sortedfile, guides, verbose=True)
+            if strandfile != "":
+                write_strand_index(
+                    strandfile, guides, guide_length, verbose=True
+                )
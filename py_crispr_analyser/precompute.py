@@ -0,0 +1,233 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+from dataclasses import dataclass
+import numpy as np
+import os
+import struct
+import sys
+import time
+import typing
+
+SUMMARY_FILE_VERSION = np.uint16(1)
+# padded so the summaries start on an 8 byte boundary
+SUMMARY_HEADER_FORMAT = "<BLQQLL3x"
+SUMMARY_HEADER_SIZE = struct.calcsize(SUMMARY_HEADER_FORMAT)
+
+
+@dataclass
+class PrecomputedSummaries:
+    """A dataclass to hold the off-target summaries of a range of CRISPRs.
+
+    ``summaries[i]`` holds the number of off-targets with each number of
+    mismatches of the CRISPR with ID ``first_id + i``.
+    """
+
+    first_id: np.uint64
+    max_off_targets: np.uint32
+    summaries: np.ndarray
+
+
+class SummaryWriter:
+    """Append the off-target summaries of a range of CRISPRs to a file,
+    batch by batch, recording the next CRISPR ID in a checkpoint file.
+
+    The summaries file has a header followed by one row of
+    ``max_mismatches`` 32-bit counts per CRISPR, in ID order. After each
+    batch the summaries are flushed to disk before the checkpoint is
+    replaced, so a job that is killed resumes from the last checkpoint,
+    dropping any summaries written after it.
+    """
+
+    def __init__(
+        self,
+        outputfile: str,
+        checkpointfile: str,
+        first_id: int,
+        last_id: int,
+        max_mismatches: int,
+        max_off_targets: int,
+    ) -> None:
+        """Open the summaries file, resuming from the checkpoint if there is
+        one, otherwise starting a new file
+
+        :param outputfile: The summaries file
+        :param checkpointfile: The checkpoint file
+        :param first_id: The first CRISPR ID of the range
+        :param last_id: The last CRISPR ID of the range, inclusive
+        :param max_mismatches: The mismatch limit, the width of each summary
+        :param max_off_targets: The off-target cap of the search
+        :raises ValueError: If the range is empty
+        :raises ValueError: If the summaries file of the checkpoint is
+            missing, written for another range or search, or shorter than
+            the checkpoint
+        """
+        if not 0 < first_id <= last_id:
+            raise ValueError(f"Invalid range {first_id}-{last_id}")
+        self.first_id = first_id
+        self.last_id = last_id
+        self.max_mismatches = max_mismatches
+        self.checkpointfile = checkpointfile
+        self.row_size = max_mismatches * 4
+        header = struct.pack(
+            SUMMARY_HEADER_FORMAT,
+            np.uint8(1),
+            np.uint(SUMMARY_FILE_VERSION),
+            np.uint64(first_id),
+            np.uint64(last_id - first_id + 1),
+            np.uint32(max_mismatches),
+            np.uint32(max_off_targets),
+        )
+        if not os.path.exists(checkpointfile):
+            self.next_id = first_id
+            self.out_file = open(outputfile, "wb")
+            self.out_file.write(header)
+            # the header is on disk before the checkpoint refers to it
+            self.out_file.flush()
+            os.fsync(self.out_file.fileno())
+            self._checkpoint()
+            return
+        self.next_id = read_checkpoint(checkpointfile)
+        if not os.path.exists(outputfile):
+            raise ValueError(f"The summaries file {outputfile} is missing")
+        self.out_file = open(outputfile, "r+b")
+        if self.out_file.read(SUMMARY_HEADER_SIZE) != header:
+            self.out_file.close()
+            raise ValueError(
+                f"The summaries file {outputfile} is for another range or "
+                "search"
+            )
+        size = SUMMARY_HEADER_SIZE + (self.next_id - first_id) * self.row_size
+        if (
+            not first_id <= self.next_id <= last_id + 1
+            or os.fstat(self.out_file.fileno()).st_size < size
+        ):
+            self.out_file.close()
+            raise ValueError(
+                f"The summaries file {outputfile} does not match the "
+                "checkpoint"
+            )
+        # drop any summaries written after the checkpoint
+        self.out_file.truncate(size)
+        self.out_file.seek(size)
+
+    def __enter__(self) -> "SummaryWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the summaries file
+
+        :return: None
+        """
+        self.out_file.close()
+
+    @property
+    def done(self) -> bool:
+        """Whether the summaries of the whole range are written"""
+        return self.next_id > self.last_id
+
+    def write(self, summaries: np.ndarray) -> None:
+        """Append the summaries of the next CRISPRs and move the checkpoint
+        past them
+
+        :param summaries: The summaries, one row per CRISPR from
+            ``next_id``
+        :raises ValueError: If the summaries go past the end of the range
+        :return: None
+        """
+        if self.next_id + summaries.shape[0] > self.last_id + 1:
+            raise ValueError("Summaries past the end of the range")
+        np.ascontiguousarray(summaries, dtype=np.uint32).tofile(self.out_file)
+        self.out_file.flush()
+        os.fsync(self.out_file.fileno())
+        self.next_id += summaries.shape[0]
+        self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        """Replace the checkpoint file with the next CRISPR ID"""
+        write_checkpoint(self.checkpointfile, self.next_id)
+
+
+def read_checkpoint(checkpointfile: str) -> int:
+    """Read the next CRISPR ID from a checkpoint file
+
+    :param checkpointfile: The checkpoint file
+    :raises ValueError: If the checkpoint file is not a CRISPR ID
+    :return: The next CRISPR ID to search
+    """
+    with open(checkpointfile) as checkpoint:
+        next_id = checkpoint.read().strip()
+    if not next_id.isdigit():
+        raise ValueError(f"Invalid checkpoint file {checkpointfile}")
+    return int(next_id)
+
+
+def write_checkpoint(checkpointfile: str, next_id: int) -> None:
+    """Write the next CRISPR ID to a checkpoint file, replacing it at once so
+    a killed job leaves either the old or the new checkpoint
+
+    :param checkpointfile: The checkpoint file
+    :param next_id: The next CRISPR ID to search
+    :return: None
+    """
+    temporary_file = f"{checkpointfile}.tmp"
+    with open(temporary_file, "w") as checkpoint:
+        checkpoint.write(f"{next_id}\n")
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+    os.replace(temporary_file, checkpointfile)
+
+
+def get_precomputed_summaries(
+    summaryfile_handle: typing.BinaryIO, verbose: bool = False
+) -> PrecomputedSummaries:
+    """Get the off-target summaries from a complete summaries file.
+
+    The summaries are memory-mapped.
+
+    :param summaryfile_handle: The file handle of the summaries file
+    :param verbose: A boolean to print verbose output
+    :raises ValueError: If the file version is not supported
+    :raises ValueError: If the file size does not match the header, as
+        when the job writing it has not finished
+    :return: A PrecomputedSummaries object
+    """
+    start = time.time()
+    summaryfile_handle.seek(0)
+    header = summaryfile_handle.read(SUMMARY_HEADER_SIZE)
+    if len(header) != SUMMARY_HEADER_SIZE:
+        raise ValueError("Invalid summaries header length")
+    (
+        _,
+        version,
+        first_id,
+        number_of_crisprs,
+        max_mismatches,
+        max_off_targets,
+    ) = struct.unpack(SUMMARY_HEADER_FORMAT, header)
+    if version != SUMMARY_FILE_VERSION:
+        raise ValueError("Invalid summaries version")
+    file_size = os.fstat(summaryfile_handle.fileno()).st_size
+    if file_size - SUMMARY_HEADER_SIZE != (
+        number_of_crisprs * max_mismatches * 4
+    ):
+        raise ValueError("Invalid summaries size")
+    summaries = np.memmap(
+        summaryfile_handle,
+        dtype=np.uint32,
+        mode="r",
+        offset=SUMMARY_HEADER_SIZE,
+        shape=(number_of_crisprs, max_mismatches),
+    )
+    if verbose:
+        print(
+            f"Loading summaries took {time.time() - start:.2f} seconds",
+            file=sys.stderr,
+        )
+    return PrecomputedSummaries(
+        first_id=np.uint64(first_id),
+        max_off_targets=np.uint32(max_off_targets),
+        summaries=summaries,
+    )
@@ -2,49 +2,282 @@
 
 import getopt
 import numpy as np
+import os
+import struct
 import sys
+import time
+import typing
 
 from .utils import (
-    FILE_VERSION,
+    ERROR_STR,
     HEADER_SIZE,
     METADATA_SIZE,
+    PACKED_GUIDE_DTYPE,
     check_file_header,
     get_guides,
     get_file_metadata,
+    iterate_guides,
+    pack_guides,
     print_metadata,
     sequence_to_binary_encoding,
     reverse_complement,
+    unpack_guides,
 )
 
+SORTED_FILE_VERSION = np.uint16(1)
+SORTED_HEADER_FORMAT = "<BLQ"
+SORTED_HEADER_SIZE = struct.calcsize(SORTED_HEADER_FORMAT)
+SCAN_CHUNK_SIZE = 1 << 24
+# a view of packed guides comparing the high field first, so they sort in
+# the order of the unpacked guides
+PACKED_SORT_DTYPE = np.dtype(
+    {
+        "names": ["high", "low"],
+        "formats": ["<u2", "<u4"],
+        "offsets": [4, 0],
+        "itemsize": PACKED_GUIDE_DTYPE.itemsize,
+    }
+)
+
+
+def sort_keys(
+    guides: np.ndarray, queries: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Get the guides and queries as keys ordered as the unpacked guides,
+    for a binary search of packed guides without unpacking them
+
+    :param guides: The array of guides, packed or not
+    :param queries: The array of encoded query sequences
+    :return: The guides and the queries, viewed as ``PACKED_SORT_DTYPE``
+        if the guides are packed
+    """
+    queries = np.asarray(queries, dtype=np.uint64)
+    if guides.dtype != PACKED_GUIDE_DTYPE:
+        return guides, queries
+    return guides.view(PACKED_SORT_DTYPE), pack_guides(queries).view(
+        PACKED_SORT_DTYPE
+    )
+
+
+def write_sorted_index(
+    outputfile: str, guides: np.ndarray, verbose: bool = False
+) -> None:
+    """Write the permutation which sorts the guides to a file.
+
+    :param outputfile: The name of the sorted index file to be generated
+    :param guides: The numpy uint64 array of guides
+    :param verbose: A boolean indicating if verbose output is enabled.
+        Default is False.
+    :return: None
+    """
+    start = time.time()
+    # intp so that np.searchsorted can use it as a sorter without a copy
+    sorted_index = np.argsort(guides, kind="stable").astype(np.intp)
+    with open(outputfile, "wb") as out_file:
+        out_file.write(
+            struct.pack(
+                SORTED_HEADER_FORMAT,
+                np.uint8(1),
+                np.uint(SORTED_FILE_VERSION),
+                np.uint64(guides.size),
+            )
+        )
+        sorted_index.tofile(out_file)
+    if verbose:
+        print(f"Built sorted index in {time.time() - start} seconds")
+
+
+def get_sorted_index(
+    sortedfile_handle: typing.BinaryIO,
+    verbose: bool = False,
+    mmap: bool = False,
+) -> np.ndarray:
+    """Get the permutation which sorts the guides from the sorted index file.
+
+    :param sortedfile_handle: The file handle of the sorted index file
+    :param verbose: A boolean to print verbose output
+    :param mmap: A boolean to return a read-only memory-mapped view of the
+        sorted index instead of reading it into memory. Default is False.
+    :raises ValueError: If the file version is not supported
+    :raises ValueError: If the file size does not match the header
+    :return: A numpy array of guide indices in sorted guide order
+    """
+    start = time.time()
+    sortedfile_handle.seek(0)
+    header = sortedfile_handle.read(SORTED_HEADER_SIZE)
+    if len(header) != SORTED_HEADER_SIZE:
+        raise ValueError("Invalid sorted index header length")
+    _, version, number_of_guides = struct.unpack(SORTED_HEADER_FORMAT, header)
+    if version != SORTED_FILE_VERSION:
+        raise ValueError("Invalid sorted index version")
+    file_size = os.fstat(sortedfile_handle.fileno()).st_size
+    itemsize = np.dtype(np.intp).itemsize
+    if file_size - SORTED_HEADER_SIZE != number_of_guides * itemsize:
+        raise ValueError("Invalid sorted index size")
+    if mmap and number_of_guides > 0:
+        sorted_index = np.memmap(
+            sortedfile_handle,
+            dtype=np.intp,
+            mode="r",
+            offset=SORTED_HEADER_SIZE,
+            shape=(number_of_guides,),
+        )
+    else:
+        sortedfile_handle.seek(SORTED_HEADER_SIZE)
+        sorted_index = np.fromfile(sortedfile_handle, dtype=np.intp)
+    if verbose:
+        print(
+            f"Loading sorted index took {time.time() - start:.2f} seconds",
+            file=sys.stderr,
+        )
+    return sorted_index
+
 
 def search(
     guides: np.ndarray,
     sequence: str,
     pam_right: int = 2,
+    sorted_index: typing.Optional[np.ndarray] = None,
 ) -> list[int]:
     """Search for a sequence in an indexed binary file
 
-    :param guides: The numpy uint64 array of guides
+    :param guides: The array of guides, packed with ``PACKED_GUIDE_DTYPE``
+        or not
     :param sequence: The query sequence to search for
     :param pam_right: PAM position filter — 0 for left, 1 for right, 2 for both
+    :param sorted_index: The permutation which sorts the guides (see
+        :func:`get_sorted_index`). When given the matches are found by binary
+        search instead of scanning all the guides. Default is None.
     :return: A list of indices where the sequence is found
     """
     reverse_sequence = reverse_complement(sequence)
     query_sequence = sequence_to_binary_encoding(sequence, 1)
     reverse_query_sequence = sequence_to_binary_encoding(reverse_sequence, 0)
     if pam_right == 1:
-        mask = guides == query_sequence
+        query_sequences = [query_sequence]
     elif pam_right == 0:
-        mask = guides == reverse_query_sequence
+        query_sequences = [reverse_query_sequence]
     elif pam_right == 2:
-        mask = (guides == query_sequence) | (guides == reverse_query_sequence)
+        query_sequences = [query_sequence, reverse_query_sequence]
     else:
         raise ValueError(f"Unknown pam_right value: {pam_right}")
-    indices = np.where(mask)
+    if sorted_index is None:
+        found_indices = [np.empty(0, dtype=np.intp)]
+        for start, chunk in iterate_guides(guides, SCAN_CHUNK_SIZE):
+            chunk = unpack_guides(chunk)
+            mask = chunk == query_sequences[0]
+            for query in query_sequences[1:]:
+                mask |= chunk == query
+            found_indices.append(np.flatnonzero(mask) + start)
+        indices = np.concatenate(found_indices)
+    else:
+        keys, queries = sort_keys(guides, query_sequences)
+        ranges = [
+            (
+                np.searchsorted(keys, query, "left", sorter=sorted_index),
+                np.searchsorted(keys, query, "right", sorter=sorted_index),
+            )
+            for query in queries
+        ]
+        indices = np.sort(
+            np.concatenate([sorted_index[lo:hi] for lo, hi in ranges])
+        )
     # the binary index is 0-based,
     # so we add the offset and 1 to make it 1-based as per the db
     # this follows how we numbered the WGE index
-    return [x + 1 for x in indices[0].tolist()]
+    return [x + 1 for x in indices.tolist()]
+
+
+def search_batch(
+    guides: np.ndarray,
+    sequences: list[str],
+    pam_right: int = 2,
+    sorted_index: typing.Optional[np.ndarray] = None,
+) -> typing.Iterator[tuple[str, int]]:
+    """Search for many sequences in an indexed binary file at once
+
+    All the sequences are resolved in a single pass over the guides, or with
+    one vectorised binary search when the sorted index is given. Sequences
+    containing an N cannot match a guide and are skipped.
+
+    :param guides: The array of guides, packed with ``PACKED_GUIDE_DTYPE``
+        or not
+    :param sequences: The query sequences to search for
+    :param pam_right: PAM position filter — 0 for left, 1 for right, 2 for both
+    :param sorted_index: The permutation which sorts the guides (see
+        :func:`get_sorted_index`). Default is None.
+    :return: An iterator of (sequence, index) tuples in the order of the
+        sequences, the indices of each sequence in ascending order
+    """
+    if pam_right not in (0, 1, 2):
+        raise ValueError(f"Unknown pam_right value: {pam_right}")
+    sequence_queries = []
+    for sequence in sequences:
+        queries = []
+        if pam_right in (1, 2):
+            queries.append(sequence_to_binary_encoding(sequence, 1))
+        if pam_right in (0, 2):
+            queries.append(
+                sequence_to_binary_encoding(reverse_complement(sequence), 0)
+            )
+        sequence_queries.append([q for q in queries if q != ERROR_STR])
+    unique_queries = np.unique(
+        np.array(
+            [q for queries in sequence_queries for q in queries],
+            dtype=np.uint64,
+        )
+    )
+
+    if unique_queries.size == 0:
+        return
+    if sorted_index is None:
+        # merge join of each chunk of guides against the sorted queries
+        found_indices = [np.empty(0, dtype=np.intp)]
+        found_queries = [np.empty(0, dtype=np.intp)]
+        for start, chunk in iterate_guides(guides, SCAN_CHUNK_SIZE):
+            chunk = unpack_guides(chunk)
+            positions = np.searchsorted(unique_queries, chunk)
+            positions[positions == unique_queries.size] = 0
+            matches = np.flatnonzero(unique_queries[positions] == chunk)
+            found_indices.append(matches + start)
+            found_queries.append(positions[matches])
+        indices = np.concatenate(found_indices)
+        query_positions = np.concatenate(found_queries)
+        order = np.argsort(query_positions, kind="stable")
+        indices = indices[order]
+        bounds = np.searchsorted(
+            query_positions[order], np.arange(unique_queries.size + 1)
+        )
+    else:
+        keys, queries = sort_keys(guides, unique_queries)
+        lower = np.searchsorted(keys, queries, "left", sorted_index)
+        upper = np.searchsorted(keys, queries, "right", sorted_index)
+        indices = np.concatenate(
+            [np.sort(sorted_index[lo:hi]) for lo, hi in zip(lower, upper)]
+        )
+        bounds = np.concatenate([[0], np.cumsum(upper - lower)])
+
+    for sequence, queries in zip(sequences, sequence_queries):
+        positions = np.searchsorted(unique_queries, queries)
+        matches = np.concatenate(
+            [np.empty(0, dtype=np.intp)]
+            + [
+                indices[start:end]
+                for start, end in zip(bounds[positions], bounds[positions + 1])
+            ]
+        )
+        # the binary index is 0-based, so we add 1 as for search
+        for idx in np.sort(matches).tolist():
+            yield sequence, idx + 1
+
+
+def read_sequences(sequences_file: typing.TextIO) -> list[str]:
+    """Read the query sequences, one per line, from a file
+
+    :param sequences_file: The file handle of the sequences file
+    :return: A list of the sequences, skipping empty lines
+    """
+    return [line.strip() for line in sequences_file if line.strip() != ""]
 
 
 def run(argv=sys.argv[1:]) -> None:
@@ -54,8 +287,11 @@ def run(argv=sys.argv[1:]) -> None:
     :return: None
     """
     inputfile = ""
+    sortedfile = ""
     sequence = ""
+    sequencesfile = ""
     pam_right = 2
+    use_mmap = False
 
     def usage() -> None:
         print(
@@ -63,19 +299,28 @@ def run(argv=sys.argv[1:]) -> None:
 -h, --help            Print this help message
 -i, --ifile <file>    The input binary guides file
 -s, --sequence <str>  The guide sequence to search for
+-f, --sequences_file <file>
+                      A file of guide sequences to search for, one per line,
+                      or - for STDIN. Matches are printed as sequence,id
 -p, --pam_right <int> PAM position: 0=left, 1=right, 2=both (default: 2)
+--mmap                Memory-map the guides instead of reading them in,
+                      packed (version 4) guides are searched as they are
+--sorted_index <file> Use the sorted index file built by crispr_analyser_index
 """
         )
 
     try:
         opts, _ = getopt.getopt(
             argv,
-            "hi:s:p:",
+            "hi:s:f:p:",
             [
                 "help",
                 "ifile=",
                 "sequence=",
+                "sequences_file=",
                 "pam_right=",
+                "mmap",
+                "sorted_index=",
             ],
         )
     except getopt.GetoptError as err:
@@ -90,23 +335,57 @@ def run(argv=sys.argv[1:]) -> None:
             inputfile = arg
         elif opt in ("-s", "--sequence"):
             sequence = arg
+        elif opt in ("-f", "--sequences_file"):
+            sequencesfile = arg
         elif opt in ("-p", "--pam_right"):
             pam_right = int(arg)
-    if inputfile == "" or sequence == "":
+        elif opt == "--mmap":
+            use_mmap = True
+        elif opt == "--sorted_index":
+            sortedfile = arg
+    if inputfile == "" or (sequence == "") == (sequencesfile == ""):
         usage()
         sys.exit(2)
 
     with open(inputfile, "rb") as in_file:
-        check_file_header(in_file.read(HEADER_SIZE))
-        print(f"Version is {FILE_VERSION}", file=sys.stderr)
+        version = check_file_header(in_file.read(HEADER_SIZE))
+        print(f"Version is {version}", file=sys.stderr)
         metadata = get_file_metadata(in_file.read(METADATA_SIZE))
         print_metadata(metadata)
-        guides = get_guides(in_file, verbose=True)
+        # packed guides are searched as they are, so --mmap keeps them mapped
+        guides = get_guides(in_file, verbose=True, mmap=use_mmap, packed=True)
         print(f"Loaded {guides.size} sequences", file=sys.stderr)
+        sorted_index = None
+        if sortedfile != "":
+            with open(sortedfile, "rb") as sorted_file:
+                sorted_index = get_sorted_index(
+                    sorted_file, verbose=True, mmap=use_mmap
+                )
+            if sorted_index.size != guides.size:
+                raise ValueError("Sorted index does not match the guides")
+        if sequencesfile != "":
+            if sequencesfile == "-":
+                sequences = read_sequences(sys.stdin)
+            else:
+                with open(sequencesfile, "r") as sequences_file:
+                    sequences = read_sequences(sequences_file)
+            print(f"Searching for {len(sequences)} sequences", file=sys.stderr)
+            number_of_matches = 0
+            for match_sequence, idx in search_batch(
+                guides=guides,
+                sequences=sequences,
+                pam_right=pam_right,
+                sorted_index=sorted_index,
+            ):
+                print(f"{match_sequence},{idx + metadata.offset}")
+                number_of_matches += 1
+            print(f"Found {number_of_matches} exact matches", file=sys.stderr)
+            return
         indices = search(
             guides=guides,
             sequence=sequence,
             pam_right=pam_right,
+            sorted_index=sorted_index,
         )
         print(f"Found {len(indices)} exact matches", file=sys.stderr)
         print("Found the following matches:", file=sys.stderr)
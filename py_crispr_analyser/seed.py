@@ -0,0 +1,202 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+from dataclasses import dataclass
+import numpy as np
+import os
+import struct
+import sys
+import time
+import typing
+
+from .utils import ERROR_STR
+
+SEED_FILE_VERSION = np.uint16(1)
+SEED_HEADER_FORMAT = "<BLQQQ"
+SEED_HEADER_SIZE = struct.calcsize(SEED_HEADER_FORMAT)
+SEED_SEGMENTS = 5
+PAM_SHIFT = 40
+
+
+@dataclass
+class SeedIndex:
+    """A dataclass to hold a pigeonhole seed index of the guides.
+
+    The guide sequence is split into ``segments`` parts. For every segment
+    the guides are bucketed by the bases in that segment plus the PAM flag,
+    ``offsets[segment, key]`` to ``offsets[segment, key + 1]`` being the
+    range of ``postings[segment]`` holding the 0-based guide indices
+    with that key. Any guide with fewer mismatches than ``segments`` shares
+    at least one key with the query.
+    """
+
+    number_of_guides: np.uint64
+    guide_length: np.uint64
+    segments: np.uint64
+    shifts: np.ndarray
+    masks: np.ndarray
+    offsets: np.ndarray
+    postings: np.ndarray
+
+
+def segment_layout(
+    guide_length: int, segments: int
+) -> tuple[np.ndarray, np.ndarray, int]:
+    """Split the encoded guide sequence into segments of near equal length.
+
+    :param guide_length: The length of the guide sequence
+    :param segments: The number of segments
+    :raises ValueError: If there are more segments than bases
+    :return: A tuple of the bit shift and bit mask of each segment and the
+        number of keys per segment
+    """
+    if segments < 1 or segments > guide_length:
+        raise ValueError(
+            f"Cannot split a guide of length {guide_length} "
+            f"into {segments} segments"
+        )
+    bounds = np.linspace(0, guide_length, segments + 1).astype(np.uint64)
+    lengths = np.diff(bounds)
+    shifts = bounds[:-1] * np.uint64(2)
+    masks = (np.uint64(1) << (lengths * np.uint64(2))) - np.uint64(1)
+    number_of_keys = 1 << (2 * int(lengths.max()) + 1)
+    return shifts, masks, number_of_keys
+
+
+def segment_keys(
+    guides: np.ndarray,
+    shift: np.uint64,
+    mask: np.uint64,
+    pam_shift: int = PAM_SHIFT,
+) -> np.ndarray:
+    """Get the seed keys of the guides for a single segment.
+
+    The key is the segment bases followed by the PAM flag in the lowest bit.
+
+    :param guides: The array of encoded gRNA sequences
+    :param shift: The bit shift of the segment
+    :param mask: The bit mask of the segment
+    :param pam_shift: The bit shift of the PAM flag, twice the guide length,
+        default ``PAM_SHIFT``
+    :return: An array of keys, one per guide
+    """
+    bases = (guides >> shift) & mask
+    pam_flag = (guides >> np.uint64(pam_shift)) & np.uint64(1)
+    return (bases << np.uint64(1)) | pam_flag
+
+
+def write_seed_index(
+    outputfile: str,
+    guides: np.ndarray,
+    guide_length: int,
+    segments: int = SEED_SEGMENTS,
+    verbose: bool = False,
+) -> None:
+    """Build the seed index of the guides and write it to a file.
+
+    Guides flagged with ``ERROR_STR`` are left out of the index.
+
+    :param outputfile: The name of the seed index file to be generated
+    :param guides: The array of encoded gRNA sequences
+    :param guide_length: The length of the guide sequence
+    :param segments: The number of segments, default ``SEED_SEGMENTS``.
+        Must be at least the mismatch limit used by align.
+    :param verbose: A boolean indicating if verbose output is enabled.
+        Default is False.
+    :raises ValueError: If there are too many guides for the index
+    :return: None
+    """
+    start = time.time()
+    if guides.size > np.iinfo(np.uint32).max:
+        raise ValueError("Too many guides for a seed index")
+    shifts, masks, number_of_keys = segment_layout(guide_length, segments)
+    valid = np.flatnonzero(guides != ERROR_STR).astype(np.uint32)
+    valid_guides = guides[valid]
+    offsets = np.zeros((segments, number_of_keys + 1), dtype=np.uint64)
+    with open(outputfile, "wb") as out_file:
+        out_file.write(
+            struct.pack(
+                SEED_HEADER_FORMAT,
+                np.uint8(1),
+                np.uint(SEED_FILE_VERSION),
+                np.uint64(guides.size),
+                np.uint64(guide_length),
+                np.uint64(segments),
+            )
+        )
+        # reserve the space for the offsets which are filled in below
+        offsets.tofile(out_file)
+        for segment in range(segments):
+            keys = segment_keys(
+                valid_guides, shifts[segment], masks[segment], 2 * guide_length
+            ).astype(np.intp)
+            order = np.argsort(keys, kind="stable")
+            valid[order].tofile(out_file)
+            counts = np.bincount(keys, minlength=number_of_keys)
+            offsets[segment, 1:] = np.cumsum(counts)
+            if verbose:
+                print(f"Indexed seed segment {segment + 1} of {segments}")
+        out_file.seek(SEED_HEADER_SIZE)
+        offsets.tofile(out_file)
+    if verbose:
+        print(f"Built seed index in {time.time() - start} seconds")
+
+
+def get_seed_index(
+    seedfile_handle: typing.BinaryIO, verbose: bool = False
+) -> SeedIndex:
+    """Get the seed index from the seed index file.
+
+    The postings are memory-mapped so only the buckets touched by a query
+    are read from disk.
+
+    :param seedfile_handle: The file handle of the seed index file
+    :param verbose: A boolean to print verbose output
+    :raises ValueError: If the file version is not supported
+    :raises ValueError: If the file size does not match the header
+    :return: A SeedIndex object
+    """
+    start = time.time()
+    seedfile_handle.seek(0)
+    header = seedfile_handle.read(SEED_HEADER_SIZE)
+    if len(header) != SEED_HEADER_SIZE:
+        raise ValueError("Invalid seed index header length")
+    _, version, number_of_guides, guide_length, segments = struct.unpack(
+        SEED_HEADER_FORMAT, header
+    )
+    if version != SEED_FILE_VERSION:
+        raise ValueError("Invalid seed index version")
+    shifts, masks, number_of_keys = segment_layout(guide_length, segments)
+    offsets = np.fromfile(
+        seedfile_handle,
+        dtype=np.uint64,
+        count=segments * (number_of_keys + 1),
+    ).reshape(segments, number_of_keys + 1)
+    postings_start = SEED_HEADER_SIZE + offsets.nbytes
+    number_of_postings = int(offsets[0, -1])
+    file_size = os.fstat(seedfile_handle.fileno()).st_size
+    if file_size - postings_start != segments * number_of_postings * 4:
+        raise ValueError("Invalid seed index size")
+    if number_of_postings == 0:
+        postings = np.empty((segments, 0), dtype=np.uint32)
+    else:
+        postings = np.memmap(
+            seedfile_handle,
+            dtype=np.uint32,
+            mode="r",
+            offset=postings_start,
+            shape=(segments, number_of_postings),
+        )
+    if verbose:
+        print(
+            f"Loading seed index took {time.time() - start:.2f} seconds",
+            file=sys.stderr,
+        )
+    return SeedIndex(
+        number_of_guides=np.uint64(number_of_guides),
+        guide_length=np.uint64(guide_length),
+        segments=np.uint64(segments),
+        shifts=shifts,
+        masks=masks,
+        offsets=offsets,
+        postings=postings,
+    )
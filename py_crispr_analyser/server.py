@@ -0,0 +1,258 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import getopt
+import numpy as np
+import os
+import socketserver
+import stat
+import sys
+import time
+import typing
+
+from .align import (
+    BACKENDS,
+    MAX_MISSMATCHES,
+    MAX_OFF_TARGETS,
+    CpuBackend,
+    OffTargetBackend,
+    SearchParameters,
+    align_crisprs,
+    load_guides,
+    select_backend,
+)
+from .seed import get_seed_index
+from .strand import get_strand_index
+from .utils import Metadata
+
+
+class AlignRequestHandler(socketserver.StreamRequestHandler):
+    """Answer off-target requests on a connection to the align server.
+
+    Each request is a line of whitespace separated CRISPR IDs. The reply is
+    one line per ID in the format printed by ``crispr_analyser_align``, or a
+    single line starting with ``Error:`` if the request is invalid.
+    """
+
+    def handle(self) -> None:
+        for request in self.rfile:
+            crispr_ids = request.decode().split()
+            try:
+                lines = list(
+                    align_crisprs(
+                        self.server.guides,
+                        crispr_ids,
+                        self.server.metadata,
+                        self.server.backend,
+                        self.server.parameters,
+                    )
+                )
+            except ValueError as err:
+                lines = [f"Error: {err}"]
+            self.wfile.write("".join(f"{line}\n" for line in lines).encode())
+            self.wfile.flush()
+
+
+class AlignServer(socketserver.UnixStreamServer):
+    """A Unix socket server holding the guides in memory (or on the GPU) so
+    they are loaded, and the kernels of the backend compiled, once for many
+    requests.
+
+    Requests are answered one connection at a time as the search kernels
+    already use every CPU thread or the whole GPU.
+    """
+
+    def __init__(
+        self,
+        socket_path: str,
+        guides: np.ndarray,
+        metadata: Metadata,
+        backend: typing.Optional[OffTargetBackend] = None,
+        parameters: typing.Optional[SearchParameters] = None,
+    ) -> None:
+        self.guides = guides
+        self.metadata = metadata
+        self.backend = backend if backend is not None else CpuBackend(guides)
+        self.parameters = parameters
+        super().__init__(socket_path, AlignRequestHandler)
+
+
+def serve(
+    socket_path: str,
+    inputfile: str,
+    seedfile: str = "",
+    use_cuda: bool = True,
+    use_mmap: bool = False,
+    backend_name: str = "",
+    strandfile: str = "",
+    max_mismatches: int = MAX_MISSMATCHES,
+    max_off_targets: int = MAX_OFF_TARGETS,
+) -> None:
+    """Load the guides and answer off-target requests until interrupted
+
+    :param socket_path: The Unix socket to listen on
+    :param inputfile: The binary guides file
+    :param seedfile: The seed index file, default "" for no seed index
+    :param use_cuda: Use the GPU if available, default True
+    :param use_mmap: Memory-map the guides instead of reading them in,
+        default False
+    :param backend_name: The search backend, see
+        :func:`~py_crispr_analyser.align.select_backend`, default "" to
+        choose as the align command does
+    :param strandfile: The strand index file, default "" for no strand index
+    :param max_mismatches: The mismatch limit of every request, see
+        :class:`~py_crispr_analyser.align.SearchParameters`, default
+        ``MAX_MISSMATCHES``
+    :param max_off_targets: The off-target cap of every request, default
+        ``MAX_OFF_TARGETS``
+    :raises ValueError: If the socket path exists and is not a socket
+    :raises ValueError: If the backend is unknown or not available
+    :return: None
+    """
+    start = time.time()
+    guides, metadata = load_guides(inputfile, use_mmap)
+    parameters = SearchParameters(
+        max_mismatches, max_off_targets, int(metadata.sequence_length)
+    )
+
+    seed_index = None
+    if seedfile != "":
+        with open(seedfile, "rb") as seed_file:
+            seed_index = get_seed_index(seed_file, verbose=True)
+
+    strand_index = None
+    if strandfile != "":
+        with open(strandfile, "rb") as strand_file:
+            strand_index = get_strand_index(strand_file, verbose=True)
+
+    backend = select_backend(
+        backend_name, guides, seed_index, use_cuda, strand_index=strand_index
+    )
+    backend.warm_up()
+
+    if os.path.exists(socket_path):
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            raise ValueError(f"{socket_path} exists and is not a socket")
+        # left behind by a server that was not shut down cleanly
+        os.unlink(socket_path)
+    with AlignServer(
+        socket_path, guides, metadata, backend, parameters
+    ) as server:
+        print(
+            f"Listening on {socket_path} after {time.time() - start:.2f} "
+            "seconds",
+            file=sys.stderr,
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def run(argv=sys.argv[1:]) -> None:
+    """Run the align server from the command line.
+
+    :param argv: The command line arguments
+    :return: None
+    """
+    inputfile = ""
+    seedfile = ""
+    strandfile = ""
+    socket_path = ""
+    use_cuda = True
+    use_mmap = False
+    backend_name = ""
+    mismatches = MAX_MISSMATCHES - 1
+    max_off_targets = MAX_OFF_TARGETS
+
+    def usage() -> None:
+        print(
+            """Usage: crispr_analyser_align_server [options...]
+-h, --help            Print this help message
+-i, --ifile <file>    The input binary guides file
+-S, --socket <file>   The Unix socket to listen on
+--backend <name>      The search backend, as for crispr_analyser_align
+--no-cuda             Do not use CUDA GPU acceleration
+--mmap                Memory-map the guides instead of reading them in
+--seed_index <file>   Use the seed index file built by crispr_analyser_index
+--strand_index <file> Use the strand index file built by
+                      crispr_analyser_index
+--mismatches <n>      Find off-targets with at most n mismatches, 0 to 4.
+                      Default is 4
+--max_off_targets <n> List the ids of CRISPRs with fewer than n
+                      off-targets. Default is 2000
+"""
+        )
+
+    try:
+        opts, _ = getopt.getopt(
+            argv,
+            "hi:S:",
+            [
+                "help",
+                "ifile=",
+                "socket=",
+                "backend=",
+                "no-cuda",
+                "mmap",
+                "seed_index=",
+                "strand_index=",
+                "mismatches=",
+                "max_off_targets=",
+            ],
+        )
+    except getopt.GetoptError as err:
+        print(err)
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            usage()
+            sys.exit()
+        elif opt in ("-i", "--ifile"):
+            inputfile = arg
+        elif opt in ("-S", "--socket"):
+            socket_path = arg
+        elif opt == "--backend":
+            backend_name = arg
+        elif opt == "--seed_index":
+            seedfile = arg
+        elif opt == "--strand_index":
+            strandfile = arg
+        elif opt == "--no-cuda":
+            use_cuda = False
+        elif opt == "--mmap":
+            use_mmap = True
+        elif opt == "--mismatches":
+            if not arg.isdigit() or int(arg) >= MAX_MISSMATCHES:
+                print(f"Invalid number of mismatches {arg}")
+                usage()
+                sys.exit(2)
+            mismatches = int(arg)
+        elif opt == "--max_off_targets":
+            if not arg.isdigit() or int(arg) == 0:
+                print(f"Invalid off-target cap {arg}")
+                usage()
+                sys.exit(2)
+            max_off_targets = int(arg)
+    if inputfile == "" or socket_path == "":
+        usage()
+        sys.exit(2)
+
+    if backend_name not in ("", "auto", *BACKENDS):
+        print(f"Unknown backend {backend_name}")
+        usage()
+        sys.exit(2)
+
+    serve(
+        socket_path,
+        inputfile,
+        seedfile,
+        use_cuda,
+        use_mmap,
+        backend_name,
+        strandfile,
+        mismatches + 1,
+        max_off_targets,
+    )
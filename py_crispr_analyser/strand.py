@@ -0,0 +1,135 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+from dataclasses import dataclass
+import numpy as np
+import os
+import struct
+import sys
+import time
+import typing
+
+from .utils import ERROR_STR
+
+STRAND_FILE_VERSION = np.uint16(1)
+# padded so the guides start on an 8 byte boundary
+STRAND_HEADER_FORMAT = "<BLQQQ3x"
+STRAND_HEADER_SIZE = struct.calcsize(STRAND_HEADER_FORMAT)
+PAM_SHIFT = 40
+
+
+@dataclass
+class StrandIndex:
+    """A dataclass to hold the guides split by the side of their PAM.
+
+    ``guides[0]`` holds the guides with the PAM on the left and
+    ``guides[1]`` those with the PAM on the right, each in the order of the
+    guides file. ``ids[plane]`` holds the 0-based index in the guides file
+    of each guide of the plane. Guides flagged with ``ERROR_STR`` are left
+    out.
+    """
+
+    number_of_guides: np.uint64
+    guides: tuple[np.ndarray, np.ndarray]
+    ids: tuple[np.ndarray, np.ndarray]
+
+
+def write_strand_index(
+    outputfile: str,
+    guides: np.ndarray,
+    guide_length: int = PAM_SHIFT // 2,
+    verbose: bool = False,
+) -> None:
+    """Split the guides by the side of their PAM and write them to a file.
+
+    :param outputfile: The name of the strand index file to be generated
+    :param guides: The array of encoded gRNA sequences
+    :param guide_length: The length of the guide sequence, whose PAM flag
+        is the bit after its bases, default 20
+    :param verbose: A boolean indicating if verbose output is enabled.
+        Default is False.
+    :raises ValueError: If there are too many guides for the index
+    :return: None
+    """
+    start = time.time()
+    if guides.size > np.iinfo(np.uint32).max:
+        raise ValueError("Too many guides for a strand index")
+    valid = guides != ERROR_STR
+    pam_shift = np.uint64(2 * guide_length)
+    pam_right = ((guides >> pam_shift) & np.uint64(1)) == 1
+    ids = [
+        np.flatnonzero(valid & ~pam_right).astype(np.uint32),
+        np.flatnonzero(valid & pam_right).astype(np.uint32),
+    ]
+    with open(outputfile, "wb") as out_file:
+        out_file.write(
+            struct.pack(
+                STRAND_HEADER_FORMAT,
+                np.uint8(1),
+                np.uint(STRAND_FILE_VERSION),
+                np.uint64(guides.size),
+                np.uint64(ids[0].size),
+                np.uint64(ids[1].size),
+            )
+        )
+        for plane_ids in ids:
+            np.asarray(guides[plane_ids], dtype=np.uint64).tofile(out_file)
+        for plane_ids in ids:
+            plane_ids.tofile(out_file)
+    if verbose:
+        print(f"Built strand index in {time.time() - start} seconds")
+
+
+def get_strand_index(
+    strandfile_handle: typing.BinaryIO, verbose: bool = False
+) -> StrandIndex:
+    """Get the strand index from the strand index file.
+
+    The guides and ids are memory-mapped.
+
+    :param strandfile_handle: The file handle of the strand index file
+    :param verbose: A boolean to print verbose output
+    :raises ValueError: If the file version is not supported
+    :raises ValueError: If the file size does not match the header
+    :return: A StrandIndex object
+    """
+    start = time.time()
+    strandfile_handle.seek(0)
+    header = strandfile_handle.read(STRAND_HEADER_SIZE)
+    if len(header) != STRAND_HEADER_SIZE:
+        raise ValueError("Invalid strand index header length")
+    _, version, number_of_guides, *plane_sizes = struct.unpack(
+        STRAND_HEADER_FORMAT, header
+    )
+    if version != STRAND_FILE_VERSION:
+        raise ValueError("Invalid strand index version")
+    file_size = os.fstat(strandfile_handle.fileno()).st_size
+    if file_size - STRAND_HEADER_SIZE != sum(plane_sizes) * 12:
+        raise ValueError("Invalid strand index size")
+    guides = []
+    ids = []
+    offset = STRAND_HEADER_SIZE
+    for dtype, planes in ((np.uint64, guides), (np.uint32, ids)):
+        for plane_size in plane_sizes:
+            if plane_size == 0:
+                planes.append(np.empty(0, dtype=dtype))
+            else:
+                planes.append(
+                    np.memmap(
+                        strandfile_handle,
+                        dtype=dtype,
+                        mode="r",
+                        offset=offset,
+                        shape=(plane_size,),
+                    )
+                )
+            offset += plane_size * np.dtype(dtype).itemsize
+    if verbose:
+        print(
+            f"Loading strand index took {time.time() - start:.2f} seconds",
+            file=sys.stderr,
+        )
+    return StrandIndex(
+        number_of_guides=np.uint64(number_of_guides),
+        guides=(guides[0], guides[1]),
+        ids=(ids[0], ids[1]),
+    )
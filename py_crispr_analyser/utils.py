@@ -2,6 +2,7 @@
 
 from dataclasses import dataclass
 import numpy as np
+import os
 import struct
 import sys
 import time
@@ -9,9 +10,17 @@ import typing
 
 COMPLEMENT_MAP = {"A": "T", "C": "G", "G": "C", "T": "A", "N": "N"}
 ENCODING_MAP = {"A": 0, "C": 1, "G": 2, "T": 3, "N": 4}
+ENCODING_LUT = np.full(256, 255, dtype=np.uint8)
+ENCODING_LUT[np.frombuffer(b"ACGTN", dtype=np.uint8)] = np.arange(5)
 ERROR_STR = np.uint64(0xFFFFFFFFFFFFFFFF)
 FILE_HEADER_FORMAT = "<BL"
 FILE_VERSION = np.uint16(3)
+# version 4 files store each guide in 6 bytes instead of 8
+PACKED_FILE_VERSION = np.uint16(4)
+PACKED_GUIDE_DTYPE = np.dtype([("low", "<u4"), ("high", "<u2")])
+# the longest guide that can be packed: the PAM flag of a longer guide is
+# past bit 47, and an all-T guide of 24 bases would be read as ERROR_STR
+MAX_PACKED_GUIDE_LENGTH = 23
 HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
 METADATA_FORMAT = "<QQQB30s30s"
 METADATA_SIZE = struct.calcsize(METADATA_FORMAT)
@@ -31,24 +40,56 @@ class Metadata:
 
 
 def get_guides(
-    guidesfile_handle: typing.BinaryIO, verbose: bool = False
+    guidesfile_handle: typing.BinaryIO,
+    verbose: bool = False,
+    mmap: bool = False,
+    packed: bool = False,
 ) -> np.ndarray:
     """Get array of guides from the binary guides file.
 
     :param guidesfile_handle: The file handle of the guides file
     :param verbose: A boolean to print verbose output
+    :param mmap: A boolean to return a read-only memory-mapped view of the
+        guides instead of reading them into memory. The page cache is then
+        shared between processes using the same file. Default is False.
+    :param packed: A boolean to return the guides of a version 4 file as
+        stored, with ``PACKED_GUIDE_DTYPE``, instead of unpacking them into
+        memory. Unpacking reads every guide into a new array even with
+        ``mmap``, so pass True to keep a version 4 file memory-mapped.
+        Default is False.
     :return: A numpy array of guides
     """
     start = time.time()
-    guidesfile_handle.seek(HEADER_SIZE)
+    guidesfile_handle.seek(0)
+    version = check_file_header(guidesfile_handle.read(HEADER_SIZE))
+    if version == PACKED_FILE_VERSION:
+        dtype = PACKED_GUIDE_DTYPE
+    else:
+        dtype = np.dtype(np.uint64)
     # read the number of sequences in the header
     number_of_guides = struct.unpack("<Q", guidesfile_handle.read(8))[0]
-    guidesfile_handle.seek(
-        HEADER_SIZE + METADATA_SIZE + struct.calcsize(PADDING_FORMAT)
-    )
-    guides = np.fromfile(guidesfile_handle, dtype=np.uint64, count=-1)
-    if number_of_guides != guides.size:
-        raise ValueError("Invalid number of guides")
+    guides_start = HEADER_SIZE + METADATA_SIZE + struct.calcsize(PADDING_FORMAT)
+    if mmap:
+        file_size = os.fstat(guidesfile_handle.fileno()).st_size
+        if number_of_guides * dtype.itemsize != file_size - guides_start:
+            raise ValueError("Invalid number of guides")
+        if number_of_guides == 0:
+            guides = np.empty(0, dtype=dtype)
+        else:
+            guides = np.memmap(
+                guidesfile_handle,
+                dtype=dtype,
+                mode="r",
+                offset=guides_start,
+                shape=(number_of_guides,),
+            )
+    else:
+        guidesfile_handle.seek(guides_start)
+        guides = np.fromfile(guidesfile_handle, dtype=dtype, count=-1)
+        if number_of_guides != guides.size:
+            raise ValueError("Invalid number of guides")
+    if not packed:
+        guides = unpack_guides(guides)
     if verbose:
         print(
             f"Loading took {time.time() - start:.2f} seconds", file=sys.stderr
@@ -56,6 +97,72 @@ def get_guides(
     return guides
 
 
+def iterate_guides(
+    guides: np.ndarray, chunk_size: int
+) -> typing.Iterator[tuple[int, np.ndarray]]:
+    """Iterate over the guides in chunks of at most ``chunk_size`` guides.
+
+    If the guides are memory-mapped each chunk is a separate memory map of
+    its window of the guides file, unmapped once the caller drops it, so
+    no more than a chunk of the file is resident at a time.
+
+    :param guides: The array of encoded gRNA sequences, see
+        :func:`get_guides`
+    :param chunk_size: The maximum number of guides per chunk
+    :raises ValueError: If the chunk size is not positive
+    :return: An iterator of the index of the first guide of each chunk and
+        the chunk
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    for start in range(0, guides.size, chunk_size):
+        if isinstance(guides, np.memmap):
+            yield start, np.memmap(
+                guides.filename,
+                dtype=guides.dtype,
+                mode="r",
+                offset=guides.offset + start * guides.itemsize,
+                shape=(min(chunk_size, guides.size - start),),
+            )
+        else:
+            yield start, guides[start:][:chunk_size]
+
+
+def pack_guides(guides: np.ndarray) -> np.ndarray:
+    """Pack encoded guides into 6 bytes each for a version 4 file.
+
+    The 41 bits used by a guide are split into the low 32 bits and the high
+    16 bits. ``ERROR_STR`` is packed as all 48 bits set. Only guides of at
+    most ``MAX_PACKED_GUIDE_LENGTH`` bases fit, the bits of longer guides
+    are lost without warning.
+
+    :param guides: The array of encoded gRNA sequences
+    :return: An array of guides with ``PACKED_GUIDE_DTYPE``
+    """
+    guides = np.asarray(guides, dtype=np.uint64)
+    packed = np.empty(guides.size, dtype=PACKED_GUIDE_DTYPE)
+    packed["low"] = guides & np.uint64(0xFFFFFFFF)
+    packed["high"] = guides >> np.uint64(32)
+    return packed
+
+
+def unpack_guides(guides: np.ndarray) -> np.ndarray:
+    """Unpack guides packed by :func:`pack_guides`.
+
+    :param guides: The array of guides, packed or already unpacked
+    :return: An array of encoded gRNA sequences, the guides themselves if
+        they are not packed
+    """
+    if guides.dtype != PACKED_GUIDE_DTYPE:
+        return guides
+    high = guides["high"]
+    unpacked = guides["low"].astype(np.uint64) | (
+        high.astype(np.uint64) << np.uint64(32)
+    )
+    unpacked[high == 0xFFFF] = ERROR_STR
+    return unpacked
+
+
 def sequence_to_binary_encoding(sequence: str, pam_right: int) -> np.uint64:
     """Convert a string DNA sequence to bits accounting for pam right or left.
 
@@ -76,6 +183,31 @@ def sequence_to_binary_encoding(sequence: str, pam_right: int) -> np.uint64:
     return bits
 
 
+def sequences_to_binary_encoding(
+    sequences: np.ndarray, pam_right: np.ndarray
+) -> np.ndarray:
+    """Convert many DNA sequences to bits at once, see
+    :func:`sequence_to_binary_encoding`.
+
+    :param sequences: A 2D numpy uint8 array of ASCII bases, one row per
+        sequence
+    :param pam_right: An array of integers indicating if PAM is on the right
+        (1) or left (0) of each sequence
+    :raises ValueError: If a sequence contains a base other than A, C, G, T
+        or N
+    :return: A numpy uint64 array of the encoded sequences
+    """
+    codes = ENCODING_LUT[sequences]
+    if np.any(codes == 255):
+        raise ValueError("Invalid base in sequence")
+    bits = np.asarray(pam_right, dtype=np.uint64).copy()
+    for column in range(codes.shape[1]):
+        bits <<= np.uint64(2)
+        bits |= codes[:, column]
+    bits[np.any(codes == 4, axis=1)] = ERROR_STR
+    return bits
+
+
 def reverse_complement(sequence: str) -> str:
     """Return the reverse complement of a DNA sequence.
 
@@ -85,20 +217,21 @@ def reverse_complement(sequence: str) -> str:
     return "".join([COMPLEMENT_MAP[base] for base in reversed(sequence)])
 
 
-def check_file_header(bytes: bytes) -> None:
+def check_file_header(bytes: bytes) -> int:
     """Check the header of the file from binary data.
 
     :param bytes: The binary data to check
     :raises ValueError: If the header file version is not supported
     :raises ValueError: If the header length is not correct
-    :returns: None
+    :returns: The file version, ``FILE_VERSION`` or ``PACKED_FILE_VERSION``
     """
     if len(bytes) != HEADER_SIZE:
         raise ValueError("Invalid file header length")
     values = struct.unpack(FILE_HEADER_FORMAT, bytes)
     version = values[1]
-    if version != FILE_VERSION:
+    if version not in (FILE_VERSION, PACKED_FILE_VERSION):
         raise ValueError("Invalid file version")
+    return version
 
 
 def get_file_metadata(bytes: bytes) -> Metadata:
@@ -5,6 +5,7 @@ from numba import cuda
 import pytest
 
 import py_crispr_analyser.align as align
+import py_crispr_analyser.strand as strand
 
 
 @pytest.fixture
@@ -26,6 +27,14 @@ def large_guide_list(guide_list):
     return np.tile(guide_list, reps)[:1_000_000]
 
 
+@pytest.fixture
+def random_guide_list():
+    """~1 000 000 guides of random bases with the PAM on either side, where
+    almost every guide has more mismatches than the limit, as in a genome."""
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 1 << 41, size=1_000_000, dtype=np.uint64)
+
+
 def bench_find_off_targets(
     benchmark, guide_list, query_sequence, reverse_query_sequence
 ):
@@ -98,6 +107,124 @@ def bench_find_off_targets_cpu_large(
     benchmark(run)
 
 
+def bench_find_off_targets_cpu_simd_large(
+    benchmark, large_guide_list, query_sequence, reverse_query_sequence
+):
+    """Benchmark the SIMD parallel-CPU off-target finder on ~1 000 000
+    guides, to compare with bench_find_off_targets_cpu_large."""
+    n = large_guide_list.size
+
+    def run():
+        summary = np.zeros(align.MAX_MISSMATCHES, dtype=np.uint32)
+        off_target_ids_idx = np.zeros(1, dtype=np.uint32)
+        off_target_ids = np.zeros(n, dtype=np.uint32)
+        align.find_off_targets_cpu_simd(
+            large_guide_list,
+            query_sequence,
+            reverse_query_sequence,
+            summary,
+            off_target_ids_idx,
+            off_target_ids,
+            np.uint64(0),
+        )
+
+    benchmark(run)
+
+
+def bench_find_off_targets_cpu_batch_large(benchmark, large_guide_list):
+    """Benchmark the batched parallel-CPU off-target finder with 64 queries
+    on ~1 000 000 guides."""
+    query_sequences = large_guide_list[:64].copy()
+    reverse_query_sequences = np.array(
+        [align.reverse_complement_binary(q, 20) for q in query_sequences],
+        dtype=np.uint64,
+    )
+
+    def run():
+        summaries = np.zeros(
+            (query_sequences.size, align.MAX_MISSMATCHES), dtype=np.uint32
+        )
+        off_target_ids_idx = np.zeros(query_sequences.size, dtype=np.uint32)
+        off_target_ids = np.zeros(
+            (query_sequences.size, align.MAX_OFF_TARGETS), dtype=np.uint32
+        )
+        align.find_off_targets_cpu_batch(
+            large_guide_list,
+            query_sequences,
+            reverse_query_sequences,
+            summaries,
+            off_target_ids_idx,
+            off_target_ids,
+            np.uint64(0),
+        )
+
+    benchmark(run)
+
+
+@pytest.mark.parametrize("max_mismatches", [3, align.MAX_MISSMATCHES])
+def bench_find_off_targets_cpu_batch_random(
+    benchmark, random_guide_list, max_mismatches
+):
+    """Benchmark the batched parallel-CPU off-target finder with 64 queries
+    on ~1 000 000 random guides, for a 0-2 mismatch screen and a full
+    search."""
+    query_sequences = random_guide_list[:64].copy()
+    parameters = align.SearchParameters(max_mismatches=max_mismatches)
+
+    benchmark(
+        align.find_off_targets_batch,
+        random_guide_list,
+        query_sequences,
+        parameters=parameters,
+    )
+
+
+def bench_find_off_targets_cpu_simd_batch_large(benchmark, large_guide_list):
+    """Benchmark the batched SIMD parallel-CPU off-target finder with 64
+    queries on ~1 000 000 guides."""
+    query_sequences = large_guide_list[:64].copy()
+    reverse_query_sequences = np.array(
+        [align.reverse_complement_binary(q, 20) for q in query_sequences],
+        dtype=np.uint64,
+    )
+
+    def run():
+        summaries = np.zeros(
+            (query_sequences.size, align.MAX_MISSMATCHES), dtype=np.uint32
+        )
+        off_target_ids_idx = np.zeros(query_sequences.size, dtype=np.uint32)
+        off_target_ids = np.zeros(
+            (query_sequences.size, align.MAX_OFF_TARGETS), dtype=np.uint32
+        )
+        align.find_off_targets_cpu_simd_batch(
+            large_guide_list,
+            query_sequences,
+            reverse_query_sequences,
+            summaries,
+            off_target_ids_idx,
+            off_target_ids,
+            np.uint64(0),
+        )
+
+    benchmark(run)
+
+
+def bench_find_off_targets_strand_index_large(
+    benchmark, tmp_path, large_guide_list
+):
+    """Benchmark the strand index off-target finder with 64 queries on
+    ~1 000 000 guides, to compare with the batched parallel-CPU finder."""
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, large_guide_list)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    query_sequences = large_guide_list[:64].copy()
+
+    benchmark(
+        align.find_off_targets_strand_index, strand_index, query_sequences
+    )
+
+
 @pytest.mark.skipif(
     cuda.is_available() is False, reason="CUDA is not available"
 )
@@ -126,6 +253,7 @@ def bench_find_off_targets_kernel(
             device_off_target_ids_idx,
             device_off_target_ids,
             np.uint64(0),
+            align.PAM_ON,
         )
         cuda.synchronize()
 
@@ -160,6 +288,7 @@ def bench_find_off_targets_kernel_large(
             device_off_target_ids_idx,
             device_off_target_ids,
             np.uint64(0),
+            align.PAM_ON,
         )
         cuda.synchronize()
 
@@ -3,6 +3,7 @@
 import numpy as np
 import pytest
 import struct
+import py_crispr_analyser.utils as utils
 
 DATA = [
     {
@@ -2788,6 +2789,19 @@ def guides_file(tmp_path):
     return in_file
 
 
+@pytest.fixture
+def packed_guides_file(guides_file):
+    """The guides file rewritten as version 4 with packed guides"""
+    data = guides_file.read_bytes()
+    guides_start = len(data) - len(DATA) * 8
+    header = bytearray(data[:guides_start])
+    struct.pack_into("<L", header, 1, 4)
+    guides = np.frombuffer(data[guides_start:], dtype=np.uint64)
+    packed_file = guides_file.with_name("guides_packed.bin")
+    packed_file.write_bytes(bytes(header) + utils.pack_guides(guides).tobytes())
+    return packed_file
+
+
 @pytest.fixture
 def guide_list():
     return np.array([d["encoded_guide"] for d in DATA], dtype=np.uint64)
@@ -1,9 +1,14 @@
 # Copyright (C) 2025 Genome Research Ltd.
 
+import numba
 import numpy as np
 from numba import cuda
 import pytest
 import py_crispr_analyser.align as align
+import py_crispr_analyser.precompute as precompute
+import py_crispr_analyser.seed as seed
+import py_crispr_analyser.strand as strand
+import py_crispr_analyser.utils as utils
 
 
 @pytest.fixture
@@ -452,6 +457,52 @@ def test_find_off_targets_cpu(
     )
 
 
+def test_find_off_targets_cpu_counts_beyond_capacity(query_sequence):
+    """Off-targets which do not fit in the ids array are still counted"""
+    guides = np.full(10, query_sequence, dtype=np.uint64)
+    summary = np.zeros(5, dtype=np.uint32)
+    off_target_ids_idx = np.zeros(1, dtype=np.uint32)
+    # the ids array is a view so an overrun would show in the guard element
+    buffer = np.zeros(5, dtype=np.uint32)
+    align.find_off_targets_cpu(
+        guides,
+        query_sequence,
+        align.reverse_complement_binary(query_sequence, 20),
+        summary,
+        off_target_ids_idx,
+        buffer[:4],
+        np.uint64(0),
+    )
+    assert summary[0] == 10
+    assert off_target_ids_idx[0] == 10
+    np.testing.assert_array_equal(buffer, [1, 2, 3, 4, 0])
+
+
+def test_find_off_targets_cpu_keeps_ids_in_order(
+    guide_list, query_sequence, reverse_query_sequence, expected_guides
+):
+    """The ids found by each thread are placed in guide order, adding to
+    those already found"""
+    summary = np.zeros(5, dtype=np.uint32)
+    off_target_ids_idx = np.array([2], dtype=np.uint32)
+    off_target_ids = np.zeros(2000, dtype=np.uint32)
+    off_target_ids[:2] = [7, 9]
+    align.find_off_targets_cpu(
+        guide_list,
+        query_sequence,
+        reverse_query_sequence,
+        summary,
+        off_target_ids_idx,
+        off_target_ids,
+        np.uint64(0),
+    )
+    assert off_target_ids_idx[0] == len(expected_guides) + 2
+    np.testing.assert_array_equal(
+        off_target_ids[: off_target_ids_idx[0]],
+        [7, 9] + sorted(expected_guides),
+    )
+
+
 def test_find_off_targets_cpu_with_offset(
     query_sequence, reverse_query_sequence
 ):
@@ -480,6 +531,414 @@ def test_find_off_targets_cpu_with_offset(
     )
 
 
+def test_find_off_targets_cpu_batch(
+    guide_list, query_sequence, reverse_query_sequence, expected_guides
+):
+    """Each query in a batch gets the same result as a single query search"""
+    query_sequences = np.array(
+        [query_sequence, guide_list[100], query_sequence], dtype=np.uint64
+    )
+    reverse_query_sequences = np.array(
+        [align.reverse_complement_binary(q, 20) for q in query_sequences],
+        dtype=np.uint64,
+    )
+    summaries = np.zeros((3, 5), dtype=np.uint32)
+    off_target_ids_idx = np.zeros(3, dtype=np.uint32)
+    off_target_ids = np.zeros((3, 2000), dtype=np.uint32)
+    align.find_off_targets_cpu_batch(
+        guide_list,
+        query_sequences,
+        reverse_query_sequences,
+        summaries,
+        off_target_ids_idx,
+        off_target_ids,
+        np.uint64(0),
+    )
+    for q in (0, 2):
+        np.testing.assert_array_equal(summaries[q], [2, 0, 1, 36, 350])
+        assert off_target_ids_idx[q] == len(expected_guides)
+        np.testing.assert_array_equal(
+            off_target_ids[q, : off_target_ids_idx[q]], expected_guides
+        )
+    np.testing.assert_array_equal(summaries[1], [27, 2, 4, 1, 11])
+    assert off_target_ids_idx[1] == 45
+
+
+def test_find_off_targets_cpu_batch_counts_beyond_capacity(query_sequence):
+    """Off-targets which do not fit in the ids row are still counted"""
+    guides = np.full(10, query_sequence, dtype=np.uint64)
+    query_sequences = np.array([query_sequence], dtype=np.uint64)
+    reverse_query_sequences = np.array(
+        [align.reverse_complement_binary(query_sequence, 20)], dtype=np.uint64
+    )
+    summaries = np.zeros((1, 5), dtype=np.uint32)
+    off_target_ids_idx = np.zeros(1, dtype=np.uint32)
+    off_target_ids = np.zeros((1, 4), dtype=np.uint32)
+    align.find_off_targets_cpu_batch(
+        guides,
+        query_sequences,
+        reverse_query_sequences,
+        summaries,
+        off_target_ids_idx,
+        off_target_ids,
+        np.uint64(0),
+    )
+    assert summaries[0, 0] == 10
+    assert off_target_ids_idx[0] == 10
+    np.testing.assert_array_equal(off_target_ids[0], [1, 2, 3, 4])
+
+
+def test_find_off_targets_cpu_simd(
+    guide_list, query_sequence, reverse_query_sequence, expected_guides
+):
+    summary = np.zeros(5, dtype=np.uint32)
+    off_target_ids_idx = np.zeros(1, dtype=np.uint32)
+    off_target_ids = np.zeros(2000, dtype=np.uint32)
+    align.find_off_targets_cpu_simd(
+        guide_list,
+        query_sequence,
+        reverse_query_sequence,
+        summary,
+        off_target_ids_idx,
+        off_target_ids,
+        np.uint64(0),
+    )
+    np.testing.assert_array_equal(summary, [2, 0, 1, 36, 350])
+    np.testing.assert_array_equal(
+        off_target_ids[: off_target_ids_idx[0]], expected_guides
+    )
+
+
+def test_find_off_targets_cpu_simd_counts_beyond_capacity(query_sequence):
+    guides = np.full(align.GUIDE_BLOCK_SIZE + 10, query_sequence)
+    summary = np.zeros(5, dtype=np.uint32)
+    off_target_ids_idx = np.zeros(1, dtype=np.uint32)
+    buffer = np.zeros(5, dtype=np.uint32)
+    align.find_off_targets_cpu_simd(
+        guides,
+        query_sequence,
+        align.reverse_complement_binary(query_sequence, 20),
+        summary,
+        off_target_ids_idx,
+        buffer[:4],
+        np.uint64(0),
+    )
+    assert summary[0] == guides.size
+    assert off_target_ids_idx[0] == guides.size
+    np.testing.assert_array_equal(buffer, [1, 2, 3, 4, 0])
+
+
+@pytest.mark.parametrize("number_of_queries", [1, 300])
+def test_find_off_targets_batch_with_simd(guide_list, number_of_queries):
+    """The SIMD kernels find the same off-targets, in the same order, as the
+    other CPU kernels, with guides and queries flagged with ERROR_STR"""
+    guides = np.tile(guide_list, 3)
+    guides[::7] = utils.ERROR_STR
+    query_sequences = guides[1:][:number_of_queries].copy()
+    query_sequences[-1] = utils.ERROR_STR
+    expected = align.find_off_targets_batch(
+        guides, query_sequences, np.uint64(10)
+    )
+    results = align.find_off_targets_batch(
+        guides, query_sequences, np.uint64(10), simd=True
+    )
+    for result, expected_result in zip(results, expected):
+        np.testing.assert_array_equal(result, expected_result)
+
+
+def test_find_off_targets_batch(guide_list, query_sequence, expected_guides):
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_batch(
+            guide_list, np.array([query_sequence], dtype=np.uint64)
+        )
+    )
+    np.testing.assert_array_equal(summaries[0], [2, 0, 1, 36, 350])
+    np.testing.assert_array_equal(
+        np.sort(off_target_ids[0, : off_target_ids_idx[0]]), expected_guides
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_find_off_targets_streamed(guide_list, query_sequence, chunk_size):
+    """Searching the guides in chunks gives the same results as all at once"""
+    query_sequences = np.array([query_sequence, guide_list[100]])
+    expected = align.find_off_targets_batch(
+        guide_list, query_sequences, np.uint64(10)
+    )
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_streamed(
+            guide_list, query_sequences, chunk_size, np.uint64(10)
+        )
+    )
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    np.testing.assert_array_equal(off_target_ids, expected[2])
+
+
+def test_find_off_targets_streamed_beyond_capacity(query_sequence):
+    guides = np.full(align.MAX_OFF_TARGETS + 10, query_sequence)
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_streamed(guides, np.array([query_sequence]), 300)
+    )
+    assert summaries[0, 0] == guides.size
+    assert off_target_ids_idx[0] == guides.size
+    np.testing.assert_array_equal(
+        off_target_ids[0], np.arange(1, align.MAX_OFF_TARGETS + 1)
+    )
+
+
+def test_find_off_targets_numpy(guide_list, query_sequence):
+    """NumPy alone finds the same off-targets as the Numba kernels"""
+    query_sequences = np.array([query_sequence, guide_list[100]])
+    expected = align.find_off_targets_batch(
+        guide_list, query_sequences, np.uint64(10)
+    )
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_numpy(
+            guide_list, query_sequences, np.uint64(10), chunk_size=1000
+        )
+    )
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    np.testing.assert_array_equal(off_target_ids, expected[2])
+
+
+def test_find_off_targets_numpy_beyond_capacity(query_sequence):
+    guides = np.full(align.MAX_OFF_TARGETS + 10, query_sequence)
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_numpy(
+            guides, np.array([query_sequence]), chunk_size=300
+        )
+    )
+    assert summaries[0, 0] == guides.size
+    assert off_target_ids_idx[0] == guides.size
+    np.testing.assert_array_equal(
+        off_target_ids[0], np.arange(1, align.MAX_OFF_TARGETS + 1)
+    )
+
+
+def test_find_off_targets_seed_index(
+    tmp_path, guide_list, query_sequence, expected_guides
+):
+    """The seed index finds the same off-targets as the exhaustive search"""
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    query_sequences = np.array(
+        [query_sequence, guide_list[100], guide_list[7]], dtype=np.uint64
+    )
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_seed_index(
+            guide_list, seed_index, query_sequences
+        )
+    )
+    np.testing.assert_array_equal(summaries[0], [2, 0, 1, 36, 350])
+    np.testing.assert_array_equal(
+        np.sort(off_target_ids[0, : off_target_ids_idx[0]]), expected_guides
+    )
+    expected = align.find_off_targets_batch(guide_list, query_sequences)
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    for q in range(query_sequences.size):
+        np.testing.assert_array_equal(
+            np.sort(off_target_ids[q]), np.sort(expected[2][q])
+        )
+
+
+def test_find_off_targets_strand_index(tmp_path, guide_list, query_sequence):
+    """The strand index finds the same off-targets, in the same order, as
+    the exhaustive search"""
+    guides = guide_list.copy()
+    guides[5] = utils.ERROR_STR
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guides)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    for query_sequences in (
+        np.array([query_sequence, guide_list[100]], dtype=np.uint64),
+        guide_list[: align.QUERY_BATCH_SIZE],
+    ):
+        expected = align.find_off_targets_batch(
+            guides, query_sequences, np.uint64(10)
+        )
+        results = align.find_off_targets_strand_index(
+            strand_index, query_sequences, np.uint64(10)
+        )
+        for result, expected_result in zip(results, expected):
+            np.testing.assert_array_equal(result, expected_result)
+
+
+def test_find_off_targets_strand_index_beyond_capacity(tmp_path):
+    guides = np.full(align.MAX_OFF_TARGETS + 10, 0x3, dtype=np.uint64)
+    # the reverse complements, with their PAM on the right, match too
+    guides[1::2] = align.reverse_complement_binary(guides[0], 20)
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guides)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    _, off_target_ids_idx, off_target_ids = align.find_off_targets_strand_index(
+        strand_index, guides[:1]
+    )
+    assert off_target_ids_idx[0] == guides.size
+    expected = align.find_off_targets_batch(guides, guides[:1])
+    np.testing.assert_array_equal(off_target_ids, expected[2])
+
+
+def test_strand_backend_with_wrong_strand_index(tmp_path, guide_list):
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guide_list[:10])
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    with pytest.raises(ValueError, match="does not match the guides"):
+        align.get_backend("strand", guide_list, strand_index=strand_index)
+
+
+def test_find_off_targets_seed_index_with_too_few_segments(
+    tmp_path, guide_list, query_sequence
+):
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20, segments=4)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    with pytest.raises(ValueError, match="at least 5 segments"):
+        align.find_off_targets_seed_index(
+            guide_list, seed_index, np.array([query_sequence])
+        )
+
+
+def test_find_off_targets_seed_index_with_other_guide_length(
+    tmp_path, guide_list, query_sequence
+):
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    with pytest.raises(ValueError, match="does not match the guide length"):
+        align.find_off_targets_seed_index(
+            guide_list,
+            seed_index,
+            np.array([query_sequence]),
+            parameters=align.SearchParameters(guide_length=19),
+        )
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"max_mismatches": 0}, "Mismatch limit"),
+        ({"max_mismatches": align.MAX_MISSMATCHES + 1}, "Mismatch limit"),
+        ({"max_off_targets": 0}, "Off-target cap"),
+        ({"guide_length": 32}, "Guide length"),
+    ],
+)
+def test_search_parameters_out_of_range(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        align.SearchParameters(**kwargs)
+
+
+@pytest.mark.parametrize("name", ["cpu", "numpy", "seed", "simd", "strand"])
+def test_align_with_parameters(tmp_path, guide_list, query_sequence, name):
+    """A lower mismatch limit and cap give the first columns of the
+    summaries and the first of the ids with fewer mismatches"""
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guide_list)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    query_sequences = np.array(
+        [query_sequence, guide_list[100]], dtype=np.uint64
+    )
+    parameters = align.SearchParameters(max_mismatches=3, max_off_targets=4)
+    summaries, off_target_ids_idx, off_target_ids = align.align(
+        guide_list,
+        query_sequences,
+        name,
+        seed_index=seed_index,
+        strand_index=strand_index,
+        parameters=parameters,
+    )
+    expected = align.find_off_targets_batch(guide_list, query_sequences)
+    np.testing.assert_array_equal(summaries, expected[0][:, :3])
+    np.testing.assert_array_equal(off_target_ids_idx, summaries.sum(axis=1))
+    assert off_target_ids.shape == (2, 4)
+    for q in range(query_sequences.size):
+        # the ids found below the lower limit, in the order of the guides
+        _, close_ids_idx, close_ids = align.find_off_targets_batch(
+            guide_list,
+            query_sequences[q:][:1],
+            parameters=align.SearchParameters(max_mismatches=3),
+        )
+        stored = min(close_ids_idx[0], 4)
+        if name == "seed":
+            # the seed index finds the guides in the order of their seeds
+            assert np.isin(
+                off_target_ids[q, :stored], close_ids[0, : close_ids_idx[0]]
+            ).all()
+        else:
+            np.testing.assert_array_equal(
+                off_target_ids[q, :stored], close_ids[0, :stored]
+            )
+
+
+@pytest.mark.parametrize("name", ["cpu", "numpy", "seed", "simd", "strand"])
+def test_align_with_other_guide_length(tmp_path, name):
+    """Guides of another length are compared base by base, with the reverse
+    complement of the query when their PAMs differ"""
+    guide_length = 8
+    rng = np.random.default_rng(1)
+    sequences = [
+        "".join(rng.choice(list("ACGT"), guide_length)) for _ in range(300)
+    ]
+    pam_right = rng.integers(0, 2, len(sequences))
+    guides = np.array(
+        [
+            utils.sequence_to_binary_encoding(sequence, pam)
+            for sequence, pam in zip(sequences, pam_right)
+        ],
+        dtype=np.uint64,
+    )
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guides, guide_length)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guides, guide_length)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    parameters = align.SearchParameters(guide_length=guide_length)
+    summaries, off_target_ids_idx, off_target_ids = align.align(
+        guides,
+        guides[:3],
+        name,
+        seed_index=seed_index,
+        strand_index=strand_index,
+        parameters=parameters,
+    )
+    for q in range(3):
+        if pam_right[q]:
+            query = sequences[q]
+            reverse_query = utils.reverse_complement(query)
+        else:
+            reverse_query = sequences[q]
+            query = utils.reverse_complement(reverse_query)
+        expected_ids = []
+        expected_summary = np.zeros(align.MAX_MISSMATCHES, dtype=np.uint32)
+        for i, sequence in enumerate(sequences):
+            facing = query if pam_right[i] else reverse_query
+            mismatches = sum(a != b for a, b in zip(facing, sequence))
+            if mismatches < align.MAX_MISSMATCHES:
+                expected_summary[mismatches] += 1
+                expected_ids.append(i + 1)
+        np.testing.assert_array_equal(summaries[q], expected_summary)
+        np.testing.assert_array_equal(
+            np.sort(off_target_ids[q, : off_target_ids_idx[q]]), expected_ids
+        )
+
+
 @pytest.mark.skipif(
     cuda.is_available() is False, reason="CUDA is not available"
 )
@@ -506,6 +965,7 @@ def test_find_off_targets_kernel(
         device_off_target_ids_idx,
         device_off_target_ids,
         0,
+        align.PAM_ON,
     )
     host_summary = device_summary.copy_to_host()
     host_off_target_ids = np.trim_zeros(device_off_target_ids.copy_to_host())
@@ -517,6 +977,268 @@ def test_find_off_targets_kernel(
     )
 
 
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+def test_find_off_targets_device_batch(guide_list, query_sequence):
+    query_sequences = np.array(
+        [query_sequence, guide_list[100], guide_list[0]], dtype=np.uint64
+    )
+    expected = align.find_off_targets_batch(guide_list, query_sequences)
+    device_guides = align.to_device_guides(guide_list)
+    assert len(device_guides) == len(cuda.gpus)
+    # run twice to check the buffers are cleared between batches
+    for _ in range(2):
+        summaries, off_target_ids_idx, off_target_ids = (
+            align.find_off_targets_device_batch(device_guides, query_sequences)
+        )
+        np.testing.assert_array_equal(summaries, expected[0])
+        np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+        for q in range(query_sequences.size):
+            np.testing.assert_array_equal(
+                np.sort(off_target_ids[q, : off_target_ids_idx[q]]),
+                np.sort(expected[2][q, : expected[1][q]]),
+            )
+
+
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+def test_find_off_targets_device_batch_in_shards(guide_list, query_sequence):
+    """The results of the shards are merged with the ids offset per shard"""
+    query_sequences = np.array([query_sequence, guide_list[100]])
+    expected = align.find_off_targets_batch(
+        guide_list, query_sequences, np.uint64(10)
+    )
+    device_guides = align.to_device_guides(guide_list, number_of_shards=3)
+    assert [shard.offset for shard in device_guides] == [
+        0,
+        guide_list.size // 3,
+        guide_list.size * 2 // 3,
+    ]
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_device_batch(
+            device_guides, query_sequences, np.uint64(10)
+        )
+    )
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    for q in range(query_sequences.size):
+        np.testing.assert_array_equal(
+            np.sort(off_target_ids[q, : off_target_ids_idx[q]]),
+            np.sort(expected[2][q, : expected[1][q]]),
+        )
+
+
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+def test_find_off_targets_device_batch_in_shards_beyond_capacity(
+    query_sequence,
+):
+    guides = np.full(align.MAX_OFF_TARGETS + 10, query_sequence)
+    device_guides = align.to_device_guides(guides, number_of_shards=2)
+    summaries, off_target_ids_idx, off_target_ids = (
+        align.find_off_targets_device_batch(
+            device_guides, np.array([query_sequence])
+        )
+    )
+    assert summaries[0, 0] == guides.size
+    assert off_target_ids_idx[0] == guides.size
+    assert np.unique(off_target_ids[0]).size == align.MAX_OFF_TARGETS
+
+
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+def test_find_off_targets_device_streamed(guide_list, query_sequence):
+    """Both buffers are used and the results match the CPU"""
+    query_sequences = np.array(
+        [query_sequence, guide_list[100], guide_list[0]], dtype=np.uint64
+    )
+    expected = align.find_off_targets_batch(
+        guide_list, query_sequences, np.uint64(10)
+    )
+    device_stream = align.to_device_stream(100)
+    # run twice to check the buffers are cleared between batches
+    for _ in range(2):
+        summaries, off_target_ids_idx, off_target_ids = (
+            align.find_off_targets_device_streamed(
+                device_stream, guide_list, query_sequences, np.uint64(10)
+            )
+        )
+        np.testing.assert_array_equal(summaries, expected[0])
+        np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+        for q in range(query_sequences.size):
+            np.testing.assert_array_equal(
+                np.sort(off_target_ids[q, : off_target_ids_idx[q]]),
+                np.sort(expected[2][q, : expected[1][q]]),
+            )
+
+
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+def test_find_off_targets_device_with_parameters(guide_list, query_sequence):
+    """The result buffers are resized for the parameters of each search"""
+    query_sequences = np.array(
+        [query_sequence, guide_list[100]], dtype=np.uint64
+    )
+    device_guides = align.to_device_guides(guide_list)
+    device_stream = align.to_device_stream(100)
+    for parameters in (
+        align.SearchParameters(max_mismatches=3, max_off_targets=4),
+        align.DEFAULT_PARAMETERS,
+    ):
+        expected = align.find_off_targets_batch(
+            guide_list, query_sequences, parameters=parameters
+        )
+        for results in (
+            align.find_off_targets_device_batch(
+                device_guides, query_sequences, parameters=parameters
+            ),
+            align.find_off_targets_device_streamed(
+                device_stream,
+                guide_list,
+                query_sequences,
+                parameters=parameters,
+            ),
+        ):
+            summaries, off_target_ids_idx, off_target_ids = results
+            np.testing.assert_array_equal(summaries, expected[0])
+            np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+            assert off_target_ids.shape == expected[2].shape
+
+
+@pytest.mark.parametrize(
+    "name", ["cpu", "numpy", "seed", "simd", "strand", "auto"]
+)
+def test_align_with_backend(tmp_path, guide_list, query_sequence, name):
+    """Every backend gives the same results, in batches of queries"""
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guide_list)
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    query_sequences = guide_list[: align.QUERY_BATCH_SIZE + 3]
+    expected = align.find_off_targets_batch(
+        guide_list, query_sequences, np.uint64(10)
+    )
+    summaries, off_target_ids_idx, off_target_ids = align.align(
+        guide_list,
+        query_sequences,
+        name,
+        np.uint64(10),
+        seed_index,
+        strand_index=strand_index,
+    )
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    for q in range(query_sequences.size):
+        np.testing.assert_array_equal(
+            np.sort(off_target_ids[q, : off_target_ids_idx[q]]),
+            np.sort(expected[2][q, : expected[1][q]]),
+        )
+
+
+def test_get_backend(guide_list):
+    backend = align.get_backend("cpu", guide_list, chunk_size=100)
+    assert isinstance(backend, align.CpuBackend)
+    assert backend.chunk_size == 100
+    with pytest.raises(ValueError, match="Unknown backend x"):
+        align.get_backend("x", guide_list)
+    with pytest.raises(ValueError, match="Backend seed is not available"):
+        align.get_backend("seed", guide_list)
+    with pytest.raises(ValueError, match="Backend cpu is disabled"):
+        align.get_backend("cpu", guide_list, exclude=("cpu",))
+
+
+def test_calibrate_backend(guide_list):
+    assert align.calibrate_backend(guide_list, exclude=("cuda",)) in (
+        "cpu",
+        "numpy",
+        "simd",
+    )
+    assert (
+        align.calibrate_backend(guide_list, exclude=("cpu", "cuda", "simd"))
+        == "numpy"
+    )
+
+
+def test_register_backend(guide_list, query_sequence):
+    @align.register_backend
+    class ReferenceBackend(align.OffTargetBackend):
+        name = "reference"
+
+        def search(
+            self,
+            query_sequences,
+            offset=np.uint64(0),
+            parameters=align.DEFAULT_PARAMETERS,
+        ):
+            return align.find_off_targets_numpy(
+                self.guides, query_sequences, offset, parameters=parameters
+            )
+
+    try:
+        results = align.align(
+            guide_list, np.array([query_sequence]), "reference"
+        )
+        np.testing.assert_array_equal(results[0][0], [2, 0, 1, 36, 350])
+    finally:
+        del align.BACKENDS["reference"]
+
+
+@pytest.mark.parametrize("name", ["cpu", "numpy", "seed", "simd"])
+def test_align_with_packed_guides(tmp_path, guide_list, name):
+    """The kernels search packed guides as they are"""
+    guides = np.append(guide_list, utils.ERROR_STR)
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guides, 20)
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    packed = utils.pack_guides(guides)
+    query_sequences = guide_list[: numba.get_num_threads() + 1]
+    expected = align.align(guides, query_sequences, name, seed_index=seed_index)
+    results = align.align(packed, query_sequences, name, seed_index=seed_index)
+    for result, expected_result in zip(results, expected):
+        np.testing.assert_array_equal(result, expected_result)
+    # a batch smaller than the number of threads uses the other CPU kernel
+    expected = align.align(
+        guides, query_sequences[:1], name, seed_index=seed_index
+    )
+    results = align.align(
+        packed, query_sequences[:1], name, seed_index=seed_index
+    )
+    for result, expected_result in zip(results, expected):
+        np.testing.assert_array_equal(result, expected_result)
+
+
+@pytest.mark.skipif(
+    cuda.is_available() is False, reason="CUDA is not available"
+)
+@pytest.mark.parametrize("chunk_size", [None, 100])
+def test_cuda_backend_with_packed_guides(guide_list, chunk_size):
+    query_sequences = guide_list[:3]
+    expected = align.find_off_targets_batch(guide_list, query_sequences)
+    backend = align.CudaBackend(
+        utils.pack_guides(guide_list), chunk_size=chunk_size
+    )
+    summaries, off_target_ids_idx, off_target_ids = backend.search(
+        query_sequences
+    )
+    np.testing.assert_array_equal(summaries, expected[0])
+    np.testing.assert_array_equal(off_target_ids_idx, expected[1])
+    for q in range(query_sequences.size):
+        np.testing.assert_array_equal(
+            np.sort(off_target_ids[q, : off_target_ids_idx[q]]),
+            np.sort(expected[2][q, : expected[1][q]]),
+        )
+
+
 def test_pop_count(query_sequence):
     # "AAAACTGGTGCCTGGTTCTC" pam right
     test_seq = np.uint64(0b10000000001111010111001011110101111011101)
@@ -525,6 +1247,14 @@ def test_pop_count(query_sequence):
     assert match_count == 3
 
 
+def test_pop_count_counts_bases():
+    """Each base with either of its two bits set counts once"""
+    rng = np.random.default_rng(0)
+    for match in rng.integers(0, 1 << 40, size=100, dtype=np.uint64):
+        bases = [(int(match) >> (2 * b)) & 0x3 for b in range(20)]
+        assert align._pop_count(match) == np.count_nonzero(bases)
+
+
 def test_reverse_complement_binary(query_sequence, reverse_query_sequence):
     assert (
         align.reverse_complement_binary(query_sequence, 20)
@@ -550,3 +1280,250 @@ def test_run(guides_file, capsys):
     assert expected_start in captured.out
     assert expected_ids in captured.out
     assert expected_off_targets in captured.out
+
+
+def test_run_multiple_ids(guides_file, capsys):
+    args = ["--ifile", guides_file, "--no-cuda", "101", "1"]
+    align.run(args)
+    captured = capsys.readouterr()
+    lines = captured.out.splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("101\t1\t")
+    assert lines[0].endswith("{0: 27, 1: 2, 2: 4, 3: 1, 4: 11}")
+    assert lines[1].startswith("1\t1\t")
+
+
+def test_run_memory_mapped(guides_file, capsys):
+    args = ["--ifile", guides_file, "--no-cuda", "--mmap", "101"]
+    align.run(args)
+    captured = capsys.readouterr()
+    assert captured.out.startswith("101\t1\t")
+    assert "{0: 27, 1: 2, 2: 4, 3: 1, 4: 11}" in captured.out
+
+
+def test_run_with_seed_index(tmp_path, guides_file, guide_list, capsys):
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    align.run(["--ifile", guides_file, "--no-cuda", "101"])
+    expected = capsys.readouterr().out
+    align.run(["--ifile", guides_file, "--seed_index", str(seedfile), "101"])
+    captured = capsys.readouterr()
+    assert captured.out == expected
+
+
+def test_run_with_strand_index(tmp_path, guides_file, guide_list, capsys):
+    strandfile = tmp_path / "guides.strand"
+    strand.write_strand_index(strandfile, guide_list)
+    align.run(["--ifile", guides_file, "--no-cuda", "101"])
+    expected = capsys.readouterr().out
+    align.run(
+        ["--ifile", guides_file, "--strand_index", str(strandfile), "101"]
+    )
+    captured = capsys.readouterr()
+    assert captured.out == expected
+    assert "Using the strand backend" in captured.err
+
+
+def test_run_streamed(guides_file, capsys):
+    align.run(["--ifile", guides_file, "--no-cuda", "101"])
+    expected = capsys.readouterr().out
+    align.run(["--ifile", guides_file, "--memory", "1", "101"])
+    captured = capsys.readouterr()
+    assert captured.out == expected
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_run_streamed_chunk_size(
+    guides_file, packed_guides_file, packed, capsys, monkeypatch
+):
+    """The memory budget is divided by the bytes of each guide"""
+    chunk_sizes = []
+    select_backend = align.select_backend
+
+    def recording_select_backend(*args):
+        chunk_sizes.append(args[4])
+        return select_backend(*args)
+
+    monkeypatch.setattr(align, "select_backend", recording_select_backend)
+    inputfile = packed_guides_file if packed else guides_file
+    align.run(["--ifile", inputfile, "--memory", "1", "101"])
+    assert chunk_sizes == [1024 * 1024 // (6 if packed else 8)]
+    assert "{0: 27, 1: 2, 2: 4, 3: 1, 4: 11}" in capsys.readouterr().out
+
+
+def test_run_with_invalid_memory_budget(guides_file):
+    with pytest.raises(SystemExit) as excinfo:
+        align.run(["--ifile", guides_file, "--memory", "0", "101"])
+    assert excinfo.value.code == 2
+
+
+@pytest.mark.parametrize("name", ["cpu", "numpy", "simd", "auto"])
+def test_run_with_backend(guides_file, capsys, name):
+    align.run(["--ifile", guides_file, "--no-cuda", "101"])
+    expected = capsys.readouterr().out
+    align.run(["--ifile", guides_file, "--no-cuda", "--backend", name, "101"])
+    captured = capsys.readouterr()
+    assert captured.out == expected
+
+
+def test_run_with_unavailable_backend(guides_file):
+    with pytest.raises(SystemExit) as excinfo:
+        align.run(["--ifile", guides_file, "--backend", "seed", "101"])
+    assert excinfo.value.code == 2
+
+
+def test_run_with_mismatches(guides_file, capsys):
+    align.run(
+        [
+            "--ifile",
+            guides_file,
+            "--no-cuda",
+            "--mismatches",
+            "2",
+            "--max_off_targets",
+            "10",
+            "101",
+        ]
+    )
+    captured = capsys.readouterr()
+    # 33 off-targets are more than the cap, so only the summary is printed
+    assert captured.out == "101\t1\t{0: 27, 1: 2, 2: 4}\n"
+
+
+@pytest.mark.parametrize(
+    "option, value",
+    [("--mismatches", "5"), ("--mismatches", "x"), ("--max_off_targets", "0")],
+)
+def test_run_with_invalid_parameters(guides_file, option, value):
+    with pytest.raises(SystemExit) as excinfo:
+        align.run(["--ifile", guides_file, option, value, "101"])
+    assert excinfo.value.code == 2
+
+
+def test_run_with_cache(tmp_path, guides_file, capsys):
+    cachefile = str(tmp_path / "guides.cache")
+    align.run(["--ifile", guides_file, "--no-cuda", "101", "1"])
+    expected = capsys.readouterr().out
+    align.run(["--ifile", guides_file, "--cache", cachefile, "101"])
+    captured = capsys.readouterr()
+    assert "Using the" in captured.err
+    # the first result is cached, so only the second is searched
+    align.run(["--ifile", guides_file, "--cache", cachefile, "101", "1"])
+    captured = capsys.readouterr()
+    assert captured.out == expected
+    assert "Using the" in captured.err
+    # every result is cached, so no backend is created
+    align.run(["--ifile", guides_file, "--cache", cachefile, "101", "1"])
+    captured = capsys.readouterr()
+    assert captured.out == expected
+    assert "Using the" not in captured.err
+
+
+def test_run_with_invalid_cache_size(guides_file):
+    with pytest.raises(SystemExit) as excinfo:
+        align.run(["--ifile", guides_file, "--cache_size", "0", "101"])
+    assert excinfo.value.code == 2
+
+
+def test_align_range(tmp_path, guides_file, guide_list):
+    """The summaries of a range are written in batches, resuming from the
+    checkpoint"""
+    guides, metadata = align.load_guides(guides_file)
+    outputfile = tmp_path / "guides.summaries"
+    checkpointfile = tmp_path / "guides.checkpoint"
+    expected, _, _ = align.find_off_targets_batch(guide_list, guide_list[9:30])
+
+    def failing_backend():
+        raise AssertionError("the range is already done")
+
+    align.align_range(
+        guides, 10, 30, metadata, outputfile, checkpointfile, batch_size=8
+    )
+    align.align_range(
+        guides, 10, 30, metadata, outputfile, checkpointfile, failing_backend
+    )
+    with pytest.raises(ValueError, match="another range or search"):
+        align.align_range(guides, 10, 50, metadata, outputfile, checkpointfile)
+    # a job killed after writing a batch but before its checkpoint
+    with open(outputfile, "ab") as summary_file:
+        summary_file.write(b"\xff" * 12)
+    precompute.write_checkpoint(checkpointfile, 25)
+    align.align_range(
+        guides, 10, 30, metadata, outputfile, checkpointfile, batch_size=3
+    )
+    with open(outputfile, "rb") as summary_file:
+        precomputed = precompute.get_precomputed_summaries(summary_file)
+    assert precomputed.first_id == 10
+    np.testing.assert_array_equal(precomputed.summaries, expected)
+
+
+def test_align_range_raises_exception_when_range_is_invalid(
+    tmp_path, guides_file
+):
+    guides, metadata = align.load_guides(guides_file)
+    with pytest.raises(ValueError, match="Invalid range"):
+        align.align_range(
+            guides,
+            1,
+            guides.size + 1,
+            metadata,
+            tmp_path / "s",
+            tmp_path / "c",
+        )
+
+
+def test_run_with_range(tmp_path, guides_file, capsys):
+    outputfile = tmp_path / "guides.summaries"
+    align.run(["--ifile", guides_file, "--no-cuda", "99", "100", "101"])
+    expected = [
+        line.rsplit("\t", 1)[1] for line in capsys.readouterr().out.splitlines()
+    ]
+    align.run(
+        [
+            "--ifile",
+            guides_file,
+            "--no-cuda",
+            "--range",
+            "99-101",
+            "-o",
+            str(outputfile),
+        ]
+    )
+    captured = capsys.readouterr()
+    assert "Searched up to CRISPR ID 101 of 101" in captured.err
+    assert (tmp_path / "guides.summaries.checkpoint").read_text() == "102\n"
+    with open(outputfile, "rb") as summary_file:
+        precomputed = precompute.get_precomputed_summaries(summary_file)
+    summaries = [
+        "{" + ", ".join(f"{i}: {n}" for i, n in enumerate(summary)) + "}"
+        for summary in precomputed.summaries
+    ]
+    assert summaries == expected
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--range", "99-101"],
+        ["--range", "99-101", "-o", "s", "101"],
+        ["--range", "99-101", "-o", "s", "--cache", "c"],
+        ["--range", "99", "-o", "s"],
+        ["--range", "101-99", "-o", "s"],
+        ["--range", "0-99", "-o", "s"],
+        ["--range", "1-100000", "-o", "s"],
+    ],
+)
+def test_run_with_invalid_range(tmp_path, guides_file, args):
+    with pytest.raises(SystemExit) as excinfo:
+        align.run(["--ifile", guides_file, "--no-cuda", *args])
+    assert excinfo.value.code == 2
+
+
+def test_run_with_packed_guides(guides_file, packed_guides_file, capsys):
+    align.run(["--ifile", guides_file, "--no-cuda", "101", "1"])
+    expected = capsys.readouterr().out
+    align.run(
+        ["--ifile", packed_guides_file, "--no-cuda", "--mmap", "101", "1"]
+    )
+    captured = capsys.readouterr()
+    assert captured.out == expected
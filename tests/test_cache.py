@@ -0,0 +1,115 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import numpy as np
+import pytest
+
+import py_crispr_analyser.align as align
+import py_crispr_analyser.cache as cache
+
+
+@pytest.fixture
+def results(guide_list):
+    query_sequences = guide_list[:3].copy()
+    return query_sequences, align.find_off_targets_batch(
+        guide_list, query_sequences
+    )
+
+
+class TestResultCache:
+    def test_round_trip(self, tmp_path, guides_file, results):
+        query_sequences, expected = results
+        cachefile = tmp_path / "guides.cache"
+        with cache.ResultCache(cachefile, guides_file) as result_cache:
+            result_cache.put(query_sequences, *expected)
+        with cache.ResultCache(cachefile, guides_file) as result_cache:
+            found, cached = result_cache.get(
+                np.append(query_sequences[::-1], np.uint64(7)),
+                align.MAX_MISSMATCHES,
+                align.MAX_OFF_TARGETS,
+            )
+        np.testing.assert_array_equal(found, [True, True, True, False])
+        for result, expected_result in zip(cached, expected):
+            np.testing.assert_array_equal(result[:3], expected_result[::-1])
+            assert not result[3].any()
+
+    def test_keys_on_limit_and_cap(self, tmp_path, guides_file, results):
+        query_sequences, expected = results
+        with cache.ResultCache(tmp_path / "c", guides_file) as result_cache:
+            result_cache.put(query_sequences, *expected)
+            for max_mismatches, max_off_targets in ((3, 2000), (5, 10)):
+                found, _ = result_cache.get(
+                    query_sequences, max_mismatches, max_off_targets
+                )
+                assert not found.any()
+
+    def test_stores_error_queries(self, tmp_path, guides_file, guide_list):
+        query_sequences = np.array([align.ERROR_STR], dtype=np.uint64)
+        expected = align.find_off_targets_batch(guide_list, query_sequences)
+        with cache.ResultCache(tmp_path / "c", guides_file) as result_cache:
+            result_cache.put(query_sequences, *expected)
+            found, _ = result_cache.get(
+                query_sequences, align.MAX_MISSMATCHES, align.MAX_OFF_TARGETS
+            )
+        assert found.all()
+
+    def test_evicts_least_recently_used(self, tmp_path, guides_file, results):
+        query_sequences, expected = results
+        # room for two entries of the first query's size
+        stored = min(int(expected[1][0]), align.MAX_OFF_TARGETS)
+        entry_size = 4 * (align.MAX_MISSMATCHES + stored)
+        budget = 2 * (entry_size + cache.ENTRY_OVERHEAD)
+        with cache.ResultCache(
+            tmp_path / "c", guides_file, budget
+        ) as result_cache:
+            first = tuple(result[:1] for result in expected)
+            result_cache.put(query_sequences[:1], *first)
+            result_cache.put(query_sequences[1:2], *first)
+            # the first query is used again, so the second is evicted
+            result_cache.get(
+                query_sequences[:1],
+                align.MAX_MISSMATCHES,
+                align.MAX_OFF_TARGETS,
+            )
+            result_cache.put(query_sequences[2:3], *first)
+            found, _ = result_cache.get(
+                query_sequences, align.MAX_MISSMATCHES, align.MAX_OFF_TARGETS
+            )
+        np.testing.assert_array_equal(found, [True, False, True])
+
+    def test_keeps_total_size(self, tmp_path, guides_file, results):
+        query_sequences, expected = results
+        # room for two entries of the first query's size
+        stored = min(int(expected[1][0]), align.MAX_OFF_TARGETS)
+        entry_size = 4 * (align.MAX_MISSMATCHES + stored)
+        budget = 2 * (entry_size + cache.ENTRY_OVERHEAD)
+        first = tuple(result[:1] for result in expected)
+        with cache.ResultCache(
+            tmp_path / "c", guides_file, budget
+        ) as result_cache:
+            # the second put of each query replaces its entry, the third
+            # query evicts the first
+            for q in (0, 0, 1, 1, 2):
+                result_cache.put(query_sequences[q:][:1], *first)
+                total, expected_total = result_cache.connection.execute(
+                    "SELECT (SELECT size FROM totals), "
+                    "(SELECT COALESCE(SUM(size), 0) FROM results)"
+                ).fetchone()
+                assert total == expected_total
+            assert len(result_cache) == 2
+            assert total == budget
+
+    def test_checksum_changes_with_guides_file(self, tmp_path, guides_file):
+        cachefile = tmp_path / "guides.cache"
+        with cache.ResultCache(cachefile, guides_file) as result_cache:
+            checksum = result_cache.checksum
+        assert checksum == cache.file_checksum(guides_file)
+        with open(guides_file, "ab") as guides:
+            guides.write(b"\0")
+        with cache.ResultCache(cachefile, guides_file) as result_cache:
+            assert result_cache.checksum != checksum
+
+    def test_raises_exception_when_size_is_not_positive(
+        self, tmp_path, guides_file
+    ):
+        with pytest.raises(ValueError, match="Cache size must be positive"):
+            cache.ResultCache(tmp_path / "c", guides_file, 0)
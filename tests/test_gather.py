@@ -1,5 +1,6 @@
 # Copyright (C) 2025-2026 Genome Research Ltd.
 
+import numpy as np
 import pytest
 import py_crispr_analyser.gather as gather
 
@@ -86,6 +87,51 @@ class TestMatchPam:
         )
 
 
+class TestMatchPamSites:
+    @pytest.mark.parametrize("pam_on_right", [True, False])
+    @pytest.mark.parametrize("pam_sequence", ["NGG", "GN", "AT", "NNN"])
+    def test_agrees_with_match_pam(self, pam_on_right, pam_sequence):
+        """Test that every window is checked as match_pam would"""
+        dna_sequence = "GATCANCCGGTTAGGNGGATCGA"
+        sequence = np.frombuffer(dna_sequence.encode(), dtype=np.uint8)
+        mask = gather.match_pam_sites(
+            sequence, pam_sequence, pam_on_right, window_length=5
+        )
+        expected = [
+            gather.match_pam(dna_sequence[i:][:5], pam_sequence, pam_on_right)
+            for i in range(len(dna_sequence) - 4)
+        ]
+        assert mask.tolist() == expected
+
+    def test_sequence_shorter_than_window(self):
+        sequence = np.frombuffer(b"ACG", dtype=np.uint8)
+        assert gather.match_pam_sites(sequence, "NGG", True, 5).size == 0
+
+
+class TestFindCrisprs:
+    def test_both_pams_in_one_window(self):
+        """Test that a window with a PAM on both sides is returned twice,
+        PAM left first"""
+        sequence = np.frombuffer(
+            b"CCA" + b"T" * (gather.GUIDE_RNA_LENGTH - 3) + b"AGGCC",
+            dtype=np.uint8,
+        )
+        positions, pam_right = gather.find_crisprs(sequence, "NGG")
+        assert positions.tolist() == [0, 0]
+        assert pam_right.tolist() == [0, 1]
+
+
+class TestReadChromosomes:
+    def test_splits_chromosomes(self, tmp_path, multiple_chromasomes_fasta):
+        infile = tmp_path / "test.fasta"
+        infile.write_text(multiple_chromasomes_fasta)
+        chromosomes = list(gather.read_chromosomes(infile))
+        assert [name for name, _ in chromosomes] == ["MT", "X"]
+        assert chromosomes[1][1].tobytes() == (
+            b"ACAGGCGAACATACTTACTAAAGTGTGTTAATTAATTAATGCTTGTAGGACATAATAATA"
+        )
+
+
 @pytest.fixture
 def single_chromosome_fasta():
     """Test fixture for a single chromosome fasta file"""
@@ -407,6 +453,46 @@ class TestRun:
 class TestGather:
     """Test the gather function"""
 
+    @pytest.mark.parametrize("legacy_mode", [True, False])
+    def test_with_multiple_processes(
+        self, tmp_path, single_chromosome_fasta, legacy_mode
+    ):
+        """Test that gathering chromosomes in parallel gives the same rows
+        in the same order as a single process"""
+        infile = tmp_path / "test.fasta"
+        infile.write_text(
+            "GATCACAGGTCTATCACCCTATTAACCACTCACGGG\n"
+            + single_chromosome_fasta
+            + "\n>X dna:chromosome chromosome:GRCh38:X REF\n"
+            + ">Y dna:chromosome chromosome:GRCh38:Y REF\n"
+            + single_chromosome_fasta.split("\n", 1)[1]
+        )
+        serial = tmp_path / "serial.csv"
+        parallel = tmp_path / "parallel.csv"
+        gather.gather(infile, serial, "NGG", legacy_mode=legacy_mode)
+        gather.gather(
+            infile, parallel, "NGG", legacy_mode=legacy_mode, processes=3
+        )
+        assert parallel.read_bytes() == serial.read_bytes()
+        assert b"\nY," in parallel.read_bytes()
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "parallel.csv",
+            "serial.csv",
+            "test.fasta",
+        ]
+
+    def test_find_fasta_records(self, tmp_path, multiple_chromasomes_fasta):
+        infile = tmp_path / "test.fasta"
+        infile.write_text(multiple_chromasomes_fasta)
+        records = gather.find_fasta_records(infile)
+        assert [chromosome for chromosome, _, _ in records] == ["MT", "X"]
+        for (_, start, end), (_, sequence) in zip(
+            records, gather.read_chromosomes(infile)
+        ):
+            assert np.array_equal(
+                gather.read_sequence(infile, start, end), sequence
+            )
+
     def test_with_ngg_pam_legacy(
         self,
         tmp_path,
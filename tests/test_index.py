@@ -3,7 +3,12 @@
 import pytest
 import numpy as np
 import struct
+import py_crispr_analyser.gather as gather
 import py_crispr_analyser.index as index
+import py_crispr_analyser.search as search
+import py_crispr_analyser.utils as utils
+import py_crispr_analyser.seed as seed
+import py_crispr_analyser.strand as strand
 
 
 class TestParseRecord:
@@ -63,6 +68,42 @@ class TestParseRecord:
             )
 
 
+class TestEncodeRecords:
+    def test_matches_parse_record(self, csv_input_1, csv_input_2):
+        block = (csv_input_1 + csv_input_2).replace("\n", "\r\n").encode()
+        expected = [
+            utils.sequence_to_binary_encoding(
+                *index.parse_record(line, guide_length=20, pam_length=3)
+            )
+            for line in (csv_input_1 + csv_input_2).splitlines()
+        ]
+        assert index.encode_records(block, 20, 3).tolist() == expected
+
+    def test_without_final_newline(self):
+        assert index.encode_records(
+            b"MT,13,ATCACCCTATTAACCACTCACGG,1,1", 20, 3
+        ).tolist() == [
+            utils.sequence_to_binary_encoding("ATCACCCTATTAACCACTCA", 1)
+        ]
+
+    def test_empty_block(self):
+        assert index.encode_records(b"", 20, 3).size == 0
+
+    def test_raises_exception_when_record_is_too_short(self, capsys):
+        with pytest.raises(SystemExit):
+            index.encode_records(
+                b"MT,13,ATCACCCTATTAACCACTCACGG,1,1\n"
+                b"MT,13,ATCACCCTATTAACCACTCACGG,1\n",
+                20,
+                3,
+            )
+        captured = capsys.readouterr()
+        assert (
+            captured.out == "Record 'MT,13,ATCACCCTATTAACCACTCACGG,1\n' "
+            "contains 4 columns, expected 5\n"
+        )
+
+
 @pytest.fixture
 def expected_binary_output():
     return struct.pack(
@@ -142,6 +183,53 @@ def test_index(prepare_files, expected_binary_output):
     assert outfile.read_bytes() == expected_binary_output
 
 
+def test_index_in_chunks(prepare_files, expected_binary_output, monkeypatch):
+    infile_1, infile_2, outfile = prepare_files
+    monkeypatch.setattr(index, "INDEX_CHUNK_SIZE", 7)
+    index.index([infile_1, infile_2], outfile, "Human", "GRCh38", 88, 1)
+    assert outfile.read_bytes() == expected_binary_output
+
+
+def test_find_csv_chunks(prepare_files, csv_input_1):
+    infile_1, _, _ = prepare_files
+    chunks = index.find_csv_chunks(infile_1, chunk_size=40)
+    assert chunks == [(0, 72), (72, 144)]
+    assert [index.count_records(infile_1, *chunk) for chunk in chunks] == [
+        2,
+        2,
+    ]
+
+
+def test_count_records_without_final_newline(tmp_path):
+    infile = tmp_path / "test.csv"
+    infile.write_text("MT,13,ATCACCCTATTAACCACTCACGG,1,1")
+    assert index.count_records(infile, 0, infile.stat().st_size) == 1
+
+
+def test_index_in_parallel(prepare_files, expected_binary_output, monkeypatch):
+    infile_1, infile_2, outfile = prepare_files
+    monkeypatch.setattr(index, "PARALLEL_CHUNK_SIZE", 40)
+    index.index(
+        [infile_1, infile_2], outfile, "Human", "GRCh38", 88, 1, processes=2
+    )
+    assert outfile.read_bytes() == expected_binary_output
+
+
+def test_index_in_parallel_with_invalid_record(tmp_path, csv_input_1):
+    infile = tmp_path / "test.csv"
+    infile.write_text(csv_input_1 + "MT,13,ATCACCCTATTAACCACTCACGG,1\n")
+    with pytest.raises(SystemExit):
+        index.index(
+            [infile],
+            tmp_path / "test.bin",
+            "Human",
+            "GRCh38",
+            0,
+            1,
+            processes=2,
+        )
+
+
 def test_run(prepare_files, expected_binary_output):
     infile_1, infile_2, outfile = prepare_files
     args = [
@@ -167,3 +255,242 @@ def test_run(prepare_files, expected_binary_output):
     index.run(args)
 
     assert outfile.read_bytes() == expected_binary_output
+
+
+def test_run_with_processes(prepare_files, expected_binary_output):
+    infile_1, infile_2, outfile = prepare_files
+    args = ["-i", infile_1, "-i", infile_2, "-o", outfile, "-s", "Human"]
+    args += ["-a", "GRCh38", "-f", "88", "-e", "1", "-t", "2"]
+    index.run(args)
+
+    assert outfile.read_bytes() == expected_binary_output
+
+
+def test_run_packed(prepare_files, expected_binary_output):
+    infile_1, infile_2, outfile = prepare_files
+    args = ["-i", infile_1, "-i", infile_2, "-o", outfile, "-s", "Human"]
+    args += ["-a", "GRCh38", "-f", "88", "-e", "1", "-t", "2", "--packed"]
+    index.run(args)
+
+    output = outfile.read_bytes()
+    guides_start = index.GUIDES_START
+    assert output[5:guides_start] == expected_binary_output[5:guides_start]
+    with open(outfile, "rb") as guides_file:
+        assert utils.check_file_header(guides_file.read(5)) == 4
+        guides = utils.get_guides(guides_file, packed=True)
+    assert len(output) - guides_start == guides.size * 6
+    np.testing.assert_array_equal(
+        utils.unpack_guides(guides),
+        np.frombuffer(expected_binary_output[guides_start:], dtype=np.uint64),
+    )
+
+
+def test_run_packed_with_long_guides(prepare_files, capsys):
+    infile_1, _, outfile = prepare_files
+    args = ["-i", infile_1, "-o", outfile, "-s", "Human", "-a", "GRCh38"]
+    args += ["-g", "24", "--packed"]
+    with pytest.raises(SystemExit) as excinfo:
+        index.run(args)
+    assert excinfo.value.code == 2
+    assert "cannot be packed" in capsys.readouterr().out
+    assert not outfile.exists()
+
+
+def test_index_packed_with_long_guides(prepare_files):
+    infile_1, _, outfile = prepare_files
+    with pytest.raises(ValueError, match="cannot be packed"):
+        index.index(
+            [infile_1], outfile, "Human", "GRCh38", 88, 1, 24, packed=True
+        )
+    assert not outfile.exists()
+
+
+def test_index_fasta_packed(tmp_path, fasta_file):
+    expected = tmp_path / "expected.bin"
+    index.index_fasta(fasta_file, expected, "NGN", "Human", "GRCh38", 88, 1)
+    outfile = tmp_path / "test.bin"
+    index.index_fasta(
+        fasta_file, outfile, "NGN", "Human", "GRCh38", 88, 1, packed=True
+    )
+    with open(expected, "rb") as expected_file, open(outfile, "rb") as out:
+        np.testing.assert_array_equal(
+            utils.get_guides(out), utils.get_guides(expected_file)
+        )
+
+
+def test_run_with_seed_index(prepare_files, expected_binary_output):
+    infile_1, infile_2, outfile = prepare_files
+    seedfile = outfile.with_suffix(".seed")
+    args = [
+        "-i",
+        infile_1,
+        "-i",
+        infile_2,
+        "-o",
+        outfile,
+        "-s",
+        "Human",
+        "-a",
+        "GRCh38",
+        "-f",
+        "88",
+        "-e",
+        "1",
+        "--seed_index",
+        seedfile,
+    ]
+    index.run(args)
+
+    assert outfile.read_bytes() == expected_binary_output
+    with open(seedfile, "rb") as seed_file:
+        seed_index = seed.get_seed_index(seed_file)
+    assert seed_index.number_of_guides == 8
+    # the guide with an N is left out of the index
+    assert seed_index.postings.shape == (seed.SEED_SEGMENTS, 7)
+
+
+def test_run_with_strand_index(prepare_files, expected_binary_output):
+    infile_1, infile_2, outfile = prepare_files
+    strandfile = outfile.with_suffix(".strand")
+    args = [
+        "-i",
+        infile_1,
+        "-i",
+        infile_2,
+        "-o",
+        outfile,
+        "-s",
+        "Human",
+        "-a",
+        "GRCh38",
+        "-f",
+        "88",
+        "-e",
+        "1",
+        "--strand_index",
+        strandfile,
+    ]
+    index.run(args)
+
+    assert outfile.read_bytes() == expected_binary_output
+    with open(strandfile, "rb") as strand_file:
+        strand_index = strand.get_strand_index(strand_file)
+    assert strand_index.number_of_guides == 8
+    # the guide with an N is left out of the index
+    assert sum(ids.size for ids in strand_index.ids) == 7
+
+
+def test_run_with_sorted_index(prepare_files, expected_binary_output):
+    infile_1, infile_2, outfile = prepare_files
+    sortedfile = outfile.with_suffix(".sorted")
+    args = [
+        "-i",
+        infile_1,
+        "-i",
+        infile_2,
+        "-o",
+        outfile,
+        "-s",
+        "Human",
+        "-a",
+        "GRCh38",
+        "-f",
+        "88",
+        "-e",
+        "1",
+        "--sorted_index",
+        sortedfile,
+    ]
+    index.run(args)
+
+    assert outfile.read_bytes() == expected_binary_output
+    with open(sortedfile, "rb") as sorted_file:
+        sorted_index = search.get_sorted_index(sorted_file)
+    with open(outfile, "rb") as guides_file:
+        guides = utils.get_guides(guides_file)
+    np.testing.assert_array_equal(np.sort(sorted_index), np.arange(8))
+    assert np.all(np.diff(guides[sorted_index]) >= 0)
+
+
+@pytest.fixture
+def fasta_file(tmp_path):
+    infile = tmp_path / "test.fasta"
+    infile.write_text(
+        """>MT dna:chromosome chromosome:GRCh38:MT:1:16569:1 REF
+GATCACAGGTCTATCACCCTATTAACCACTCACGGGAGCTCTCCATGCATTTGGTATTTT
+CGTCTGGGGGGTATGCACGCGATAGCATTGCGAGACGCTGGAGCCNGAGCACCCTATGTC
+>X dna:chromosome chromosome:GRCh38:X:1:156040895:1 REF
+ACAG
+>Y dna:chromosome chromosome:GRCh38:Y:1:57227415:1 REF
+ACAGGCGAACATACTTACTAAAGTGTGTTAATTAATTAATGCTTGTAGGACATAATAATA"""
+    )
+    return infile
+
+
+def test_index_fasta(tmp_path, fasta_file):
+    """Test that indexing a FASTA file directly gives the same binary file as
+    gathering then indexing the CSV file"""
+    gathered_csv = tmp_path / "gathered.csv"
+    gather.gather(fasta_file, gathered_csv, "NGG", legacy_mode=True)
+    expected = tmp_path / "expected.bin"
+    index.index([gathered_csv], expected, "Human", "GRCh38", 88, 1)
+
+    outfile = tmp_path / "test.bin"
+    csvfile = tmp_path / "test.csv"
+    index.index_fasta(
+        fasta_file, outfile, "NGG", "Human", "GRCh38", 88, 1, csvfile=csvfile
+    )
+    assert outfile.read_bytes() == expected.read_bytes()
+    assert csvfile.read_bytes() == gathered_csv.read_bytes()
+
+
+def test_index_fasta_in_chunks(tmp_path, fasta_file, monkeypatch):
+    expected = tmp_path / "expected.bin"
+    index.index_fasta(fasta_file, expected, "NGG", "Human", "GRCh38", 0, 1)
+    monkeypatch.setattr(index, "ENCODE_CHUNK_SIZE", 3)
+    outfile = tmp_path / "test.bin"
+    index.index_fasta(fasta_file, outfile, "NGG", "Human", "GRCh38", 0, 1)
+    assert outfile.read_bytes() == expected.read_bytes()
+
+
+def test_run_with_fasta(tmp_path, fasta_file):
+    expected = tmp_path / "expected.bin"
+    index.index_fasta(fasta_file, expected, "NGN", "Human", "GRCh38", 88, 1)
+    outfile = tmp_path / "test.bin"
+    args = [
+        "--fasta",
+        fasta_file,
+        "--pam",
+        "NGN",
+        "-o",
+        outfile,
+        "-s",
+        "Human",
+        "-a",
+        "GRCh38",
+        "-f",
+        "88",
+        "-e",
+        "1",
+    ]
+    index.run(args)
+    assert outfile.read_bytes() == expected.read_bytes()
+
+
+def test_run_with_fasta_and_csv_input(tmp_path, fasta_file, prepare_files):
+    infile_1, _, outfile = prepare_files
+    args = ["--fasta", fasta_file, "--pam", "NGG", "-i", infile_1]
+    args += ["-o", outfile, "-s", "Human", "-a", "GRCh38"]
+    with pytest.raises(SystemExit):
+        index.run(args)
+
+
+@pytest.mark.parametrize("option", [["-g", "20"], ["-p", "3"]])
+def test_run_with_fasta_and_lengths(tmp_path, fasta_file, option):
+    outfile = tmp_path / "test.bin"
+    args = ["--fasta", fasta_file, "--pam", "NGG", *option]
+    args += ["-o", outfile, "-s", "Human", "-a", "GRCh38"]
+    with pytest.raises(SystemExit) as excinfo:
+        index.run(args)
+    assert excinfo.value.code == 2
+    assert not outfile.exists()
@@ -0,0 +1,127 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import numpy as np
+import pytest
+
+import py_crispr_analyser.precompute as precompute
+
+
+@pytest.fixture
+def summaries():
+    return np.arange(30, dtype=np.uint32).reshape(10, 3)
+
+
+class TestSummaryWriter:
+    def test_round_trip(self, tmp_path, summaries):
+        outputfile = tmp_path / "guides.summaries"
+        checkpointfile = tmp_path / "guides.checkpoint"
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 11, 20, 3, 2000
+        ) as writer:
+            writer.write(summaries[:4])
+            assert precompute.read_checkpoint(checkpointfile) == 15
+            writer.write(summaries[4:])
+            assert writer.done
+        with open(outputfile, "rb") as summary_file:
+            precomputed = precompute.get_precomputed_summaries(summary_file)
+        assert precomputed.first_id == 11
+        assert precomputed.max_off_targets == 2000
+        np.testing.assert_array_equal(precomputed.summaries, summaries)
+
+    def test_resumes_from_checkpoint(self, tmp_path, summaries):
+        outputfile = tmp_path / "guides.summaries"
+        checkpointfile = tmp_path / "guides.checkpoint"
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        ) as writer:
+            writer.write(summaries[:4])
+        # a batch written after the checkpoint by a killed job
+        with open(outputfile, "ab") as summary_file:
+            summary_file.write(b"\xff" * 20)
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        ) as writer:
+            assert writer.next_id == 5
+            writer.write(summaries[4:])
+        with open(outputfile, "rb") as summary_file:
+            precomputed = precompute.get_precomputed_summaries(summary_file)
+        np.testing.assert_array_equal(precomputed.summaries, summaries)
+
+    def test_resumes_before_the_first_batch(self, tmp_path, summaries):
+        outputfile = tmp_path / "guides.summaries"
+        checkpointfile = tmp_path / "guides.checkpoint"
+        # a job killed before writing a batch, its file never closed
+        writer = precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        )
+        assert outputfile.stat().st_size == precompute.SUMMARY_HEADER_SIZE
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        ) as resumed:
+            assert resumed.next_id == 1
+            resumed.write(summaries)
+        writer.close()
+        with open(outputfile, "rb") as summary_file:
+            precomputed = precompute.get_precomputed_summaries(summary_file)
+        np.testing.assert_array_equal(precomputed.summaries, summaries)
+
+    def test_raises_exception_when_resuming_another_search(
+        self, tmp_path, summaries
+    ):
+        outputfile = tmp_path / "guides.summaries"
+        checkpointfile = tmp_path / "guides.checkpoint"
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        ) as writer:
+            writer.write(summaries[:4])
+        with pytest.raises(ValueError, match="another range or search"):
+            precompute.SummaryWriter(outputfile, checkpointfile, 1, 10, 3, 10)
+
+    def test_raises_exception_when_output_is_truncated(
+        self, tmp_path, summaries
+    ):
+        outputfile = tmp_path / "guides.summaries"
+        checkpointfile = tmp_path / "guides.checkpoint"
+        with precompute.SummaryWriter(
+            outputfile, checkpointfile, 1, 10, 3, 2000
+        ) as writer:
+            writer.write(summaries[:4])
+        outputfile.write_bytes(outputfile.read_bytes()[:-4])
+        with pytest.raises(ValueError, match="does not match the checkpoint"):
+            precompute.SummaryWriter(outputfile, checkpointfile, 1, 10, 3, 2000)
+
+    def test_raises_exception_past_the_end_of_the_range(
+        self, tmp_path, summaries
+    ):
+        with precompute.SummaryWriter(
+            tmp_path / "s", tmp_path / "c", 1, 5, 3, 2000
+        ) as writer:
+            with pytest.raises(ValueError, match="past the end of the range"):
+                writer.write(summaries)
+
+
+class TestGetPrecomputedSummaries:
+    def test_raises_exception_when_job_is_not_finished(
+        self, tmp_path, summaries
+    ):
+        outputfile = tmp_path / "guides.summaries"
+        with precompute.SummaryWriter(
+            outputfile, tmp_path / "c", 1, 10, 3, 2000
+        ) as writer:
+            writer.write(summaries[:4])
+        with open(outputfile, "rb") as summary_file:
+            with pytest.raises(ValueError, match="Invalid summaries size"):
+                precompute.get_precomputed_summaries(summary_file)
+
+    def test_raises_exception_when_version_is_wrong(self, tmp_path, summaries):
+        outputfile = tmp_path / "guides.summaries"
+        with precompute.SummaryWriter(
+            outputfile, tmp_path / "c", 1, 10, 3, 2000
+        ) as writer:
+            writer.write(summaries)
+        data = bytearray(outputfile.read_bytes())
+        data[1] = 9
+        outputfile.write_bytes(bytes(data))
+        with open(outputfile, "rb") as summary_file:
+            with pytest.raises(ValueError, match="Invalid summaries version"):
+                precompute.get_precomputed_summaries(summary_file)
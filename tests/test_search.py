@@ -1,10 +1,12 @@
 # Copyright (C) 2025 Genome Research Ltd.
 
+import io
 import numpy as np
 import pytest
 import struct
 
 import py_crispr_analyser.search as search
+import py_crispr_analyser.utils as utils
 
 
 @pytest.fixture
@@ -156,6 +158,185 @@ class TestSearch:
         )
 
 
+@pytest.fixture
+def sorted_index(tmp_path, guides_array_with_matches):
+    sortedfile = tmp_path / "crisprs.sorted"
+    search.write_sorted_index(sortedfile, guides_array_with_matches)
+    with open(sortedfile, "rb") as sorted_file:
+        return search.get_sorted_index(sorted_file)
+
+
+class TestSortedIndex:
+    def test_sorts_the_guides(self, guides_array_with_matches, sorted_index):
+        assert np.all(np.diff(guides_array_with_matches[sorted_index]) >= 0)
+
+    def test_memory_mapped(self, tmp_path, guides_array_with_matches):
+        sortedfile = tmp_path / "crisprs.sorted"
+        search.write_sorted_index(sortedfile, guides_array_with_matches)
+        with open(sortedfile, "rb") as sorted_file:
+            sorted_index = search.get_sorted_index(sorted_file, mmap=True)
+        assert isinstance(sorted_index, np.memmap)
+        assert sorted_index.size == guides_array_with_matches.size
+
+    def test_raises_exception_when_file_is_truncated(
+        self, tmp_path, guides_array_with_matches
+    ):
+        sortedfile = tmp_path / "crisprs.sorted"
+        search.write_sorted_index(sortedfile, guides_array_with_matches)
+        sortedfile.write_bytes(sortedfile.read_bytes()[:-8])
+        with open(sortedfile, "rb") as sorted_file:
+            with pytest.raises(ValueError, match="Invalid sorted index size"):
+                search.get_sorted_index(sorted_file)
+
+    @pytest.mark.parametrize("pam_right", [0, 1, 2])
+    def test_search_matches_scan(
+        self, guides_array_with_matches, sorted_index, pam_right
+    ):
+        for sequence in ["AAAACTGGAAACTGGTTCTC", "GAGAACCAGTTTCCAGTTTT"]:
+            assert search.search(
+                guides_array_with_matches,
+                sequence,
+                pam_right=pam_right,
+                sorted_index=sorted_index,
+            ) == search.search(
+                guides_array_with_matches, sequence, pam_right=pam_right
+            )
+
+    def test_repeated_sequences_are_all_found(
+        self, guides_array_with_matches, sorted_index
+    ):
+        assert search.search(
+            guides_array_with_matches,
+            "GAGAACCAGTTTCCAGTTTT",
+            pam_right=1,
+            sorted_index=sorted_index,
+        ) == [4, 7]
+
+    def test_no_sequences_are_found(
+        self, guides_array_with_matches, sorted_index
+    ):
+        assert (
+            search.search(
+                guides_array_with_matches,
+                "CCCCCCCCCCCCCCCCCCCC",
+                sorted_index=sorted_index,
+            )
+            == []
+        )
+
+
+class TestSearchBatch:
+    SEQUENCES = [
+        "AAAACTGGAAACTGGTTCTC",
+        "CCCCCCCCCCCCCCCCCCCC",
+        "GAGAACCAGTTTCCAGTTTT",
+        "AAAACTGGAAACTGGTTCTN",
+        "AAAACTGGAAACTGGTTCTC",
+    ]
+
+    @pytest.mark.parametrize("pam_right", [0, 1, 2])
+    def test_matches_single_searches(
+        self, guides_array_with_matches, pam_right
+    ):
+        expected = [
+            (sequence, idx)
+            for sequence in self.SEQUENCES
+            if "N" not in sequence
+            for idx in search.search(
+                guides_array_with_matches, sequence, pam_right=pam_right
+            )
+        ]
+        assert (
+            list(
+                search.search_batch(
+                    guides_array_with_matches,
+                    self.SEQUENCES,
+                    pam_right=pam_right,
+                )
+            )
+            == expected
+        )
+
+    @pytest.mark.parametrize("pam_right", [0, 1, 2])
+    def test_with_sorted_index(
+        self, guides_array_with_matches, sorted_index, pam_right
+    ):
+        assert list(
+            search.search_batch(
+                guides_array_with_matches,
+                self.SEQUENCES,
+                pam_right=pam_right,
+                sorted_index=sorted_index,
+            )
+        ) == list(
+            search.search_batch(
+                guides_array_with_matches, self.SEQUENCES, pam_right=pam_right
+            )
+        )
+
+    def test_scan_in_chunks(self, guides_array_with_matches, monkeypatch):
+        expected = list(
+            search.search_batch(guides_array_with_matches, self.SEQUENCES)
+        )
+        monkeypatch.setattr(search, "SCAN_CHUNK_SIZE", 2)
+        assert (
+            list(search.search_batch(guides_array_with_matches, self.SEQUENCES))
+            == expected
+        )
+
+    def test_no_sequences(self, guides_array_with_matches):
+        assert list(search.search_batch(guides_array_with_matches, [])) == []
+
+    def test_invalid_pam_right_raises_value_error(
+        self, guides_array_with_matches
+    ):
+        with pytest.raises(ValueError, match="Unknown pam_right value: 3"):
+            list(
+                search.search_batch(
+                    guides_array_with_matches, self.SEQUENCES, pam_right=3
+                )
+            )
+
+
+class TestPackedGuides:
+    SEQUENCES = TestSearchBatch.SEQUENCES
+
+    @pytest.fixture
+    def guides(self, guides_array_with_matches):
+        return np.append(guides_array_with_matches, utils.ERROR_STR)
+
+    @pytest.mark.parametrize("use_sorted_index", [False, True])
+    @pytest.mark.parametrize("pam_right", [0, 1, 2])
+    def test_match_unpacked_guides(
+        self, tmp_path, guides, use_sorted_index, pam_right
+    ):
+        sorted_index = None
+        if use_sorted_index:
+            sortedfile = tmp_path / "crisprs.sorted"
+            search.write_sorted_index(sortedfile, guides)
+            with open(sortedfile, "rb") as sorted_file:
+                sorted_index = search.get_sorted_index(sorted_file)
+        packed = utils.pack_guides(guides)
+        for sequence in self.SEQUENCES:
+            assert search.search(
+                packed, sequence, pam_right, sorted_index
+            ) == search.search(guides, sequence, pam_right, sorted_index)
+        assert list(
+            search.search_batch(packed, self.SEQUENCES, pam_right, sorted_index)
+        ) == list(
+            search.search_batch(guides, self.SEQUENCES, pam_right, sorted_index)
+        )
+
+    def test_sort_keys_order_as_unpacked(self, guides):
+        keys, queries = search.sort_keys(utils.pack_guides(guides), guides)
+        order = np.argsort(guides, kind="stable")
+        np.testing.assert_array_equal(np.argsort(keys, kind="stable"), order)
+        np.testing.assert_array_equal(
+            np.searchsorted(keys, queries, sorter=order),
+            np.searchsorted(guides, guides, sorter=order),
+        )
+
+
 class TestRun:
     def test_multiple_sequences_are_found(
         self, guides_with_matches_file, capsys
@@ -213,3 +394,102 @@ class TestRun:
         captured = capsys.readouterr()
         assert "Found 1 exact matches" in captured.err
         assert "\t91" in captured.out
+
+    def test_memory_mapped_guides(self, guides_with_matches_file, capsys):
+        args = [
+            "-i",
+            guides_with_matches_file,
+            "-s",
+            "AAAACTGGAAACTGGTTCTC",
+            "--mmap",
+        ]
+        search.run(args)
+        captured = capsys.readouterr()
+        assert "Found 2 exact matches" in captured.err
+        assert "\t89\n\t91" in captured.out
+
+    @pytest.mark.parametrize("use_sorted_index", [False, True])
+    def test_memory_mapped_packed_guides(
+        self,
+        tmp_path,
+        guides_with_matches_file,
+        guides_array_with_matches,
+        use_sorted_index,
+        capsys,
+        monkeypatch,
+    ):
+        original_search = search.search
+
+        def mapped_search(guides, *args, **kwargs):
+            # the packed guides are searched without unpacking them
+            assert isinstance(guides, np.memmap)
+            assert guides.dtype == utils.PACKED_GUIDE_DTYPE
+            return original_search(guides, *args, **kwargs)
+
+        monkeypatch.setattr(search, "search", mapped_search)
+        data = guides_with_matches_file.read_bytes()
+        guides_start = len(data) - guides_array_with_matches.size * 8
+        header = bytearray(data[:guides_start])
+        struct.pack_into("<L", header, 1, 4)
+        packed_file = tmp_path / "crisprs_packed.bin"
+        packed_file.write_bytes(
+            bytes(header)
+            + utils.pack_guides(guides_array_with_matches).tobytes()
+        )
+        args = ["-i", packed_file, "-s", "AAAACTGGAAACTGGTTCTC", "--mmap"]
+        if use_sorted_index:
+            sortedfile = tmp_path / "crisprs.sorted"
+            search.write_sorted_index(sortedfile, guides_array_with_matches)
+            args += ["--sorted_index", sortedfile]
+        search.run(args)
+        captured = capsys.readouterr()
+        assert "Found 2 exact matches" in captured.err
+        assert "\t89\n\t91" in captured.out
+
+    def test_sorted_index(
+        self,
+        tmp_path,
+        guides_with_matches_file,
+        guides_array_with_matches,
+        capsys,
+    ):
+        sortedfile = tmp_path / "crisprs.sorted"
+        search.write_sorted_index(sortedfile, guides_array_with_matches)
+        args = [
+            "-i",
+            guides_with_matches_file,
+            "-s",
+            "AAAACTGGAAACTGGTTCTC",
+            "--sorted_index",
+            sortedfile,
+        ]
+        search.run(args)
+        captured = capsys.readouterr()
+        assert "Found 2 exact matches" in captured.err
+        assert "\t89\n\t91" in captured.out
+
+    def test_sequences_file(self, tmp_path, guides_with_matches_file, capsys):
+        sequencesfile = tmp_path / "sequences.txt"
+        sequencesfile.write_text(
+            "AAAACTGGAAACTGGTTCTC\n\nCCCCCCCCCCCCCCCCCCCC\n"
+            "GAGAACCAGTTTCCAGTTTT\n"
+        )
+        args = ["-i", guides_with_matches_file, "-f", sequencesfile]
+        search.run(args)
+        captured = capsys.readouterr()
+        assert "Found 4 exact matches" in captured.err
+        assert captured.out == (
+            "AAAACTGGAAACTGGTTCTC,89\n"
+            "AAAACTGGAAACTGGTTCTC,91\n"
+            "GAGAACCAGTTTCCAGTTTT,92\n"
+            "GAGAACCAGTTTCCAGTTTT,95\n"
+        )
+
+    def test_sequences_from_stdin(
+        self, guides_with_matches_file, capsys, monkeypatch
+    ):
+        monkeypatch.setattr("sys.stdin", io.StringIO("AAAACTGGAAACTGGTTCTC\n"))
+        args = ["-i", guides_with_matches_file, "-f", "-", "-p", "1"]
+        search.run(args)
+        captured = capsys.readouterr()
+        assert captured.out == "AAAACTGGAAACTGGTTCTC,89\n"
@@ -0,0 +1,83 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import numpy as np
+import pytest
+
+import py_crispr_analyser.seed as seed
+from py_crispr_analyser.utils import ERROR_STR
+
+
+class TestSegmentLayout:
+    def test_equal_segments(self):
+        shifts, masks, number_of_keys = seed.segment_layout(20, 5)
+        np.testing.assert_array_equal(shifts, [0, 8, 16, 24, 32])
+        np.testing.assert_array_equal(masks, [0xFF] * 5)
+        assert number_of_keys == 512
+
+    def test_unequal_segments(self):
+        shifts, masks, number_of_keys = seed.segment_layout(20, 6)
+        assert shifts[0] == 0
+        # every base is covered by exactly one segment
+        covered = np.uint64(0)
+        for shift, mask in zip(shifts, masks):
+            assert (covered & (mask << shift)) == 0
+            covered |= mask << shift
+        assert covered == np.uint64((1 << 40) - 1)
+        assert number_of_keys == 1 << 9
+
+    def test_raises_exception_when_too_many_segments(self):
+        with pytest.raises(ValueError):
+            seed.segment_layout(4, 5)
+
+
+class TestSeedIndex:
+    def test_round_trip(self, tmp_path, guide_list):
+        guides = guide_list.copy()
+        guides[3] = ERROR_STR
+        seedfile = tmp_path / "guides.seed"
+        seed.write_seed_index(seedfile, guides, 20)
+        with open(seedfile, "rb") as seed_file:
+            seed_index = seed.get_seed_index(seed_file)
+        assert seed_index.number_of_guides == guides.size
+        assert seed_index.segments == seed.SEED_SEGMENTS
+        assert seed_index.postings.shape == (
+            seed.SEED_SEGMENTS,
+            guides.size - 1,
+        )
+        for segment in range(seed.SEED_SEGMENTS):
+            keys = seed.segment_keys(
+                guides,
+                seed_index.shifts[segment],
+                seed_index.masks[segment],
+            )
+            postings = seed_index.postings[segment]
+            assert 3 not in postings
+            np.testing.assert_array_equal(
+                np.sort(postings), np.delete(np.arange(guides.size), 3)
+            )
+            offsets = seed_index.offsets[segment]
+            for key in np.unique(keys[postings]):
+                start, end = offsets[key], offsets[key + 1]
+                bucket = postings[start:end]
+                assert np.all(keys[bucket] == key)
+                assert np.all(np.diff(bucket.astype(np.int64)) > 0)
+
+    def test_raises_exception_when_version_is_wrong(self, tmp_path, guide_list):
+        seedfile = tmp_path / "guides.seed"
+        seed.write_seed_index(seedfile, guide_list, 20)
+        data = bytearray(seedfile.read_bytes())
+        data[1] = 9
+        seedfile.write_bytes(bytes(data))
+        with open(seedfile, "rb") as seed_file:
+            with pytest.raises(ValueError, match="Invalid seed index version"):
+                seed.get_seed_index(seed_file)
+
+    def test_raises_exception_when_file_is_truncated(
+        self, tmp_path, guide_list
+    ):
+        seedfile = tmp_path / "guides.seed"
+        seed.write_seed_index(seedfile, guide_list, 20)
+        seedfile.write_bytes(seedfile.read_bytes()[:-4])
+        with open(seedfile, "rb") as seed_file:
+            with pytest.raises(ValueError, match="Invalid seed index size"):
+                seed.get_seed_index(seed_file)
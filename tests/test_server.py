@@ -0,0 +1,114 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import pytest
+import socket
+import threading
+import py_crispr_analyser.align as align
+import py_crispr_analyser.seed as seed
+import py_crispr_analyser.server as server
+
+
+@pytest.fixture
+def align_server(tmp_path, guides_file):
+    socket_path = str(tmp_path / "align.sock")
+    guides, metadata = align.load_guides(guides_file)
+    backend = align.CpuBackend(guides)
+    backend.warm_up()
+    align_server = server.AlignServer(socket_path, guides, metadata, backend)
+    thread = threading.Thread(target=align_server.serve_forever)
+    thread.start()
+    yield socket_path
+    align_server.shutdown()
+    align_server.server_close()
+    thread.join()
+
+
+def test_query_server(align_server, guides_file, capsys):
+    align.run(["--ifile", guides_file, "--no-cuda", "101", "1"])
+    expected = capsys.readouterr().out.splitlines()
+    assert list(align.query_server(align_server, ["101", "1"])) == expected
+
+
+def test_query_server_with_invalid_id(align_server):
+    assert list(align.query_server(align_server, ["101", "0"])) == [
+        "Error: Invalid CRISPR ID 0"
+    ]
+
+
+def test_streamed_requests(align_server):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(align_server)
+        with client.makefile("r") as response:
+            client.sendall(b"101\n")
+            first = response.readline()
+            client.sendall(b"1 101\n")
+            lines = [response.readline(), response.readline()]
+    assert first.startswith("101\t1\t")
+    assert lines[0].startswith("1\t1\t")
+    assert lines[1] == first
+
+
+def test_run_with_socket(align_server, guides_file, capsys):
+    align.run(["--ifile", guides_file, "--no-cuda", "101"])
+    expected = capsys.readouterr().out
+    align.run(["--socket", align_server, "101"])
+    assert capsys.readouterr().out == expected
+
+
+def test_run_with_socket_and_ifile(guides_file):
+    with pytest.raises(SystemExit):
+        align.run(["--ifile", guides_file, "--socket", "align.sock", "101"])
+
+
+def test_warm_up_with_seed_index(tmp_path, guide_list):
+    seedfile = tmp_path / "guides.seed"
+    seed.write_seed_index(seedfile, guide_list, 20)
+    with open(seedfile, "rb") as seed_file:
+        align.SeedIndexBackend(
+            guide_list, seed.get_seed_index(seed_file)
+        ).warm_up()
+
+
+def test_run_without_socket(guides_file):
+    with pytest.raises(SystemExit):
+        server.run(["--ifile", guides_file])
+
+
+def test_run_with_unknown_backend(guides_file):
+    with pytest.raises(SystemExit) as excinfo:
+        server.run(
+            ["--ifile", guides_file, "--socket", "align.sock", "--backend", "x"]
+        )
+    assert excinfo.value.code == 2
+
+
+def test_server_with_parameters(tmp_path, guides_file):
+    socket_path = str(tmp_path / "align.sock")
+    guides, metadata = align.load_guides(guides_file)
+    parameters = align.SearchParameters(max_mismatches=3, max_off_targets=10)
+    with server.AlignServer(
+        socket_path, guides, metadata, align.CpuBackend(guides), parameters
+    ) as align_server:
+        thread = threading.Thread(target=align_server.serve_forever)
+        thread.start()
+        try:
+            lines = list(align.query_server(socket_path, ["101"]))
+        finally:
+            align_server.shutdown()
+            thread.join()
+    assert lines == ["101\t1\t{0: 27, 1: 2, 2: 4}"]
+
+
+def test_run_with_invalid_mismatches(guides_file):
+    with pytest.raises(SystemExit) as excinfo:
+        server.run(
+            [
+                "--ifile",
+                guides_file,
+                "--socket",
+                "align.sock",
+                "--mismatches",
+                "9",
+            ]
+        )
+    assert excinfo.value.code == 2
@@ -0,0 +1,50 @@
+# Copyright (C) 2026 Genome Research Ltd.
+
+import numpy as np
+import pytest
+
+import py_crispr_analyser.strand as strand
+from py_crispr_analyser.utils import ERROR_STR
+
+
+class TestStrandIndex:
+    def test_round_trip(self, tmp_path, guide_list):
+        guides = guide_list.copy()
+        guides[3] = ERROR_STR
+        strandfile = tmp_path / "guides.strand"
+        strand.write_strand_index(strandfile, guides)
+        with open(strandfile, "rb") as strand_file:
+            strand_index = strand.get_strand_index(strand_file)
+        assert strand_index.number_of_guides == guides.size
+        pam_right = (guides >> np.uint64(strand.PAM_SHIFT)) & np.uint64(1)
+        for plane in range(2):
+            ids = strand_index.ids[plane]
+            assert 3 not in ids
+            assert np.all(np.diff(ids.astype(np.int64)) > 0)
+            np.testing.assert_array_equal(
+                strand_index.guides[plane], guides[ids]
+            )
+            assert np.all(pam_right[ids] == plane)
+        assert sum(ids.size for ids in strand_index.ids) == guides.size - 1
+
+    def test_raises_exception_when_version_is_wrong(self, tmp_path, guide_list):
+        strandfile = tmp_path / "guides.strand"
+        strand.write_strand_index(strandfile, guide_list)
+        data = bytearray(strandfile.read_bytes())
+        data[1] = 9
+        strandfile.write_bytes(bytes(data))
+        with open(strandfile, "rb") as strand_file:
+            with pytest.raises(
+                ValueError, match="Invalid strand index version"
+            ):
+                strand.get_strand_index(strand_file)
+
+    def test_raises_exception_when_file_is_truncated(
+        self, tmp_path, guide_list
+    ):
+        strandfile = tmp_path / "guides.strand"
+        strand.write_strand_index(strandfile, guide_list)
+        strandfile.write_bytes(strandfile.read_bytes()[:-4])
+        with open(strandfile, "rb") as strand_file:
+            with pytest.raises(ValueError, match="Invalid strand index size"):
+                strand.get_strand_index(strand_file)
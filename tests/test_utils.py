@@ -80,6 +80,119 @@ class TestGetGuides:
             utils.get_guides(in_file)
         assert str(excinfo.value) == "Invalid number of guides"
 
+    def test_when_guides_are_memory_mapped(self, guides_file):
+        in_file = open(guides_file, "rb")
+        guides = utils.get_guides(in_file, mmap=True)
+        assert isinstance(guides, np.memmap)
+        assert guides.flags.writeable is False
+        assert np.array_equal(guides, utils.get_guides(in_file))
+
+    def test_when_memory_mapped_guides_size_and_metadata_number_disagree(
+        self, tmp_path
+    ):
+        d = tmp_path / "test"
+        d.mkdir()
+        in_file = d / "guides.bin"
+        in_file.write_bytes(
+            struct.pack(
+                "<BLQQQB30s30sBBBQQ",
+                np.uint8(1),
+                np.uint(3),
+                np.uint64(7),  # number of sequences
+                np.uint64(20),
+                np.uint64(88),
+                np.uint8(1),
+                b"Human",
+                b"GRCh38",
+                np.uint8(0),
+                np.uint8(0),
+                np.uint8(0),
+                np.uint64(0b111000001010111000001010111000001010111),
+                np.uint64(0b1100000101011100000101011100000101011100),
+            )
+        )
+        in_file = open(in_file, "rb")
+        with pytest.raises(ValueError) as excinfo:
+            utils.get_guides(in_file, mmap=True)
+        assert str(excinfo.value) == "Invalid number of guides"
+
+
+class TestPackGuides:
+    def test_round_trip(self, guide_list):
+        guides = np.append(guide_list, utils.ERROR_STR)
+        packed = utils.pack_guides(guides)
+        assert packed.dtype.itemsize == 6
+        assert packed[-1]["high"] == 0xFFFF
+        np.testing.assert_array_equal(utils.unpack_guides(packed), guides)
+
+    def test_round_trip_longest_guides(self):
+        length = utils.MAX_PACKED_GUIDE_LENGTH
+        guides = np.array(
+            [
+                utils.sequence_to_binary_encoding("T" * length, 1),
+                utils.sequence_to_binary_encoding("T" * length, 0),
+                utils.sequence_to_binary_encoding("ACGT" * 5 + "TGA", 1),
+            ],
+            dtype=np.uint64,
+        )
+        assert guides[0] >> np.uint64(2 * length) == 1
+        packed = utils.pack_guides(guides)
+        np.testing.assert_array_equal(utils.unpack_guides(packed), guides)
+
+    def test_unpack_when_not_packed(self, guide_list):
+        assert utils.unpack_guides(guide_list) is guide_list
+
+    @pytest.mark.parametrize("mmap", [False, True])
+    def test_get_guides_when_packed(
+        self, guides_file, packed_guides_file, guide_list, mmap
+    ):
+        with open(packed_guides_file, "rb") as in_file:
+            guides = utils.get_guides(in_file, mmap=mmap)
+            np.testing.assert_array_equal(guides, guide_list)
+            packed = utils.get_guides(in_file, mmap=mmap, packed=True)
+            assert packed.dtype == utils.PACKED_GUIDE_DTYPE
+            np.testing.assert_array_equal(
+                utils.unpack_guides(packed), guide_list
+            )
+        assert (
+            packed_guides_file.stat().st_size
+            == guides_file.stat().st_size - guide_list.size * 2
+        )
+
+
+class TestIterateGuides:
+    def test_when_guides_are_in_memory(self):
+        guides = np.arange(10, dtype=np.uint64)
+        chunks = list(utils.iterate_guides(guides, 4))
+        assert [start for start, _ in chunks] == [0, 4, 8]
+        assert np.array_equal(
+            np.concatenate([chunk for _, chunk in chunks]), guides
+        )
+
+    def test_when_guides_are_memory_mapped(self, guides_file):
+        in_file = open(guides_file, "rb")
+        guides = utils.get_guides(in_file, mmap=True)
+        chunks = list(utils.iterate_guides(guides, 7))
+        assert [start for start, _ in chunks] == list(range(0, guides.size, 7))
+        assert all(isinstance(chunk, np.memmap) for _, chunk in chunks)
+        assert np.array_equal(
+            np.concatenate([chunk for _, chunk in chunks]), guides
+        )
+
+    def test_when_guides_are_packed(self, packed_guides_file, guide_list):
+        in_file = open(packed_guides_file, "rb")
+        guides = utils.get_guides(in_file, mmap=True, packed=True)
+        chunks = list(utils.iterate_guides(guides, 7))
+        assert all(chunk.dtype == guides.dtype for _, chunk in chunks)
+        np.testing.assert_array_equal(
+            utils.unpack_guides(np.concatenate([c for _, c in chunks])),
+            guide_list,
+        )
+
+    def test_raises_exception_when_chunk_size_is_not_positive(self):
+        with pytest.raises(ValueError, match="Chunk size must be positive"):
+            list(utils.iterate_guides(np.arange(3, dtype=np.uint64), 0))
+
 
 class TestSequenceToBinaryEncoding:
     def test_when_pam_is_right(self):
@@ -99,6 +212,32 @@ class TestSequenceToBinaryEncoding:
         )
 
 
+class TestSequencesToBinaryEncoding:
+    def test_matches_sequence_to_binary_encoding(self):
+        sequences = ["ACGTACGTACGTACGTACGT", "ACGNACGTACGTACGTACGT", "TTTTG"]
+        pam_right = [1, 0, 0]
+        encoded = utils.sequences_to_binary_encoding(
+            np.array(
+                [
+                    np.frombuffer(s.ljust(20, "A").encode(), dtype=np.uint8)
+                    for s in sequences
+                ]
+            ),
+            np.array(pam_right),
+        )
+        assert encoded.dtype == np.uint64
+        assert encoded.tolist() == [
+            utils.sequence_to_binary_encoding(s.ljust(20, "A"), p)
+            for s, p in zip(sequences, pam_right)
+        ]
+
+    def test_raises_exception_with_invalid_base(self):
+        with pytest.raises(ValueError, match="Invalid base in sequence"):
+            utils.sequences_to_binary_encoding(
+                np.frombuffer(b"ACGX", dtype=np.uint8).reshape(1, 4), [1]
+            )
+
+
 def test_reverse_complement():
     assert utils.reverse_complement("ATCGN") == "NCGAT"
 
@@ -111,8 +250,12 @@ class TestCheckFileHeader:
         except Exception as e:
             pytest.fail(f"Unexpected exception: {e}")
 
-    def test_raises_exception_when_version_is_wrong(self):
+    def test_when_version_is_4(self):
         header = struct.pack("<BL", 1, 4)
+        assert utils.check_file_header(header) == 4
+
+    def test_raises_exception_when_version_is_wrong(self):
+        header = struct.pack("<BL", 1, 5)
         with pytest.raises(ValueError) as excinfo:
             utils.check_file_header(header)
         assert str(excinfo.value) == "Invalid file version"